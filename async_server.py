@@ -0,0 +1,153 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Servidor XML-RPC sobre HTTP/1.1 implementado com asyncio puro.
+
+Atende os mesmos métodos do `GameServer` que o `SimpleXMLRPCServer`, mas as
+conexões ficam em um único event loop: conexões ociosas e jogadores
+aguardando em `wait_for_event` custam apenas uma corrotina, e não uma thread.
+
+Os métodos do jogo rodam em um pool pequeno de threads, fora do event loop:
+eles disputam o lock do `GameServer` com as threads de segundo plano
+(coletor, snapshot do diário, lote de rodadas) e as consultas ao histórico
+leem o SQLite, e nenhum dos dois pode parar as demais conexões.
+"""
+
+import asyncio
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+
+from binary_protocol import despachar
+from logger import obter_logger
+from metrics import TIPO_PROMETHEUS
+
+log = obter_logger("asyncio")
+
+TAMANHO_MAXIMO_CORPO = 1 << 20  # Rejeita requisições maiores que 1 MiB
+TAMANHO_MAXIMO_CABECALHO = 16 * 1024
+
+_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class ServidorAsyncio:
+    """Servidor XML-RPC asyncio com a mesma interface básica do `SimpleXMLRPCServer`.
+
+    Exemplo:
+        servidor = ServidorAsyncio(("localhost", 8080))
+        servidor.register_instance(GameServer())
+        servidor.serve_forever()
+    """
+
+    def __init__(self, endereco, timeout_ocioso=60, max_threads=8):
+        self.server_address = endereco
+        self.timeout_ocioso = timeout_ocioso  # Fecha conexões keep-alive ociosas (segundos)
+        self.max_threads = max_threads  # Threads que executam os métodos chamados
+        self.instance = None
+        self.funcoes = {}  # Funções registradas com `register_function`
+        self.estatisticas_conexoes = None  # Contadores opcionais (ver server.EstatisticasConexoes)
+        self.metricas = None  # Métricas expostas em GET /metrics (ver metrics.MetricasRPC)
+
+    def register_instance(self, instancia):
+        self.instance = instancia
+
+    def register_function(self, funcao, nome=None):
+        self.funcoes[nome or funcao.__name__] = funcao
+
+    def system_listMethods(self):
+        metodos = set(self.funcoes)
+        if self.instance is not None:
+            metodos.update(despachar(self.instance, "system.listMethods", ()))
+        return sorted(metodos)
+
+    def serve_forever(self):
+        """Roda o event loop até o processo ser interrompido."""
+        asyncio.run(self.servir())
+
+    async def servir(self):
+        # O executor padrão do loop: também usado por `GameServer._wait_for_event_async`
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(self.max_threads, thread_name_prefix="asyncio-rpc"))
+        host, porta = self.server_address
+        servidor = await asyncio.start_server(self._atender, host, porta, limit=TAMANHO_MAXIMO_CABECALHO)
+        self.server_address = servidor.sockets[0].getsockname()[:2]
+        async with servidor:
+            await servidor.serve_forever()
+
+    async def _atender(self, reader, writer):
+        """Atende uma conexão, respondendo requisições enquanto o cliente mantiver o keep-alive."""
+        if self.estatisticas_conexoes is not None:
+            self.estatisticas_conexoes.nova_conexao()
+        try:
+            while True:
+                try:
+                    cabecalho = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.timeout_ocioso)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    return
+                try:
+                    linhas = cabecalho.decode("latin-1").split("\r\n")
+                    metodo_http, caminho, versao = linhas[0].split(" ", 2)
+                    headers = {}
+                    for linha in linhas[1:]:
+                        if ":" in linha:
+                            chave, valor = linha.split(":", 1)
+                            headers[chave.strip().lower()] = valor.strip()
+                    tamanho = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self._responder(writer, 400, b"", manter=False)
+                    return
+                if tamanho > TAMANHO_MAXIMO_CORPO:
+                    await self._responder(writer, 413, b"", manter=False)
+                    return
+                corpo = await reader.readexactly(tamanho) if tamanho else b""
+                manter = versao == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                if metodo_http == "POST":
+                    if self.estatisticas_conexoes is not None:
+                        self.estatisticas_conexoes.nova_requisicao()
+                    await self._responder(writer, 200, await self._executar(corpo), manter)
+                elif metodo_http == "GET" and caminho.split("?", 1)[0] == "/metrics" and self.metricas is not None:
+                    texto = await asyncio.get_running_loop().run_in_executor(None, self.metricas.prometheus)
+                    await self._responder(writer, 200, texto.encode("utf-8"), manter, tipo=TIPO_PROMETHEUS)
+                elif metodo_http == "GET":
+                    await self._responder(writer, 404, b"", manter)
+                else:
+                    await self._responder(writer, 405, b"", manter)
+                if not manter:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        finally:
+            writer.close()
+
+    async def _executar(self, corpo):
+        """Decodifica a chamada XML-RPC, executa o método e retorna a resposta codificada."""
+        try:
+            params, metodo = xmlrpc.client.loads(corpo, use_builtin_types=True)
+            if metodo == "wait_for_event":
+                # Espera sem ocupar a thread do event loop
+                resultado = await self.instance._wait_for_event_async(*params)
+            elif metodo == "system.listMethods":
+                resultado = self.system_listMethods()
+            elif metodo in self.funcoes:
+                resultado = await asyncio.get_running_loop().run_in_executor(None, self.funcoes[metodo], *params)
+            else:
+                resultado = await asyncio.get_running_loop().run_in_executor(
+                    None, despachar, self.instance, metodo, params)
+            return xmlrpc.client.dumps((resultado,), methodresponse=True).encode("utf-8")
+        except Exception as e:
+            log.debug("Erro ao executar chamada: %s", e)
+            falha = xmlrpc.client.Fault(1, f"{type(e)}:{e}")
+            return xmlrpc.client.dumps(falha, methodresponse=True).encode("utf-8")
+
+    async def _responder(self, writer, status, corpo, manter, tipo="text/xml"):
+        cabecalho = (
+            f"HTTP/1.1 {status} {_STATUS[status]}\r\n"
+            f"Content-Type: {tipo}\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n"
+        )
+        writer.write(cabecalho.encode("latin-1") + corpo)
+        await writer.drain()
@@ -0,0 +1,62 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Mede a latência de `GameServer.find_match` conforme o número de partidas ativas cresce.
+
+Uso:
+    python3 benchmarks/bench_find_match.py --partidas 10 1000 100000
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from server import GameServer
+
+
+def preparar_servidor(num_partidas):
+    """Cria um servidor com `num_partidas` partidas em andamento."""
+    jogo = GameServer()
+    for i in range(num_partidas):
+        player1, player2 = 2 * i + 1, 2 * i + 2
+        jogo.players[player1] = {"in_game": True}
+        jogo.players[player2] = {"in_game": True}
+        jogo.add_match(player1, player2)
+    return jogo
+
+
+def medir_find_match(jogo, jogadores, repeticoes):
+    """Retorna a latência média (em microssegundos) de `find_match` para os jogadores dados."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            for player_id in jogadores:
+                jogo.find_match(player_id)
+        decorrido = time.perf_counter() - inicio
+    return decorrido / (repeticoes * len(jogadores)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de find_match")
+    parser.add_argument("--partidas", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000],
+                        help="Quantidades de partidas ativas a medir")
+    parser.add_argument("--repeticoes", type=int, default=2000, help="Chamadas por jogador amostrado")
+    args = parser.parse_args()
+
+    print(f"{'partidas':>10} {'us/chamada':>12}")
+    for num_partidas in args.partidas:
+        jogo = preparar_servidor(num_partidas)
+        # Amostra jogadores do início, meio e fim da tabela de partidas
+        jogadores = [1, num_partidas, 2 * num_partidas]
+        latencia = medir_find_match(jogo, jogadores, args.repeticoes)
+        print(f"{num_partidas:>10} {latencia:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
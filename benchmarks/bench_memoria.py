@@ -0,0 +1,69 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Mede a memória ocupada por partidas ociosas no `GameServer`.
+
+Conta tudo o que o servidor guarda por partida: o registro `Partida`, a
+entrada na tabela `matches` e as duas entradas do índice jogador -> partida.
+O último contato de cada jogador (`ultimo_contato`, usado pelo coletor de
+inativos) é do jogador, não da partida, e aparece separado: ele existe para
+todo jogador registrado, esteja ou não em uma partida.
+
+Uso:
+    python3 benchmarks/bench_memoria.py --partidas 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from server import GameServer
+
+
+def medir_memoria(num_partidas, contato_previo=False):
+    """Retorna o total de bytes alocados para manter `num_partidas` partidas ociosas.
+
+    Com `contato_previo` os jogadores já têm contato registrado antes da medição,
+    que então deixa de fora o custo de `ultimo_contato`.
+    """
+    # Os IDs dos jogadores são criados antes da medição: eles existem de qualquer forma no servidor
+    jogadores = list(range(10_000, 10_000 + 2 * num_partidas))
+    jogo = GameServer()
+    if contato_previo:
+        agora = time.monotonic()  # Um único float: a troca pelo de add_match não libera memória
+        for player_id in jogadores:
+            jogo._visto(player_id, agora)
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    for i in range(num_partidas):
+        jogo.add_match(jogadores[2 * i], jogadores[2 * i + 1])
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return depois - antes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória por partida")
+    parser.add_argument("--partidas", type=int, default=100_000, help="Quantidade de partidas ociosas")
+    args = parser.parse_args()
+
+    total = medir_memoria(args.partidas)
+    por_partida = total / args.partidas
+    so_partida = medir_memoria(args.partidas, contato_previo=True) / args.partidas
+    print(f"Partidas: {args.partidas}")
+    print(f"Memória total: {total / 2**20:.1f} MiB")
+    print(f"Bytes por partida: {por_partida:.0f} (partida e índices: {so_partida:.0f}; "
+          f"contato dos dois jogadores: {por_partida - so_partida:.0f})")
+    print(f"Estimativa para 1M partidas: {por_partida * 1_000_000 / 2**20:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Compara latência por chamada e bytes trafegados entre XML-RPC e o protocolo binário.
+
+Os dois servidores rodam neste processo, em portas livres, sobre a mesma
+instância do `GameServer`. Os bytes são contados no servidor (requisição +
+resposta, incluindo cabeçalhos HTTP no caso do XML-RPC).
+
+Uso:
+    python3 benchmarks/bench_protocolo.py --chamadas 2000
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import xmlrpc.client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from binary_protocol import ClienteBinario, ConexaoBinaria, ServidorBinario
+from server import GameServer, RequisicaoRPC, ServidorPoolThreads
+
+
+class _Contador:
+    """Envolve o arquivo de leitura/escrita do socket contando os bytes."""
+
+    def __init__(self, arquivo, totais, chave):
+        self._arquivo = arquivo
+        self._totais = totais
+        self._chave = chave
+
+    def read(self, *args):
+        dados = self._arquivo.read(*args)
+        self._totais[self._chave] += len(dados)
+        return dados
+
+    def readline(self, *args):
+        dados = self._arquivo.readline(*args)
+        self._totais[self._chave] += len(dados)
+        return dados
+
+    def write(self, dados):
+        self._totais[self._chave] += len(dados)
+        return self._arquivo.write(dados)
+
+    def __getattr__(self, nome):
+        return getattr(self._arquivo, nome)
+
+
+def contando_bytes(classe_handler, totais):
+    """Cria uma subclasse do handler que soma os bytes lidos e escritos em `totais`."""
+    class HandlerContado(classe_handler):
+        def setup(self):
+            super().setup()
+            self.rfile = _Contador(self.rfile, totais, "recebidos")
+            self.wfile = _Contador(self.wfile, totais, "enviados")
+    return HandlerContado
+
+
+def medir(proxy, chamadas, totais, chamada):
+    """Executa `chamada(proxy)` várias vezes e retorna latência média e bytes por chamada."""
+    chamada(proxy)  # Aquece a conexão
+    totais["recebidos"] = totais["enviados"] = 0
+    inicio = time.perf_counter()
+    for _ in range(chamadas):
+        chamada(proxy)
+    decorrido = time.perf_counter() - inicio
+    bytes_por_chamada = (totais["recebidos"] + totais["enviados"]) / chamadas
+    return decorrido / chamadas * 1e6, bytes_por_chamada
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XML-RPC x protocolo binário")
+    parser.add_argument("--chamadas", type=int, default=2000, help="Chamadas por cenário")
+    args = parser.parse_args()
+
+    jogo = GameServer()
+    jogo.add_to_waiting_list(1)
+    jogo.add_to_waiting_list(2)
+
+    totais_xml = {"recebidos": 0, "enviados": 0}
+    servidor_xml = ServidorPoolThreads(("127.0.0.1", 0), max_threads=4,
+                                       requestHandler=contando_bytes(RequisicaoRPC, totais_xml))
+    servidor_xml.register_instance(jogo)
+    totais_bin = {"recebidos": 0, "enviados": 0}
+    servidor_bin = ServidorBinario(("127.0.0.1", 0), jogo, contando_bytes(ConexaoBinaria, totais_bin))
+    for servidor in (servidor_xml, servidor_bin):
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    proxies = {
+        "xmlrpc": (xmlrpc.client.ServerProxy(f"http://127.0.0.1:{servidor_xml.server_address[1]}/"), totais_xml),
+        "binario": (ClienteBinario("127.0.0.1", servidor_bin.server_address[1]), totais_bin),
+    }
+    cenarios = [
+        ("get_round", lambda p: p.get_round(1)),
+        ("get_score", lambda p: p.get_score(1)),
+        ("get_match_snapshot", lambda p: p.get_match_snapshot(1, 1, -1)),
+    ]
+
+    print(f"{'cenário':<20} {'protocolo':<10} {'us/chamada':>12} {'bytes/chamada':>14}")
+    for nome, chamada in cenarios:
+        for protocolo, (proxy, totais) in proxies.items():
+            latencia, tamanho = medir(proxy, args.chamadas, totais, chamada)
+            print(f"{nome:<20} {protocolo:<10} {latencia:>12.1f} {tamanho:>14.0f}")
+
+    servidor_xml.shutdown()
+    servidor_bin.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Compara as formas de resolver rodadas: chamada a chamada e em lote.
+
+Cenários, para cada quantidade de rodadas pendentes:
+    decisao_dict: decisão antiga (dicionário de combinações recriado a cada rodada, chaves em texto);
+    decisao_tabela: consulta à tabela de resultados com as jogadas codificadas, uma rodada por vez;
+    decisao_lote: `Regras.resultados_em_lote` com listas (tabela em Python puro);
+    decisao_lote_numpy: `Regras.resultados_em_lote` com arrays NumPy (só se o NumPy estiver instalado);
+    resolve_match: `resolve_match` + publicação do resultado para cada partida (caminho do `make_move`);
+    resolver_rodadas: `GameServer._resolver_rodadas` com todas as partidas de uma vez.
+
+Uso:
+    python3 benchmarks/bench_resolucao.py --rodadas 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rules
+from logger import configurar_logs
+from rules import obter_regras
+from server import GameServer
+
+REGRAS = obter_regras()
+
+
+def decidir_dict(choice1, choice2, player1, player2):
+    """Decisão da rodada como era feita antes da tabela de resultados."""
+    combinacoes_vencedoras = {
+        ("pedra", "tesoura"): player1,
+        ("tesoura", "papel"): player1,
+        ("papel", "pedra"): player1,
+        ("tesoura", "pedra"): player2,
+        ("papel", "tesoura"): player2,
+        ("pedra", "papel"): player2,
+    }
+    if choice1 == choice2:
+        return None
+    return combinacoes_vencedoras.get((choice1, choice2))
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+def preparar_servidor(num_partidas):
+    jogo = GameServer()
+    jogo.regras = obter_regras("classico", 2 * 10 ** 9)  # As partidas nunca terminam durante a medição
+    match_ids = [jogo.add_match(2 * i + 1, 2 * i + 2)[1] for i in range(num_partidas)]
+    return jogo, match_ids
+
+
+def carregar_jogadas(jogo, match_ids, escolhas1, escolhas2):
+    """Coloca as duas jogadas em todas as partidas, sem passar pelo make_move."""
+    for match_id, escolha1, escolha2 in zip(match_ids, escolhas1, escolhas2):
+        partida = jogo.matches[match_id]
+        partida.escolha1 = escolha1
+        partida.escolha2 = escolha2
+        partida.rodadas = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da resolução de rodadas")
+    parser.add_argument("--rodadas", type=int, nargs="+", default=[100, 10000, 100000],
+                        help="Quantidades de rodadas pendentes a resolver")
+    args = parser.parse_args()
+    configurar_logs("off")
+
+    print(f"NumPy: {'sim' if rules.np is not None else 'não'}")
+    print(f"{'rodadas':>8} {'cenário':<18} {'ns/rodada':>10}")
+    random.seed(42)
+    for num in args.rodadas:
+        escolhas1 = [random.randrange(3) for _ in range(num)]
+        escolhas2 = [random.randrange(3) for _ in range(num)]
+        textos1 = [REGRAS.opcoes[c] for c in escolhas1]
+        textos2 = [REGRAS.opcoes[c] for c in escolhas2]
+        jogo, match_ids = preparar_servidor(num)
+
+        def resolver_um_a_um():
+            for match_id in match_ids:
+                _, mensagem = jogo.resolve_match(match_id)
+                jogo._publicar_rodada(match_id, mensagem)
+
+        tempos = {
+            "decisao_dict": cronometrar(lambda: [decidir_dict(a, b, 1, 2) for a, b in zip(textos1, textos2)]),
+            "decisao_tabela": cronometrar(lambda: [REGRAS.tabela[a * 3 + b] for a, b in zip(escolhas1, escolhas2)]),
+            "decisao_lote": cronometrar(lambda: REGRAS.resultados_em_lote(escolhas1, escolhas2)),
+        }
+        if rules.np is not None:
+            arrays1, arrays2 = rules.np.array(escolhas1), rules.np.array(escolhas2)
+            tempos["decisao_lote_numpy"] = cronometrar(lambda: REGRAS.resultados_em_lote(arrays1, arrays2))
+        # Aquecimento: cria os tópicos de eventos das partidas, que os dois cenários reutilizam
+        carregar_jogadas(jogo, match_ids, escolhas1, escolhas2)
+        jogo._resolver_rodadas(match_ids)
+        carregar_jogadas(jogo, match_ids, escolhas1, escolhas2)
+        tempos["resolve_match"] = cronometrar(resolver_um_a_um)
+        carregar_jogadas(jogo, match_ids, escolhas1, escolhas2)
+        tempos["resolver_rodadas"] = cronometrar(lambda: jogo._resolver_rodadas(match_ids))
+        for nome, segundos in tempos.items():
+            print(f"{num:>8} {nome:<18} {segundos / num * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
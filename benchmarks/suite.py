@@ -0,0 +1,250 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Conjunto de benchmarks dos caminhos mais usados do `GameServer`.
+
+Cada cenário roda de duas formas:
+    local: chamando o `GameServer` direto, no mesmo processo (custo da lógica do jogo);
+    rede: chamando um `server.py` em outro processo por XML-RPC com keep-alive
+          (custo visto pelo cliente, incluindo serialização e HTTP).
+
+Os resultados são gravados em JSON. Com `--comparar` o resultado é comparado a
+uma execução anterior e o script termina com código 1 se algum cenário ficar
+mais lento que a tolerância.
+
+Uso:
+    python3 benchmarks/suite.py --saida logs/bench.json
+    python3 benchmarks/suite.py --comparar logs/bench_base.json --tolerancia 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import xmlrpc.client
+
+RAIZ_PROJETO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ_PROJETO)
+
+from http_transport import TransportePersistente
+from logger import configurar_logs
+from server import GameServer
+
+OPCOES = ["pedra", "papel", "tesoura"]
+
+
+def medir(nome, modo, operacao, repeticoes, por_chamada=False, **parametros):
+    """Executa `operacao(i)` para i em range(repeticoes) e retorna o registro do resultado.
+
+    Com `por_chamada` cada chamada é cronometrada, para calcular p50/p99
+    (usado nos cenários de rede, onde o custo do cronômetro é desprezível).
+    """
+    latencias = []
+    inicio = time.perf_counter()
+    if por_chamada:
+        for i in range(repeticoes):
+            antes = time.perf_counter()
+            operacao(i)
+            latencias.append(time.perf_counter() - antes)
+    else:
+        for i in range(repeticoes):
+            operacao(i)
+    decorrido = time.perf_counter() - inicio
+    resultado = {
+        "nome": nome,
+        "modo": modo,
+        "parametros": parametros,
+        "operacoes": repeticoes,
+        "segundos": round(decorrido, 6),
+        "ops_por_s": round(repeticoes / decorrido, 1),
+        "us_por_op": round(decorrido / repeticoes * 1e6, 3),
+    }
+    if latencias:
+        latencias.sort()
+        resultado["p50_us"] = round(latencias[len(latencias) // 2] * 1e6, 1)
+        resultado["p99_us"] = round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1e6, 1)
+    return resultado
+
+
+def preparar_partidas(jogo, num_partidas, primeiro_id=1):
+    """Cria `num_partidas` partidas pela fila de espera e retorna a lista (match_id, jogador1, jogador2)."""
+    partidas = []
+    for i in range(num_partidas):
+        player1, player2 = primeiro_id + 2 * i, primeiro_id + 2 * i + 1
+        jogo.register_player(player1, 0)
+        jogo.register_player(player2, 0)
+        jogo.add_to_waiting_list(player1)
+        jogo.add_to_waiting_list(player2)
+        _, match_id = jogo.find_match(player1)
+        partidas.append((int(match_id), player1, player2))
+    return partidas
+
+
+def cenarios(jogo, modo, escala):
+    """Roda todos os cenários contra `jogo` (um `GameServer` ou um proxy XML-RPC)."""
+    por_chamada = modo == "rede"
+    num_partidas = (100_000 if modo == "local" else 2_000) * escala // 10
+    repeticoes = (200_000 if modo == "local" else 5_000) * escala // 10
+    partidas = preparar_partidas(jogo, num_partidas)
+    random.seed(42)
+    amostra = [random.choice(partidas) for _ in range(1024)]
+    resultados = []
+
+    resultados.append(medir(
+        "find_match", modo, lambda i: jogo.find_match(amostra[i & 1023][1]),
+        repeticoes, por_chamada, partidas=num_partidas))
+    resultados.append(medir(
+        "get_match_status", modo, lambda i: jogo.get_match_status(amostra[i & 1023][1], amostra[i & 1023][0]),
+        repeticoes, por_chamada, partidas=num_partidas))
+    resultados.append(medir(
+        "get_match_snapshot", modo,
+        lambda i: jogo.get_match_snapshot(amostra[i & 1023][1], amostra[i & 1023][0], -1),
+        repeticoes, por_chamada, partidas=num_partidas))
+
+    # Uma rodada completa: duas jogadas, a segunda resolve a rodada
+    escolhas = [(random.choice(OPCOES), random.choice(OPCOES)) for _ in range(1024)]
+
+    def rodada(i):
+        match_id, player1, player2 = partidas[i % num_partidas]
+        escolha1, escolha2 = escolhas[i & 1023]
+        jogo.make_move(player1, match_id, escolha1)
+        jogo.make_move(player2, match_id, escolha2)
+    resultados.append(medir("make_move_rodada", modo, rodada, repeticoes // 2, por_chamada,
+                            partidas=num_partidas))
+
+    # Entrar e sair da fila sem formar par
+    solitario = 10 * num_partidas + 1
+    jogo.register_player(solitario, 0)
+
+    def entrar_sair(i):
+        jogo.add_to_waiting_list(solitario)
+        jogo.remove_waiting_list(solitario)
+    resultados.append(medir("fila_entrar_sair", modo, entrar_sair, repeticoes // 2, por_chamada))
+
+    # Ciclo de pareamento: dois jogadores entram, a partida é criada e removida
+    base = 20 * num_partidas
+
+    def parear(i):
+        player1, player2 = base + 2 * i, base + 2 * i + 1
+        jogo.add_to_waiting_list(player1)
+        jogo.add_to_waiting_list(player2)
+        _, match_id = jogo.find_match(player1)
+        jogo.remove_match(int(match_id))
+    resultados.append(medir("fila_pareamento", modo, parear, repeticoes // 4, por_chamada))
+    return resultados
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rodar_rede(escala, modo_servidor):
+    """Sobe um `server.py` em outro processo e roda os cenários por XML-RPC."""
+    porta = porta_livre()
+    processo = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ_PROJETO, "server.py"), "--ip", "127.0.0.1", "--porta", str(porta),
+         "--modo", modo_servidor, "--log-nivel", "off"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        proxy = xmlrpc.client.ServerProxy(f"http://127.0.0.1:{porta}/", transport=TransportePersistente())
+        limite = time.monotonic() + 10
+        while True:
+            try:
+                proxy.system.listMethods()
+                break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise
+                time.sleep(0.05)
+        resultados = cenarios(proxy, "rede", escala)
+        for resultado in resultados:
+            resultado["parametros"]["servidor"] = modo_servidor
+        return resultados
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def comparar(resultados, caminho_base, tolerancia):
+    """Compara `us_por_op` com a execução base. Retorna a lista de cenários mais lentos que a tolerância."""
+    with open(caminho_base) as arquivo:
+        base = {(r["nome"], r["modo"]): r for r in json.load(arquivo)["resultados"]}
+    regressoes = []
+    for resultado in resultados:
+        anterior = base.get((resultado["nome"], resultado["modo"]))
+        if anterior is None:
+            continue
+        variacao = resultado["us_por_op"] / anterior["us_por_op"] - 1
+        resultado["variacao"] = round(variacao, 3)
+        if variacao > tolerancia:
+            regressoes.append(resultado)
+    return regressoes
+
+
+def versao_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ_PROJETO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos mais usados do GameServer")
+    parser.add_argument("--modos", nargs="+", choices=["local", "rede"], default=["local", "rede"],
+                        help="Formas de execução dos cenários")
+    parser.add_argument("--servidor", choices=["threads", "asyncio", "simples"], default="threads",
+                        help="Modo do servidor nos cenários de rede")
+    parser.add_argument("--escala", type=int, default=10,
+                        help="Tamanho dos cenários (10 = padrão; menor é mais rápido e mais ruidoso)")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior usada como referência")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="Aumento máximo aceito em us/op antes de acusar regressão (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    configurar_logs("off")
+    resultados = []
+    if "local" in args.modos:
+        resultados.extend(cenarios(GameServer(), "local", args.escala))
+    if "rede" in args.modos:
+        resultados.extend(rodar_rede(args.escala, args.servidor))
+
+    regressoes = comparar(resultados, args.comparar, args.tolerancia) if args.comparar else []
+
+    print(f"{'cenário':<20} {'modo':<6} {'ops/s':>11} {'us/op':>9} {'p50 us':>8} {'p99 us':>8} {'variação':>9}")
+    for r in resultados:
+        variacao = f"{r['variacao']:+.0%}" if "variacao" in r else "-"
+        print(f"{r['nome']:<20} {r['modo']:<6} {r['ops_por_s']:>11.0f} {r['us_por_op']:>9.2f} "
+              f"{r.get('p50_us', '-'):>8} {r.get('p99_us', '-'):>8} {variacao:>9}")
+
+    if args.saida:
+        relatorio = {
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": versao_git(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "escala": args.escala,
+            "resultados": resultados,
+        }
+        with open(args.saida, "w") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+
+    if regressoes:
+        nomes = ", ".join(f"{r['nome']} ({r['modo']})" for r in regressoes)
+        print(f"REGRESSÃO acima de {args.tolerancia:.0%}: {nomes}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
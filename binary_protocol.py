@@ -0,0 +1,282 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Protocolo binário compacto para chamar os métodos do `GameServer`.
+
+Cada mensagem é um quadro `[tamanho: uint32][conteúdo]` enviado por uma conexão
+TCP persistente. O conteúdo é codificado com tags de 1 byte seguidas de campos
+empacotados com `struct`:
+
+    N None | T True | F False | b int8 | i int32 | q int64 | d float64
+    s texto (uint32 + UTF-8) | l lista (uint32 + itens) | m dicionário (uint32 + pares)
+
+Requisição: `[método, [argumentos]]`. Resposta: `[True, resultado]` ou
+`[False, "mensagem de erro"]`.
+"""
+
+import socket
+import socketserver
+import struct
+import threading
+
+from logger import obter_logger
+
+log = obter_logger("binario")
+
+TAMANHO_MAXIMO_QUADRO = 1 << 20  # Rejeita quadros maiores que 1 MiB
+PROFUNDIDADE_MAXIMA = 32  # Listas e dicionários aninhados além disso são rejeitados
+
+_CABECALHO = struct.Struct(">I")
+_INT8 = struct.Struct(">b")
+_INT32 = struct.Struct(">i")
+_INT64 = struct.Struct(">q")
+_FLOAT64 = struct.Struct(">d")
+
+
+class ErroProtocolo(Exception):
+    """Quadro malformado ou grande demais."""
+
+
+class ErroRemoto(Exception):
+    """Erro devolvido pelo servidor ao executar o método chamado."""
+
+
+def _codificar(valor, partes):
+    if valor is None:
+        partes.append(b"N")
+    elif valor is True:
+        partes.append(b"T")
+    elif valor is False:
+        partes.append(b"F")
+    elif isinstance(valor, int):
+        if -128 <= valor <= 127:
+            partes.append(b"b" + _INT8.pack(valor))
+        elif -2**31 <= valor < 2**31:
+            partes.append(b"i" + _INT32.pack(valor))
+        else:
+            partes.append(b"q" + _INT64.pack(valor))
+    elif isinstance(valor, float):
+        partes.append(b"d" + _FLOAT64.pack(valor))
+    elif isinstance(valor, str):
+        dados = valor.encode("utf-8")
+        partes.append(b"s" + _CABECALHO.pack(len(dados)))
+        partes.append(dados)
+    elif isinstance(valor, (list, tuple)):
+        partes.append(b"l" + _CABECALHO.pack(len(valor)))
+        for item in valor:
+            _codificar(item, partes)
+    elif isinstance(valor, dict):
+        partes.append(b"m" + _CABECALHO.pack(len(valor)))
+        for chave, item in valor.items():
+            _codificar(chave, partes)
+            _codificar(item, partes)
+    else:
+        raise TypeError(f"Tipo não suportado pelo protocolo binário: {type(valor).__name__}")
+
+
+def codificar(valor):
+    """Codifica um valor Python no formato binário."""
+    partes = []
+    _codificar(valor, partes)
+    return b"".join(partes)
+
+
+def _decodificar(dados, pos, profundidade=0):
+    tag = dados[pos:pos + 1]
+    pos += 1
+    if tag == b"N":
+        return None, pos
+    if tag == b"T":
+        return True, pos
+    if tag == b"F":
+        return False, pos
+    if tag == b"b":
+        return _INT8.unpack_from(dados, pos)[0], pos + 1
+    if tag == b"i":
+        return _INT32.unpack_from(dados, pos)[0], pos + 4
+    if tag == b"q":
+        return _INT64.unpack_from(dados, pos)[0], pos + 8
+    if tag == b"d":
+        return _FLOAT64.unpack_from(dados, pos)[0], pos + 8
+    if tag in (b"s", b"l", b"m"):
+        tamanho = _CABECALHO.unpack_from(dados, pos)[0]
+        pos += 4
+        if tag == b"s":
+            if pos + tamanho > len(dados):
+                raise ErroProtocolo("Texto truncado")
+            return bytes(dados[pos:pos + tamanho]).decode("utf-8"), pos + tamanho
+        # Limite fixo de aninhamento: um quadro pequeno não pode estourar a pilha do decodificador
+        profundidade += 1
+        if profundidade > PROFUNDIDADE_MAXIMA:
+            raise ErroProtocolo("Aninhamento excede o limite")
+        if tag == b"l":
+            lista = []
+            for _ in range(tamanho):
+                item, pos = _decodificar(dados, pos, profundidade)
+                lista.append(item)
+            return lista, pos
+        dicionario = {}
+        for _ in range(tamanho):
+            chave, pos = _decodificar(dados, pos, profundidade)
+            if not isinstance(chave, (str, int, float, bool, type(None))):
+                raise ErroProtocolo(f"Chave de dicionário inválida: {type(chave).__name__}")
+            dicionario[chave], pos = _decodificar(dados, pos, profundidade)
+        return dicionario, pos
+    raise ErroProtocolo(f"Tag desconhecida: {bytes(tag)!r}")
+
+
+def decodificar(dados):
+    """Decodifica um valor codificado por `codificar`.
+    Raises:
+        ErroProtocolo: Para qualquer quadro que não seja um valor válido.
+    """
+    try:
+        valor, pos = _decodificar(memoryview(dados), 0)
+    except ErroProtocolo:
+        raise
+    except struct.error as e:
+        raise ErroProtocolo(f"Quadro truncado: {e}") from e
+    except Exception as e:  # Ex.: UTF-8 inválido; nenhum quadro derruba a conexão com outra exceção
+        raise ErroProtocolo(f"Quadro inválido: {type(e).__name__}: {e}") from e
+    if pos != len(dados):
+        raise ErroProtocolo("Bytes sobrando no quadro")
+    return valor
+
+
+def ler_quadro(arquivo):
+    """Lê um quadro de um arquivo binário (socket.makefile). Retorna None no fim da conexão."""
+    cabecalho = arquivo.read(_CABECALHO.size)
+    if len(cabecalho) < _CABECALHO.size:
+        return None
+    tamanho = _CABECALHO.unpack(cabecalho)[0]
+    if tamanho > TAMANHO_MAXIMO_QUADRO:
+        raise ErroProtocolo(f"Quadro de {tamanho} bytes excede o limite")
+    dados = arquivo.read(tamanho)
+    if len(dados) < tamanho:
+        return None
+    return dados
+
+
+def montar_quadro(valor):
+    """Codifica o valor e acrescenta o cabeçalho com o tamanho."""
+    dados = codificar(valor)
+    return _CABECALHO.pack(len(dados)) + dados
+
+
+def despachar(instancia, metodo, params):
+    """Chama um método público da instância, do mesmo jeito que o servidor XML-RPC faria."""
+    if metodo == "system.listMethods":
+        if hasattr(instancia, "_listMethods"):
+            return instancia._listMethods()
+        return sorted(nome for nome in dir(instancia)
+                      if not nome.startswith("_") and callable(getattr(instancia, nome)))
+    if hasattr(instancia, "_dispatch"):
+        return instancia._dispatch(metodo, params)
+    if metodo.startswith("_") or "." in metodo:
+        raise ErroRemoto(f"Método {metodo} não é suportado")
+    funcao = getattr(instancia, metodo, None)
+    if not callable(funcao):
+        raise ErroRemoto(f"Método {metodo} não é suportado")
+    return funcao(*params)
+
+
+class ConexaoBinaria(socketserver.StreamRequestHandler):
+    """Atende uma conexão persistente: lê quadros de requisição até o cliente desconectar."""
+
+    def handle(self):
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                quadro = ler_quadro(self.rfile)
+                if quadro is None:
+                    return
+                requisicao = decodificar(quadro)
+                if not (isinstance(requisicao, list) and len(requisicao) == 2 and isinstance(requisicao[0], str)
+                        and isinstance(requisicao[1], list)):
+                    raise ErroProtocolo("Requisição deve ser [método, [argumentos]]")
+                metodo, params = requisicao
+            except ErroProtocolo as e:
+                log.warning("Quadro inválido de %s: %s", self.client_address[0], e)
+                return
+            try:
+                resposta = [True, despachar(self.server.instancia, metodo, params)]
+            except Exception as e:
+                resposta = [False, f"{type(e).__name__}: {e}"]
+            self.wfile.write(montar_quadro(resposta))
+
+
+class ServidorBinario(socketserver.ThreadingTCPServer):
+    """Servidor do protocolo binário, com uma thread por conexão persistente."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, endereco, instancia, handler=ConexaoBinaria):
+        super().__init__(endereco, handler)
+        self.instancia = instancia
+
+
+class ClienteBinario:
+    """Proxy do protocolo binário com a mesma interface do `xmlrpc.client.ServerProxy`.
+
+    Exemplo:
+        servidor = ClienteBinario("localhost", 5001)
+        sucesso, mensagem = servidor.register_player(1234, 5001)
+    """
+
+    def __init__(self, host, porta, timeout=None):
+        self._endereco = (host, porta)
+        self._timeout = timeout
+        self._lock = threading.Lock()  # Uma chamada por vez na mesma conexão
+        self._socket = None
+        self._arquivo = None
+
+    def _conectar(self):
+        self._socket = socket.create_connection(self._endereco, timeout=self._timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._arquivo = self._socket.makefile("rb")
+
+    def _chamar(self, metodo, params):
+        with self._lock:
+            if self._socket is None:
+                self._conectar()
+            try:
+                self._socket.sendall(montar_quadro([metodo, list(params)]))
+                quadro = ler_quadro(self._arquivo)
+            except OSError:
+                self.close()
+                raise
+            if quadro is None:
+                self.close()
+                raise ConnectionError("Conexão encerrada pelo servidor")
+        sucesso, resultado = decodificar(quadro)
+        if not sucesso:
+            raise ErroRemoto(resultado)
+        return resultado
+
+    def close(self):
+        if self._socket is not None:
+            self._arquivo.close()
+            self._socket.close()
+            self._socket = self._arquivo = None
+
+    def __getattr__(self, nome):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return _MetodoRemoto(self, nome)
+
+
+class _MetodoRemoto:
+    """Permite chamadas como `proxy.system.listMethods()`, igual ao ServerProxy."""
+
+    def __init__(self, cliente, nome):
+        self._cliente = cliente
+        self._nome = nome
+
+    def __getattr__(self, nome):
+        return _MetodoRemoto(self._cliente, f"{self._nome}.{nome}")
+
+    def __call__(self, *params):
+        return self._cliente._chamar(self._nome, params)
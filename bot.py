@@ -0,0 +1,294 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Cliente sem interface gráfica para teste de carga do servidor.
+
+Cada jogador simulado roda em uma thread e segue a mesma sequência de RPCs do
+`ClienteJogoGUI`: `register_player` → `add_to_waiting_list` → espera no lobby
+(`wait_for_event` / `find_match`) → `locate_match` → `get_match_snapshot` →
+`make_move` ... até o fim do jogo → `remove_match`.
+
+Com `--torneio` os jogadores se inscrevem em um torneio (`join_tournament`) em
+vez de entrar na fila, e jogam as partidas que o torneio criar até serem
+eliminados ou o torneio acabar.
+
+Uso:
+    python3 bot.py --porta 8080 --jogadores 1000 --duracao 30 --pensar 50
+    python3 bot.py --porta 8080 --jogadores 512 --duracao 120 --torneio eliminatoria
+"""
+
+import argparse
+import itertools
+import random
+import threading
+import time
+
+from http_transport import TransportePersistente, conectar
+
+# Estratégias de jogada: recebem o número da jogada e as opções da partida e retornam a escolha
+ESTRATEGIAS = {
+    "aleatoria": lambda n, opcoes: random.choice(opcoes),
+    "pedra": lambda n, opcoes: opcoes[0],
+    "ciclica": lambda n, opcoes: opcoes[n % len(opcoes)],
+}
+
+# RPCs de espera (long-poll) ficam fora das estatísticas de latência
+CHAMADAS_DE_ESPERA = {"wait_for_event"}
+
+# Situações do evento "torneio" em que o jogador deixa o torneio
+FIM_DO_TORNEIO = {"eliminado", "campeao", "encerrado"}
+
+
+def percentil(valores_ordenados, fracao):
+    """Retorna o percentil (0 a 1) de uma lista já ordenada."""
+    if not valores_ordenados:
+        return 0.0
+    indice = min(len(valores_ordenados) - 1, int(fracao * len(valores_ordenados)))
+    return valores_ordenados[indice]
+
+
+class Medicoes:
+    """Latências e erros por método RPC de um jogador simulado (sem locks: uma por thread)."""
+
+    def __init__(self):
+        self.latencias = {}  # método -> lista de segundos
+        self.erros = {}  # método -> quantidade de exceções
+        self.partidas = 0  # Partidas jogadas até o fim e removidas por este jogador
+
+    def juntar(self, outra):
+        for metodo, valores in outra.latencias.items():
+            self.latencias.setdefault(metodo, []).extend(valores)
+        for metodo, quantidade in outra.erros.items():
+            self.erros[metodo] = self.erros.get(metodo, 0) + quantidade
+        self.partidas += outra.partidas
+
+
+class JogadorSimulado:
+    """Um jogador que entra na fila, joga partidas e sai, até o tempo acabar."""
+
+    def __init__(self, player_id, conexao, estrategia="aleatoria", pensar=0.0, fim=None, torneio=None):
+        self.player_id = player_id
+        self.conexao = conexao  # (ip, porta, protocolo, transporte)
+        self.server = conectar(*conexao)
+        self.shards = {}  # Proxies dos shards já usados, por endereço
+        self.estrategia = ESTRATEGIAS[estrategia]
+        self.pensar = pensar  # Tempo médio de "pensar" antes de cada jogada (segundos)
+        self.fim = fim  # Instante (time.monotonic) em que o jogador para de entrar em partidas
+        self.medicoes = Medicoes()
+        self.seq_jogador = 0
+        self.jogadas = 0
+        self.torneio = torneio  # ID do torneio em que o jogador se inscreve (None = fila de espera)
+        self.ultima_partida = 0  # Última partida do torneio já jogada
+
+    def chamar(self, servidor, metodo, *params):
+        """Executa o RPC medindo a latência; exceções contam como erro e são repassadas."""
+        inicio = time.perf_counter()
+        try:
+            return getattr(servidor, metodo)(*params)
+        except Exception:
+            self.medicoes.erros[metodo] = self.medicoes.erros.get(metodo, 0) + 1
+            raise
+        finally:
+            if metodo not in CHAMADAS_DE_ESPERA:
+                self.medicoes.latencias.setdefault(metodo, []).append(time.perf_counter() - inicio)
+
+    def executar(self):
+        try:
+            self.chamar(self.server, "register_player", self.player_id, 0)
+            if self.torneio is not None:
+                self.chamar(self.server, "join_tournament", self.player_id, self.torneio)
+            while time.monotonic() < self.fim:
+                try:
+                    if self.torneio is None:
+                        match_id = self.aguardar_partida()
+                    else:
+                        match_id = self.aguardar_partida_torneio()
+                        if match_id is None:
+                            return  # Eliminado ou torneio encerrado
+                        self.ultima_partida = match_id
+                    if match_id is not None:
+                        self.jogar(match_id)
+                except Exception:
+                    time.sleep(0.5)  # Já contado como erro; tenta de novo em seguida
+        except Exception:
+            pass  # Erro já contado; o jogador desiste
+        try:
+            self.server.remove_waiting_list(self.player_id)
+        except Exception:
+            pass
+
+    def aguardar_partida(self):
+        """Entra na fila e espera o pareamento. Retorna o ID da partida ou None se o tempo acabar."""
+        self.chamar(self.server, "add_to_waiting_list", self.player_id)
+        while time.monotonic() < self.fim:
+            sucesso, match_id = self.chamar(self.server, "find_match", self.player_id)
+            if sucesso:
+                return int(match_id)
+            espera = max(0, min(5, int(self.fim - time.monotonic())))
+            sucesso, resposta = self.chamar(self.server, "wait_for_event", self.player_id, 0, self.seq_jogador, espera)
+            if sucesso:
+                self.seq_jogador = resposta["seq"]
+                for evento in resposta["eventos"]:
+                    if evento["tipo"] == "partida_encontrada":
+                        return int(evento["match_id"])
+            if not sucesso or not resposta["eventos"]:
+                time.sleep(0.05)  # Servidor sem long-poll (modo "simples")
+        return None
+
+    def aguardar_partida_torneio(self):
+        """Espera a próxima partida do torneio. Retorna o ID, ou None se o jogador saiu do torneio."""
+        while time.monotonic() < self.fim:
+            sucesso, match_id = self.chamar(self.server, "find_match", self.player_id)
+            if sucesso and int(match_id) > self.ultima_partida:
+                return int(match_id)
+            espera = max(0, min(5, int(self.fim - time.monotonic())))
+            sucesso, resposta = self.chamar(self.server, "wait_for_event", self.player_id, 0, self.seq_jogador, espera)
+            if sucesso:
+                self.seq_jogador = resposta["seq"]
+                for evento in resposta["eventos"]:
+                    # Avisos de partidas já jogadas ficam no histórico do tópico: os IDs só crescem
+                    if evento["tipo"] == "partida_encontrada" and int(evento["match_id"]) > self.ultima_partida:
+                        return int(evento["match_id"])
+                    if evento["tipo"] == "torneio" and evento["situacao"] in FIM_DO_TORNEIO:
+                        return None
+            if not sucesso or not resposta["eventos"]:
+                time.sleep(0.05)  # Servidor sem long-poll (modo "simples")
+        return None
+
+    def localizar_partida(self, match_id):
+        """Retorna o proxy do servidor da partida (o shard, se o servidor for um roteador)."""
+        sucesso, endereco = self.chamar(self.server, "locate_match", match_id)
+        if not sucesso or not endereco:
+            return self.server
+        _, _, protocolo, transporte = self.conexao
+        if protocolo == "binario" and endereco["porta_binaria"]:
+            destino = (endereco["ip"], endereco["porta_binaria"], protocolo, transporte)
+        else:
+            destino = (endereco["ip"], endereco["porta"], "xmlrpc", transporte)
+        if destino not in self.shards:
+            self.shards[destino] = conectar(*destino)
+        return self.shards[destino]
+
+    def jogar(self, match_id):
+        """Joga a partida até o fim, esperando os eventos quando já jogou a rodada."""
+        servidor = self.localizar_partida(match_id)
+        versao, seq = -1, 0
+        while time.monotonic() < self.fim + 1:  # Desiste de partidas que não terminam (ex.: só empates)
+            sucesso, snapshot = self.chamar(servidor, "get_match_snapshot", self.player_id, match_id, versao)
+            if not sucesso:
+                return  # Partida já removida pelo oponente
+            if "regras" in snapshot:
+                opcoes = snapshot["regras"]["opcoes"]  # Só no primeiro snapshot (versão -1)
+            if "placar" in snapshot:
+                versao = snapshot["versao"]
+                fim_de_jogo, jogou = snapshot["fim_de_jogo"], snapshot["jogou"]
+            if fim_de_jogo:
+                # Os dois jogadores tentam remover; só quem conseguir conta a partida
+                removida, _ = self.chamar(servidor, "remove_match", match_id)
+                self.medicoes.partidas += 1 if removida else 0
+                return
+            if not jogou:
+                if self.pensar:
+                    time.sleep(random.uniform(0, 2 * self.pensar))
+                self.jogadas += 1
+                sucesso, _ = self.chamar(servidor, "make_move", self.player_id, match_id,
+                                         self.estrategia(self.jogadas, opcoes))
+                if sucesso:
+                    continue
+            espera = max(0, min(5, int(self.fim + 1 - time.monotonic())))
+            sucesso, resposta = self.chamar(servidor, "wait_for_event", self.player_id, match_id, seq, espera)
+            if not sucesso:
+                return
+            seq = resposta["seq"]
+            if not resposta["eventos"]:
+                time.sleep(0.05)  # Servidor sem long-poll (modo "simples")
+
+
+def relatorio(medicoes, duracao, jogadores):
+    """Imprime partidas/s, latência p50/p99 e taxa de erros por método."""
+    total_chamadas = sum(len(v) for v in medicoes.latencias.values())
+    total_erros = sum(medicoes.erros.values())
+    partidas = medicoes.partidas
+    print(f"jogadores: {jogadores}  duração: {duracao:.1f}s  partidas: {partidas:.0f}  "
+          f"partidas/s: {partidas / duracao:.1f}")
+    print(f"chamadas: {total_chamadas}  chamadas/s: {total_chamadas / duracao:.0f}  "
+          f"erros: {total_erros} ({100 * total_erros / max(1, total_chamadas):.2f}%)")
+    print(f"{'método':<22} {'chamadas':>9} {'p50 ms':>8} {'p99 ms':>8} {'erros':>6}")
+    todas = []
+    for metodo in sorted(set(medicoes.latencias) | set(medicoes.erros)):
+        valores = sorted(medicoes.latencias.get(metodo, []))
+        todas.extend(valores)
+        print(f"{metodo:<22} {len(valores):>9} {percentil(valores, 0.5) * 1000:>8.2f} "
+              f"{percentil(valores, 0.99) * 1000:>8.2f} {medicoes.erros.get(metodo, 0):>6}")
+    todas.sort()
+    print(f"{'(todas)':<22} {len(todas):>9} {percentil(todas, 0.5) * 1000:>8.2f} "
+          f"{percentil(todas, 0.99) * 1000:>8.2f} {total_erros:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Jogadores simulados para teste de carga do RPS Battle Arena')
+    parser.add_argument('--ip', default='localhost', help='IP do servidor')
+    parser.add_argument('--porta', type=int, default=5000, help='Porta do servidor')
+    parser.add_argument('--protocolo', choices=['xmlrpc', 'binario'], default='xmlrpc',
+                        help='Protocolo usado para falar com o servidor')
+    parser.add_argument('--jogadores', type=int, default=100, help='Quantidade de jogadores simulados')
+    parser.add_argument('--duracao', type=float, default=30, help='Duração do teste (segundos)')
+    parser.add_argument('--pensar', type=float, default=0, help='Tempo médio para escolher a jogada (ms)')
+    parser.add_argument('--estrategia', choices=list(ESTRATEGIAS) + ['misturada'], default='aleatoria',
+                        help='Estratégia de jogada ("misturada" alterna entre as estratégias)')
+    parser.add_argument('--id-inicial', type=int, default=100000,
+                        help='ID do primeiro jogador (use faixas diferentes ao rodar vários processos)')
+    parser.add_argument('--rampa', type=float, default=1, help='Tempo para iniciar todos os jogadores (segundos)')
+    parser.add_argument('--torneio', choices=['eliminatoria', 'suico'],
+                        help='Inscreve os jogadores em um torneio desse formato em vez da fila de espera')
+    args = parser.parse_args()
+
+    # Milhares de threads: pilhas menores reduzem a memória do processo
+    threading.stack_size(256 * 1024)
+    transporte = TransportePersistente(timeout=30)
+    conexao = (args.ip, args.porta, args.protocolo, transporte)
+    estrategias = itertools.cycle(ESTRATEGIAS) if args.estrategia == 'misturada' else itertools.repeat(args.estrategia)
+
+    organizador = conectar(args.ip, args.porta)
+    torneio = None
+    if args.torneio:
+        sucesso, torneio = organizador.create_tournament(args.torneio, 0)
+        if not sucesso:
+            raise SystemExit(f"Não foi possível criar o torneio: {torneio}")
+
+    inicio = time.monotonic()
+    fim = inicio + args.rampa + args.duracao
+    jogadores = [
+        JogadorSimulado(args.id_inicial + i, conexao, next(estrategias), args.pensar / 1000, fim, torneio)
+        for i in range(args.jogadores)
+    ]
+    threads = []
+    for i, jogador in enumerate(jogadores):
+        thread = threading.Thread(target=jogador.executar, daemon=True)
+        thread.start()
+        threads.append(thread)
+        if args.rampa:
+            time.sleep(max(0, inicio + args.rampa * (i + 1) / len(jogadores) - time.monotonic()))
+    if torneio is not None:
+        # Começa quando todos estiverem inscritos (ou quando o tempo acabar)
+        while (organizador.get_tournament(torneio)[1]["jogadores"] < args.jogadores
+               and time.monotonic() < fim):
+            time.sleep(0.1)
+        print(organizador.start_tournament(torneio)[1])
+    for thread in threads:
+        thread.join(max(0, fim + 5 - time.monotonic()))
+
+    medicoes = Medicoes()
+    for jogador in jogadores:
+        medicoes.juntar(jogador.medicoes)
+    relatorio(medicoes, time.monotonic() - inicio, args.jogadores)
+    if torneio is not None:
+        print(f"torneio: {organizador.get_tournament(torneio)[1]}")
+        print(f"classificação: {organizador.get_tournament_standings(torneio, 3)[1]}")
+    print(f"conexões XML-RPC: {transporte.estatisticas()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,24 @@
 import pygame
 import argparse
 import socket
-import xmlrpc.client as rpc
 import time
 import sys
 import random
+import queue
 from threading import Thread
 
+from http_transport import TransportePersistente, conectar
+
 class ClienteJogoGUI:
     """" Classe que representa o cliente do jogo com interface gráfica """
-    def __init__(self, servidor_ip, servidor_porta):
+    def __init__(self, servidor_ip, servidor_porta, protocolo="xmlrpc"):
         # Inicializa o cliente
         pygame.font.init() # Inicializa as fontes do Pygame
-        self.server = rpc.ServerProxy(f"http://{servidor_ip}:{servidor_porta}/") # Conecta ao servidor
+        self.transporte = TransportePersistente() # Conexões keep-alive compartilhadas pelas threads do cliente
+        self.conexao = (servidor_ip, servidor_porta, protocolo, self.transporte)
+        self.server = conectar(*self.conexao) # Conecta ao servidor
+        self.conexao_partida = self.conexao # Servidor que atende a partida atual (um shard, se houver)
+        self.server_partida = self.server
         self.player_id = random.randint(1000, 9999) # ID do jogador
         
         # Configurações da tela
@@ -44,14 +50,11 @@ class ClienteJogoGUI:
         self.tempo_espera = 0
         self.mensagem = ""
         
-        # Atualização do placar
-        self.needs_score_update = False
-        
         # Placar
         self.placar_jogador = 0
         self.placar_oponente = 0
         self.rodada_atual = 1
-        self.max_rodadas = 5
+        self.vencedor = None # Vencedor da partida, decidido pelo servidor (evento fim_de_jogo ou snapshot)
         
         print(f"[DEBUG] ID do Jogador: {self.player_id}")
         self.match_id = None
@@ -59,6 +62,23 @@ class ClienteJogoGUI:
         self.escolha_atual = None
         print(f"[DEBUG] Escolha Atual: {self.escolha_atual}")
         
+        # Estado da partida recebido pelos eventos do servidor
+        self.oponente_id = None
+        self.jogou = False # Se o jogador já escolheu na rodada atual
+        self.oponente_jogou = False # Se o oponente já escolheu na rodada atual (a escolha só aparece no resultado)
+        self.versao_partida = -1 # Versão do snapshot da partida já recebida (-1 força o envio completo)
+        self.versao_eventos = 0 # Maior sequência de evento da partida já aplicada
+        
+        # Eventos recebidos pela thread de long-poll, consumidos no loop principal
+        self.eventos = queue.Queue()
+        self.seq_jogador = 0 # Última sequência processada no tópico do jogador (lobby)
+        
+        # Chamadas ao servidor feitas pela thread de rede; o loop principal só enfileira pedidos
+        # e aplica as respostas, então o tempo de cada quadro não depende da latência do servidor
+        self.pedidos = queue.Queue() # (chave, função) a executar na thread de rede
+        self.respostas = queue.Queue() # (chave, resultado, erro) devolvidos ao loop principal
+        self.pedidos_pendentes = {} # chave -> [ao_responder, mensagem_erro, repetição] dos pedidos em andamento
+        
         # Botões do menu
         self.botoes_menu = {
             "new_game": pygame.Rect(self.WIDTH//2 - 100, 200, 200, 50),
@@ -66,100 +86,136 @@ class ClienteJogoGUI:
             "quit": pygame.Rect(self.WIDTH//2 - 100, 400, 200, 50)
         }
         
-        # Botões do jogo
-        self.botoes_jogo = {
-            "pedra": pygame.Rect(100, self.HEIGHT - 100, 150, 50),
-            "papel": pygame.Rect(325, self.HEIGHT - 100, 150, 50),
-            "tesoura": pygame.Rect(550, self.HEIGHT - 100, 150, 50)
-        }
+        # Botões do jogo: um por opção da variante da partida, criados quando as regras chegam
+        self.botoes_jogo = {}
         # Botões da tela de resultado
         self.botoes_resultado = {
             "nova_partida": pygame.Rect(self.WIDTH // 2 - 100, self.HEIGHT // 2 + 50, 200, 50),
             "voltar_menu": pygame.Rect(self.WIDTH // 2 - 100, self.HEIGHT // 2 + 120, 200, 50)
         }
+        # Botão voltar da tela de créditos
+        self.voltar_button = pygame.Rect(self.WIDTH//2 - 100, self.HEIGHT - 100, 200, 50)
         
+        # Desenho: textos renderizados uma vez, telas fixas pré-compostas e atualização só do que mudou
+        self.cache_textos = {} # (fonte, texto, cor) -> Surface; também guarda os botões compostos
+        self.fundos = {} # Parte fixa de cada tela
+        self.fundo_atual = None # Fundo desenhado na janela agora (None força redesenhar tudo)
+        self.elementos_atuais = {} # Elementos variáveis desenhados no quadro anterior
+        
+        
+    def texto(self, fonte, conteudo, cor):
+        """ Retorna a superfície do texto, renderizando só na primeira vez (cache por fonte, texto e cor) """
+        chave = (fonte, conteudo, cor)
+        superficie = self.cache_textos.get(chave)
+        if superficie is None:
+            if len(self.cache_textos) >= 512:
+                self.cache_textos.clear() # Mensagens com IDs variam a cada partida: limita a memória
+            superficie = self.cache_textos[chave] = fonte.render(conteudo, True, cor)
+        return superficie
+
+    def texto_centralizado(self, fonte, conteudo, cor, centro):
+        """ Retorna a superfície do texto e o retângulo centralizado em `centro` """
+        superficie = self.texto(fonte, conteudo, cor)
+        return superficie, superficie.get_rect(center=centro)
+
+    def botao(self, rect, cor, rotulo):
+        """ Retorna o botão (fundo colorido e rótulo) já composto, pronto para um único blit """
+        chave = ("botao", rect.size, cor, rotulo)
+        superficie = self.cache_textos.get(chave)
+        if superficie is None:
+            superficie = pygame.Surface(rect.size)
+            superficie.fill(cor)
+            texto = self.texto(self.font_media, rotulo, self.BRANCO)
+            superficie.blit(texto, texto.get_rect(center=(rect.width // 2, rect.height // 2)))
+            self.cache_textos[chave] = superficie
+        return superficie, rect
+
+    def fundo(self, nome, *elementos):
+        """ Retorna a parte fixa da tela `nome`, composta uma única vez com os elementos (superfície, rect) """
+        superficie = self.fundos.get(nome)
+        if superficie is None:
+            superficie = pygame.Surface((self.WIDTH, self.HEIGHT))
+            superficie.fill(self.PRETO)
+            for elemento, rect in elementos:
+                superficie.blit(elemento, rect)
+            self.fundos[nome] = superficie
+        return superficie
+
+    def compor(self, fundo, elementos):
+        """ Desenha só os elementos que mudaram desde o quadro anterior e atualiza apenas essas regiões da janela
+
+        Args:
+            fundo (Surface): Parte fixa da tela (ver `fundo`).
+            elementos (dict): nome -> (superfície, rect) da parte variável, na ordem de desenho.
+        """
+        if fundo is not self.fundo_atual:
+            # Mudou de tela: desenha tudo
+            self.screen.blit(fundo, (0, 0))
+            for superficie, rect in elementos.values():
+                self.screen.blit(superficie, rect)
+            self.fundo_atual, self.elementos_atuais = fundo, elementos
+            pygame.display.update()
+            return
         
+        # Como as superfícies vêm do cache, um elemento igual ao anterior é o mesmo objeto
+        sujos = [rect for nome, (superficie, rect) in self.elementos_atuais.items()
+                 if elementos.get(nome) != (superficie, rect)]
+        sujos += [rect for nome, (superficie, rect) in elementos.items()
+                  if self.elementos_atuais.get(nome) != (superficie, rect)]
+        self.elementos_atuais = elementos
+        if not sujos:
+            return # Nada mudou: nenhum pixel é desenhado
+        for rect in sujos:
+            self.screen.blit(fundo, rect, rect) # Apaga a versão anterior
+        for superficie, rect in elementos.values():
+            if rect.collidelist(sujos) != -1:
+                self.screen.blit(superficie, rect)
+        pygame.display.update(sujos)
+
     def desenhar_resultado(self):
         """Desenha a tela de resultado do jogo."""
-        self.screen.fill(self.PRETO)
-        
-        # Título do resultado
-        titulo = self.font_grande.render("Fim do Jogo", True, self.BRANCO)
-        titulo_rect = titulo.get_rect(center=(self.WIDTH // 2, 100))
-        self.screen.blit(titulo, titulo_rect)
+        # Título e botões não mudam
+        fundo = self.fundo(
+            "resultado",
+            self.texto_centralizado(self.font_grande, "Fim do Jogo", self.BRANCO, (self.WIDTH // 2, 100)),
+            self.botao(self.botoes_resultado["nova_partida"], self.VERDE, "Nova Partida"),
+            self.botao(self.botoes_resultado["voltar_menu"], self.VERMELHO, "Voltar ao Menu"),
+        )
         
         # Mensagem de resultado
-        resultado = self.font_media.render(self.mensagem, True, self.BRANCO)
-        resultado_rect = resultado.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 - 50))
-        self.screen.blit(resultado, resultado_rect)
-        
-        # Botão para nova partida
-        pygame.draw.rect(self.screen, self.VERDE, self.botoes_resultado["nova_partida"])
-        nova_partida_texto = self.font_media.render("Nova Partida", True, self.BRANCO)
-        nova_partida_texto_rect = nova_partida_texto.get_rect(center=self.botoes_resultado["nova_partida"].center)
-        self.screen.blit(nova_partida_texto, nova_partida_texto_rect)
-        
-        # Botão para voltar ao menu
-        pygame.draw.rect(self.screen, self.VERMELHO, self.botoes_resultado["voltar_menu"])
-        voltar_menu_texto = self.font_media.render("Voltar ao Menu", True, self.BRANCO)
-        voltar_menu_texto_rect = voltar_menu_texto.get_rect(center=self.botoes_resultado["voltar_menu"].center)
-        self.screen.blit(voltar_menu_texto, voltar_menu_texto_rect)
+        self.compor(fundo, {
+            "resultado": self.texto_centralizado(self.font_media, self.mensagem, self.BRANCO,
+                                                 (self.WIDTH // 2, self.HEIGHT // 2 - 50)),
+        })
 
     def desenhar_menu(self):
         """ Desenha a tela do menu """
-        self.screen.fill(self.PRETO)
-        
-        # Título
-        titulo = self.font_grande.render("RPS Battle Arena", True, self.BRANCO)
-        titulo_rect = titulo.get_rect(center=(self.WIDTH//2, 100))
-        self.screen.blit(titulo, titulo_rect)
-        
-        # Botões
-        for texto, rect in self.botoes_menu.items():
-            pygame.draw.rect(self.screen, self.CINZA, rect)
-            texto_surface = self.font_media.render(texto.replace("_", " ").title(), True, self.BRANCO)
-            texto_rect = texto_surface.get_rect(center=rect.center)
-            self.screen.blit(texto_surface, texto_rect)
+        # Título e botões: a tela inteira é fixa
+        fundo = self.fundo(
+            "menu",
+            self.texto_centralizado(self.font_grande, "RPS Battle Arena", self.BRANCO, (self.WIDTH//2, 100)),
+            *(self.botao(rect, self.CINZA, texto.replace("_", " ").title()) for texto, rect in self.botoes_menu.items()),
+        )
+        self.compor(fundo, {})
 
     def desenhar_lobby(self):
         """ Desenha a tela de lobby """
-        self.screen.fill(self.PRETO)
-        
         # Mensagem de procurando partida
-        texto = self.font_grande.render("Procurando Partida", True, self.BRANCO)
-        texto_rect = texto.get_rect(center=(self.WIDTH//2, self.HEIGHT//2 - 50))
-        self.screen.blit(texto, texto_rect)
+        fundo = self.fundo(
+            "lobby",
+            self.texto_centralizado(self.font_grande, "Procurando Partida", self.BRANCO,
+                                    (self.WIDTH//2, self.HEIGHT//2 - 50)),
+        )
         
         # Contador
         pontos = "." * (int(time.time() * 2) % 4)
-        contador = self.font_media.render(f"Aguardando{pontos}", True, self.BRANCO)
-        contador_rect = contador.get_rect(center=(self.WIDTH//2, self.HEIGHT//2 + 50))
-        
-        self.screen.blit(contador, contador_rect)
+        self.compor(fundo, {
+            "contador": self.texto_centralizado(self.font_media, f"Aguardando{pontos}", self.BRANCO,
+                                                (self.WIDTH//2, self.HEIGHT//2 + 50)),
+        })
     
     def desenhar_credits(self):
         """ Desenha a tela de créditos """
-        self.screen.fill(self.PRETO)
-        
-        # Título
-        titulo = self.font_grande.render("Créditos", True, self.BRANCO)
-        titulo_rect = titulo.get_rect(center=(self.WIDTH//2, 100))
-        self.screen.blit(titulo, titulo_rect)
-        
-        # Informações da disciplina
-        info_disciplina = self.font_media.render("Desenvolvido para a disciplina de Sistemas Distribuídos", True, self.BRANCO)
-        info_rect = info_disciplina.get_rect(center=(self.WIDTH//2, 180))
-        self.screen.blit(info_disciplina, info_rect)
-        
-        uni = self.font_media.render("Universidade Estadual de Maringá", True, self.BRANCO)
-        uni_rect = uni.get_rect(center=(self.WIDTH//2, 220))
-        self.screen.blit(uni, uni_rect)
-        
-        # Equipe
-        equipe = self.font_media.render("Equipe:", True, self.BRANCO)
-        equipe_rect = equipe.get_rect(center=(self.WIDTH//2, 300))
-        self.screen.blit(equipe, equipe_rect)
-        
         # Lista de integrantes
         integrantes = [
             "Andrei Roberto da Costa",
@@ -167,103 +223,133 @@ class ClienteJogoGUI:
             "Henrique Rosa de Araujo"
         ]
         
-        y_pos = 350
-        for integrante in integrantes:
-            nome = self.font_media.render(integrante, True, self.BRANCO)
-            nome_rect = nome.get_rect(center=(self.WIDTH//2, y_pos))
-            self.screen.blit(nome, nome_rect)
-            y_pos += 40
-        
-        # Botão voltar (estilo menu)
-        self.voltar_button = pygame.Rect(self.WIDTH//2 - 100, self.HEIGHT - 100, 200, 50)
-        pygame.draw.rect(self.screen, self.CINZA, self.voltar_button)
-        voltar = self.font_media.render("Voltar", True, self.BRANCO)
-        voltar_rect = voltar.get_rect(center=self.voltar_button.center)
-        self.screen.blit(voltar, voltar_rect)
+        # Título, disciplina, equipe e botão voltar (estilo menu): a tela inteira é fixa
+        fundo = self.fundo(
+            "credits",
+            self.texto_centralizado(self.font_grande, "Créditos", self.BRANCO, (self.WIDTH//2, 100)),
+            self.texto_centralizado(self.font_media, "Desenvolvido para a disciplina de Sistemas Distribuídos",
+                                    self.BRANCO, (self.WIDTH//2, 180)),
+            self.texto_centralizado(self.font_media, "Universidade Estadual de Maringá", self.BRANCO,
+                                    (self.WIDTH//2, 220)),
+            self.texto_centralizado(self.font_media, "Equipe:", self.BRANCO, (self.WIDTH//2, 300)),
+            *(self.texto_centralizado(self.font_media, integrante, self.BRANCO, (self.WIDTH//2, 350 + 40 * i))
+              for i, integrante in enumerate(integrantes)),
+            self.botao(self.voltar_button, self.CINZA, "Voltar"),
+        )
+        self.compor(fundo, {})
 
     def desenhar_jogo(self):
         """ Desenha a tela de jogo """
-        self.screen.fill(self.PRETO)
-        
-        # Placar
-        placar = self.font_grande.render(f"{self.placar_jogador} x {self.placar_oponente}", True, self.BRANCO)
-        placar_rect = placar.get_rect(center=(self.WIDTH // 2, 50))
-        self.screen.blit(placar, placar_rect)
-
-        # Rodada atual
-        rodada = self.font_media.render(f"Rodada {self.rodada_atual}", True, self.BRANCO)
-        rodada_rect = rodada.get_rect(center=(self.WIDTH // 2, 100))
-        self.screen.blit(rodada, rodada_rect)
-
-        # IDs dos jogadores
-        jogador_texto = self.font_pequena.render(f"Você: {self.player_id}", True, self.VERDE)
-        jogador_rect = jogador_texto.get_rect(center=(self.WIDTH // 4, 20))
-        self.screen.blit(jogador_texto, jogador_rect)
-        
-        try:
-            result, opponent_id = self.server.get_opponent_id(self.player_id, self.match_id)
-            oponente_texto = self.font_pequena.render(f"Oponente: {opponent_id}", True, self.BRANCO)
-            oponente_rect = oponente_texto.get_rect(center=(3 * self.WIDTH // 4, 20))
-            self.screen.blit(oponente_texto, oponente_rect)
-        except Exception as e:
-            print(f"[ERROR] Erro ao obter ID do oponente: {e}")
+        # ID do jogador não muda durante a execução
+        fundo = self.fundo(
+            "jogo",
+            self.texto_centralizado(self.font_pequena, f"Você: {self.player_id}", self.VERDE, (self.WIDTH // 4, 20)),
+        )
+        
+        # Placar e rodada atual
+        elementos = {
+            "placar": self.texto_centralizado(self.font_grande, f"{self.placar_jogador} x {self.placar_oponente}",
+                                              self.BRANCO, (self.WIDTH // 2, 50)),
+            "rodada": self.texto_centralizado(self.font_media, f"Rodada {self.rodada_atual}", self.BRANCO,
+                                              (self.WIDTH // 2, 100)),
+        }
+        if self.oponente_id is not None:
+            elementos["oponente"] = self.texto_centralizado(self.font_pequena, f"Oponente: {self.oponente_id}",
+                                                            self.BRANCO, (3 * self.WIDTH // 4, 20))
 
         # Mensagem
         if self.mensagem:
-            msg = self.font_media.render(self.mensagem, True, self.BRANCO)
-            msg_rect = msg.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2))
-            self.screen.blit(msg, msg_rect)
+            elementos["mensagem"] = self.texto_centralizado(self.font_media, self.mensagem, self.BRANCO,
+                                                            (self.WIDTH // 2, self.HEIGHT // 2))
 
-        # Indicação de turno
-        try:
-            current_turn = self.server.get_current_turn(self.match_id)
-            turno_texto = "Sua vez" if current_turn == self.player_id else "Vez do oponente"
-            
-            if turno_texto == "Sua vez" and self.mensagem == "Não é o seu turno":
-                self.mensagem = ""
-            elif turno_texto == "Sua vez" and self.mensagem == "Aguardando a jogada do oponente...":
-                self.mensagem = ""
-            
-            if current_turn == self.player_id and self.needs_score_update:
-                # self.mensagem = ""
-                self.sinc_placar() # Sincroniza o placar com o servidor
-                self.needs_score_update = False
-            elif current_turn != self.player_id:
-                self.needs_score_update = True
-            
-            turno_surface = self.font_media.render(turno_texto, True, self.VERDE if turno_texto == "Sua vez" else self.BRANCO)
-            turno_rect = turno_surface.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 50))
-            self.screen.blit(turno_surface, turno_rect)
-        except Exception as e:
-            print(f"[ERROR] Erro ao obter o turno atual: {e}")
+        # Situação da rodada: os dois jogam ao mesmo tempo (atualizada pelos eventos de jogada)
+        if self.jogou:
+            situacao, cor = "Aguardando o oponente", self.BRANCO
+        elif self.oponente_jogou:
+            situacao, cor = "O oponente já jogou: sua vez", self.VERDE
+        else:
+            situacao, cor = "Escolha sua jogada", self.VERDE
+        elementos["situacao"] = self.texto_centralizado(self.font_media, situacao, cor,
+                                                        (self.WIDTH // 2, self.HEIGHT // 2 + 50))
 
         # Botões de jogada
         for opcao, rect in self.botoes_jogo.items():
             cor = self.VERDE if self.escolha_atual == opcao else self.AZUL
-            pygame.draw.rect(self.screen, cor, rect)
-            texto = self.font_media.render(opcao.title(), True, self.BRANCO)
-            texto_rect = texto.get_rect(center=rect.center)
-            self.screen.blit(texto, texto_rect)
+            elementos[opcao] = self.botao(rect, cor, opcao.title())
+        self.compor(fundo, elementos)
         
+    def pedir(self, chave, funcao, ao_responder=None, mensagem_erro=None, repetir=False):
+        """ Envia uma chamada ao servidor para a thread de rede, sem bloquear o loop principal
+
+        Pedidos com a mesma chave não ficam em andamento ao mesmo tempo: um pedido
+        repetido é descartado ou, com `repetir`, executado uma única vez depois que
+        o atual terminar (para buscar um estado que mudou enquanto ele estava em andamento).
+
+        Args:
+            chave (str): Identifica pedidos equivalentes (ex.: "sinc", "jogada").
+            funcao: Função sem argumentos executada na thread de rede; retorna o resultado do RPC.
+            ao_responder: Chamada no loop principal com o resultado.
+            mensagem_erro (str): Mensagem exibida se a chamada falhar (padrão: o erro de conexão).
+            repetir (bool): Se um pedido repetido deve ser executado de novo ao fim do atual.
+        Returns:
+            bool: True se o pedido foi enviado ou agendado, False se foi descartado.
+        """
+        pendente = self.pedidos_pendentes.get(chave)
+        if pendente is not None:
+            if not repetir:
+                return False
+            pendente[2] = (funcao, ao_responder, mensagem_erro)
+            return True
+        self.pedidos_pendentes[chave] = [ao_responder, mensagem_erro, None]
+        self.pedidos.put((chave, funcao))
+        return True
+
+    def trabalhar_rede(self):
+        """ Thread que executa as chamadas ao servidor, uma por vez e na ordem em que foram pedidas """
+        while True:
+            chave, funcao = self.pedidos.get()
+            try:
+                self.respostas.put((chave, funcao(), None))
+            except Exception as e:
+                self.respostas.put((chave, None, e))
+
+    def processar_respostas(self):
+        """ Aplica as respostas da thread de rede no loop principal, sem esperar por elas """
+        while True:
+            try:
+                chave, resultado, erro = self.respostas.get_nowait()
+            except queue.Empty:
+                return
+            ao_responder, mensagem_erro, repeticao = self.pedidos_pendentes.pop(chave)
+            if repeticao is not None:
+                self.pedir(chave, *repeticao)
+            if erro is not None:
+                print(f"[ERROR] Erro na chamada {chave}: {erro}")
+                self.mensagem = mensagem_erro or f"Erro ao conectar ao servidor: {erro}"
+            elif ao_responder is not None:
+                ao_responder(resultado)
+
     def handle_new_game(self):
         """ Adiciona o jogador à lista de espera de novas partidas """
-        try:
-            # Reseta os dados da partida anterior (se houver)
-            self.resetar_partida()
-            
-            success, message = self.server.add_to_waiting_list(self.player_id)
+        # Reseta os dados da partida anterior (se houver) e já mostra o lobby
+        self.resetar_partida()
+        self.estado = "lobby"
+        
+        def ao_responder(resposta):
+            success, message = resposta
             self.mensagem = message
             if success:
-                self.estado = "lobby"
                 print(f"[DEBUG] Novo jogo iniciado. Estado atual: {self.estado}")
+                # A partida chega pelo evento "partida_encontrada", sem consultar o servidor
             else:
                 print(f"[ERROR] Erro ao adicionar à lista de espera: {message}")
-        except Exception as e:
-            self.mensagem = f"Erro ao conectar ao servidor: {e}"
-            print(f"[DEBUG] Exceção em handle_new_game: {e}")
+                if self.estado == "lobby":
+                    self.estado = "menu"
+        
+        self.pedir("fila", lambda: self.server.add_to_waiting_list(self.player_id), ao_responder)
             
     def remove_new_game(self):
-        """ Remove o jogador da lista de espera de novas partidas """
+        """ Remove o jogador da lista de espera de novas partidas (chamada direta: usada ao sair do jogo) """
         try:
             success, message = self.server.remove_waiting_list(self.player_id)
             self.mensagem = message
@@ -272,64 +358,165 @@ class ClienteJogoGUI:
         except Exception as e:
             self.mensagem = f"Erro ao conectar ao servidor: {e}"
             
+    def posicionar_botoes(self, opcoes):
+        """ Distribui os botões das opções de jogada na parte de baixo da tela """
+        espaco = self.WIDTH // len(opcoes)
+        largura = min(150, espaco - 20)
+        self.botoes_jogo = {
+            opcao: pygame.Rect(espaco * i + (espaco - largura) // 2, self.HEIGHT - 100, largura, 50)
+            for i, opcao in enumerate(opcoes)
+        }
+
     def resetar_partida(self):
         """ Reseta os dados da partida anterior """
         self.placar_jogador = 0 # Reseta o placar
         self.placar_oponente = 0 # Reseta o placar
         self.rodada_atual = 1 # Reseta a rodada atual
+        self.vencedor = None # Reseta o fim de jogo
+        self.botoes_jogo = {} # As regras da próxima partida chegam no primeiro snapshot
         self.match_id = None # Reseta o ID da partida
+        self.oponente_id = None # Reseta o oponente
+        self.jogou = False # Reseta as jogadas da rodada
+        self.oponente_jogou = False
+        self.versao_partida = -1 # Reseta a versão do snapshot
+        self.versao_eventos = 0 # Reseta a sequência de eventos da partida
         self.escolha_atual = None # Reseta a escolha do jogador
         self.mensagem = ""  # Limpa a mensagem de resultado
         self.estado = "menu"  # Garante que o estado seja resetado
         print("[DEBUG] Dados da partida resetados com sucesso")
             
     def remove_match(self):
-        """ Remove o jogador da partida atual """
-        try:
-            success, message = self.server.remove_match(self.player_id, self.match_id)
-            self.mensagem = message
+        """ Remove a partida atual no servidor (o cliente não espera a resposta) """
+        match_id = self.match_id
+        
+        def ao_responder(resposta):
+            success, message = resposta
             if success:
-                print("[DEBUG] Partida {self.match_id} removida com sucesso")
-                self.estado = "menu"
-        except Exception as e:
-            self.mensagem = f"Erro ao conectar ao servidor: {e}"
+                print(f"[DEBUG] Partida {match_id} removida com sucesso")
+            else:
+                print(f"[DEBUG] Partida {match_id} não removida: {message}")
+        
+        self.pedir(f"remover:{match_id}", lambda: self.server_partida.remove_match(match_id), ao_responder)
 
     def verificar_fim_jogo(self):
-        """ Verifica se o jogo terminou """
-        if self.placar_jogador >= (self.max_rodadas // 2 + 1):
+        """ Verifica se o jogo terminou (o servidor decide o fim e informa o vencedor) """
+        return self.vencedor is not None
+    
+    def encerrar_partida(self, vencedor):
+        """ Vai para a tela de resultado com o vencedor informado pelo servidor """
+        if self.vencedor is not None:
+            return # O evento e o snapshot podem trazer o mesmo fim de jogo
+        self.vencedor = vencedor
+        if str(vencedor) == str(self.player_id):
             self.mensagem = "Você venceu a partida, Parabéns!"
-            self.estado = "resultado"
-            return True
-        elif self.placar_oponente >= (self.max_rodadas // 2 + 1):
+        else:
             self.mensagem = "Você perdeu o jogo, Lamento!"
-            self.estado = "resultado"
-            return True
-        return False
+        # Fora do estado "jogando" a thread de eventos deixa de escutar a partida
+        self.estado = "resultado"
+        print(f"[DEBUG] Fim do jogo! Placar final: {self.placar_jogador} x {self.placar_oponente}")
     
-    def verificar_estado_partida(self):
-        """Verifica o estado da partida (placar, rodada atual, fim do jogo)."""
-        try:
-            # Sincroniza o placar
-            # self.sinc_placar()
+    def escutar_eventos(self):
+        """ Thread que aguarda eventos do servidor (long-poll) e os repassa ao loop principal """
+        servidor_lobby = conectar(*self.conexao) # Conexão própria, o proxy não é compartilhado entre threads
+        servidor_partida, conexao_partida = servidor_lobby, self.conexao
+        match_atual, seq_partida = None, 0
+        ultimo_heartbeat = 0
+        while True:
+            estado, match_id = self.estado, self.match_id
+            if estado == "lobby":
+                servidor = servidor_lobby
+                topico_match, ultima_seq = 0, self.seq_jogador
+            elif estado == "jogando" and match_id is not None and self.conexao_partida is not None:
+                if match_id != match_atual:
+                    match_atual, seq_partida = match_id, 0
+                if self.conexao_partida != conexao_partida:
+                    # A partida está em outro shard: os eventos dela vêm de lá
+                    conexao_partida = self.conexao_partida
+                    servidor_partida = servidor_lobby if conexao_partida == self.conexao else conectar(*conexao_partida)
+                servidor = servidor_partida
+                topico_match, ultima_seq = match_id, seq_partida
+            else:
+                # Fora do lobby e da partida não há o que escutar; só avisa que continua conectado
+                if time.monotonic() - ultimo_heartbeat > 15:
+                    ultimo_heartbeat = time.monotonic()
+                    try:
+                        servidor_lobby.heartbeat(self.player_id)
+                    except Exception as e:
+                        print(f"[ERROR] Erro ao enviar heartbeat: {e}")
+                time.sleep(0.1)
+                continue
+            
+            try:
+                sucesso, resposta = servidor.wait_for_event(self.player_id, topico_match, ultima_seq, 20)
+            except Exception as e:
+                print(f"[ERROR] Erro ao aguardar eventos: {e}")
+                time.sleep(1)
+                continue
+            if not sucesso:
+                print(f"[DEBUG] Eventos indisponíveis: {resposta}")
+                if topico_match and resposta == "Partida não encontrada":
+                    # A partida foi removida sem que o evento chegasse (ex.: reinício do servidor)
+                    self.eventos.put((topico_match, {"seq": seq_partida + 1, "tipo": "partida_removida"}))
+                    limite = time.monotonic() + 1
+                    while self.estado == "jogando" and self.match_id == topico_match and time.monotonic() < limite:
+                        time.sleep(0.01)
+                    continue
+                time.sleep(0.5)
+                continue
             
-            # Verifica se o jogo terminou
-            if self.match_id is not None:
-                game_over, winner = self.server.check_game_over(self.match_id)
-                if game_over:
-                    self.mensagem = f"Fim do jogo! {winner} venceu a partida!"
-                    self.estado = "resultado"
-                    print(f"[DEBUG] Fim do jogo detectado. Estado atual: {self.estado}")
-                    return True
+            if topico_match:
+                seq_partida = resposta["seq"]
             else:
-                print("[DEBUG] Partida não encontrada. Ignorando verificação de estado.")
-        except Exception as e:
-            print(f"[ERROR] Erro ao verificar estado da partida: {e}")
-        return False
+                self.seq_jogador = resposta["seq"]
+            for evento in resposta["eventos"]:
+                self.eventos.put((topico_match, evento))
+            if not resposta["eventos"]:
+                time.sleep(0.05) # Servidor sem long-poll (modo "simples"): a resposta vazia volta na hora
+            if not topico_match and any(evento["tipo"] == "partida_encontrada" for evento in resposta["eventos"]):
+                # Espera o loop principal entrar na partida para não voltar a escutar o lobby
+                limite = time.monotonic() + 1
+                while self.estado == "lobby" and time.monotonic() < limite:
+                    time.sleep(0.01)
+    
+    def processar_eventos(self):
+        """ Aplica os eventos recebidos do servidor sem bloquear o loop principal """
+        while True:
+            try:
+                match_id, evento = self.eventos.get_nowait()
+            except queue.Empty:
+                return
+            tipo = evento["tipo"]
+            print(f"[DEBUG] Evento recebido: {evento}")
+            
+            if tipo == "partida_encontrada":
+                if self.estado == "lobby":
+                    self.iniciar_partida(evento["match_id"])
+                continue
+            if match_id != self.match_id or self.estado != "jogando":
+                continue # Evento de uma partida que já não é a atual
+            self.versao_eventos = max(self.versao_eventos, evento["seq"])
+            if tipo == "jogada":
+                if evento["jogador"] == self.player_id:
+                    self.jogou = True
+                else:
+                    self.oponente_jogou = True
+            elif tipo == "rodada":
+                # Rodada resolvida: os dois podem jogar a próxima
+                self.jogou = self.oponente_jogou = False
+                self.sinc_partida() # Sincroniza o placar com o servidor
+            elif tipo == "partida_removida":
+                # O servidor encerrou a partida (oponente desconectado)
+                self.resetar_partida()
+                self.mensagem = "Partida encerrada: o oponente se desconectou"
+            elif tipo == "fim_de_jogo":
+                self.encerrar_partida(evento["vencedor"])
 
     def executar(self):
         """ Executa o loop principal do jogo """
         pygame.init()
         clock = pygame.time.Clock()
+        Thread(target=self.escutar_eventos, daemon=True).start()
+        Thread(target=self.trabalhar_rede, daemon=True).start()
         
         while True:
             for event in pygame.event.get():
@@ -337,23 +524,21 @@ class ClienteJogoGUI:
                     self.sair_do_jogo()
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     self.tratar_click(pygame.mouse.get_pos())
+                elif event.type == pygame.VIDEOEXPOSE:
+                    self.fundo_atual = None # A janela foi descoberta: redesenha tudo
             
-            # Verifica se uma partida foi encontrada
-            if self.estado == "lobby":
-                self.verificar_partida()
-            
-            # Verifica o estado da partida (placar, rodada atual, fim do jogo)
-            if self.estado == "jogando":
-                self.verificar_estado_partida()
+            # Partida encontrada, jogadas do oponente e fim do jogo chegam como eventos
+            self.processar_eventos()
+            self.processar_respostas()
                 
-            # Atualiza a tela
+            # Atualiza só as regiões da tela que mudaram
             self.atualizar_tela()
-            pygame.display.flip()
             clock.tick(60)
 
     def sair_do_jogo(self):
         print("[DEBUG] Saindo do jogo...")
         self.remove_new_game()
+        print(f"[DEBUG] Conexões com o servidor: {self.transporte.estatisticas()}")
         pygame.quit()
         print("[DEBUG] Jogo finalizado.")
         sys.exit()
@@ -394,24 +579,32 @@ class ClienteJogoGUI:
         if self.match_id is None:
             print("[DEBUG] Nenhuma partida encontrada ainda.")
             return
+        if self.jogou:
+            return # Uma jogada por rodada: espera o oponente
+        
+        match_id = self.match_id
+        
+        def ao_responder(resposta):
+            sucesso, message = resposta
+            print(f"[DEBUG] Resposta do servidor: sucesso={sucesso}, message={message}")
+            if match_id != self.match_id:
+                return # A partida terminou enquanto a jogada era enviada
+            if sucesso:
+                self.atualizar_jogo(message) # Atualiza o jogo
+                print(f"[DEBUG] Jogada feita com sucesso: sucesso={sucesso}, message={message}")
+            else:
+                self.mensagem = message
+                print(f"[ERROR] Erro ao fazer jogada: {message}")
         
         for opcao, rect in self.botoes_jogo.items():
             if rect.collidepoint(mouse_pos):
+                # Cliques enquanto a jogada anterior está a caminho são ignorados
+                jogada = lambda escolha=opcao: self.server_partida.make_move(self.player_id, match_id, escolha)
+                if not self.pedir("jogada", jogada, ao_responder, "Erro ao fazer jogada. Tente novamente."):
+                    print("[DEBUG] Jogada anterior ainda em andamento")
+                    return
                 self.escolha_atual = opcao
-                print(f"[DEBUG] Enviando jogada - player_id: {self.player_id}, match_id: {self.match_id}, escolha: {opcao}")
-                try:
-                    print(f"[DEBUG] Fazendo jogada: player_id={self.player_id}, match_id={self.match_id}, escolha={opcao}")
-                    sucesso, message = self.server.make_move(self.player_id, self.match_id, opcao)
-                    print(f"[DEBUG] Resposta do servidor: sucesso={sucesso}, message={message}")
-                    if sucesso:
-                        self.atualizar_jogo(message) # Atualiza o jogo
-                        print(f"[DEBUG] Jogada feita com sucesso: sucesso={sucesso}, message={message}")
-                    else:
-                        self.mensagem = message
-                        print(f"[ERROR] Erro ao fazer jogada: {message}")
-                except Exception as e:
-                    print(f"[ERROR] Exceção ao fazer jogada: {e}")
-                    self.mensagem = "Erro ao fazer jogada. Tente novamente."
+                print(f"[DEBUG] Enviando jogada - player_id: {self.player_id}, match_id: {match_id}, escolha: {opcao}")
     
     def atualizar_jogo(self, message):
         try:
@@ -428,69 +621,95 @@ class ClienteJogoGUI:
                 print(f"[DEBUG] Empate na rodada!")
             
             # Sincroniza o placar e a rodada com o servidor
-            self.sinc_placar()
-            self.sinc_rodada()
+            self.sinc_partida()
             
-            # Verifica se o jogo terminou
+            # O fim do jogo chega pelo evento fim_de_jogo ou pelo snapshot
             if self.verificar_fim_jogo():
-                self.estado = "resultado"
                 print(f"[DEBUG] Fim do jogo! Placar final: {self.placar_jogador} x {self.placar_oponente}")
         except Exception as e:
             print(f"[ERROR] Erro ao atualizar o jogo: {e}")
             self.mensagem = "Erro ao atualizar o jogo. Tente novamente."
     
-    def sinc_message(self):
-        # Sincroniza a mensagem com o servidor
-        success, message = self.server.get_message(self.player_id, self.match_id)
-        if success:
-            self.mensagem = message
-        else:
-            print(f"[ERROR] Erro ao sincronizar a mensagem: {message}")
+    def sinc_partida(self):
+        """ Sincroniza placar, rodada, mensagem e jogadas da rodada com uma única chamada ao servidor """
+        if self.match_id is None:
+            print("[DEBUG] Partida não encontrada. Ignorando sincronização.")
+            return
+        match_id, versao = self.match_id, self.versao_partida
+        # Um snapshot pedido enquanto outro está a caminho é buscado uma única vez, ao fim do atual
+        self.pedir("sinc", lambda: self.server_partida.get_match_snapshot(self.player_id, match_id, versao),
+                   lambda resposta: self.aplicar_snapshot(match_id, *resposta),
+                   "Erro ao sincronizar a partida", repetir=True)
     
-    def sinc_placar(self):
-        """ Sincroniza o placar com o servidor """
-        try:
-            success, scores = self.server.get_score(self.match_id)
-            if success:
-                # Verifica se o match_id é o mesmo da partida atual
-                if self.match_id is not None:
-                    self.placar_jogador = scores.get(str(self.player_id), 0)
-                    opponent_id = self.server.get_opponent_id(self.player_id, self.match_id)[1]
-                    self.placar_oponente = scores.get(str(opponent_id), 0)
-                    print(f"[DEBUG] Placar sincronizado: {scores}")
-                    self.sinc_rodada()
-                    print(f"[DEBUG] Rodada sincronizada: {self.rodada_atual}")
-                    self.sinc_message()
-                    print(f"[DEBUG] Mensagem sincronizada: {self.mensagem}")
-                else:
-                    print("[DEBUG] Partida não encontrada. Ignorando sincronização do placar.")
-            else:
-                print(f"[ERROR] Erro ao sincronizar o placar: {scores}")
-        except Exception as e:
-            print(f"[ERROR] Erro ao sincronizar o placar: {e}")
+    def aplicar_snapshot(self, match_id, success, snapshot):
+        """ Atualiza o estado local da partida com o snapshot recebido do servidor """
+        if match_id != self.match_id:
+            return # Resposta de uma partida que já não é a atual
+        if not success:
+            print(f"[ERROR] Erro ao sincronizar a partida: {snapshot}")
+            return
+        if "placar" not in snapshot:
+            return # Nada mudou desde a versão que já temos
+        if snapshot["versao"] < self.versao_eventos:
+            # Snapshot pedido antes de eventos que já foram aplicados: busca um mais novo
+            self.sinc_partida()
+            return
         
-    def sinc_rodada(self):
-        # Sincroniza a rodada atual com o servidor
-        success, round_number = self.server.get_round(self.match_id)
-        if success:
-            self.rodada_atual = round_number
-        else:
-            print(f"[ERROR] Erro ao sincronizar a rodada: {round_number}")
+        self.versao_partida = snapshot["versao"]
+        if "regras" in snapshot:
+            # Enviadas só no primeiro snapshot da partida: não mudam até o fim
+            self.posicionar_botoes(snapshot["regras"]["opcoes"])
+        self.oponente_id = snapshot["oponente"]
+        self.placar_jogador = snapshot["placar"].get(str(self.player_id), 0)
+        self.placar_oponente = snapshot["placar"].get(str(self.oponente_id), 0)
+        self.rodada_atual = snapshot["rodada"]
+        if self.estado == "jogando":
+            self.mensagem = snapshot["mensagem"] # Na tela de resultado fica a mensagem do fim do jogo
+        self.jogou = snapshot["jogou"]
+        self.oponente_jogou = snapshot["oponente_jogou"]
+        if not self.jogou:
+            self.escolha_atual = None # Rodada nova: nenhum botão destacado
+        if snapshot["fim_de_jogo"]:
+            self.encerrar_partida(snapshot["vencedor"]) # Fim de jogo cujo evento ainda não chegou
+        print(f"[DEBUG] Partida sincronizada (versão {self.versao_partida}): {snapshot['placar']}")
+    
+    def iniciar_partida(self, match_id):
+        """ Entra na partida encontrada, buscando uma única vez os dados que não mudam """
+        if self.match_id is not None:
+            return # Já entrou nesta partida (evento repetido)
+        self.match_id = int(match_id)
+        # A thread de eventos espera a partida ser localizada antes de escutá-la
+        self.conexao_partida = None
+        self.pedir(f"localizar:{self.match_id}", lambda match_id=self.match_id: self.localizar_partida(match_id))
+        self.estado = "jogando"
+        self.mensagem = ""
+        self.sinc_partida()
+        print(f"[DEBUG] Partida encontrada: {match_id}, Estado atual: {self.estado}")
     
-    def verificar_partida(self):
-        print("[DEBUG] Procurando partida...")
+    def localizar_partida(self, match_id):
+        """ Descobre qual servidor atende a partida (com shards, ela não fica no roteador)
+
+        Executado na thread de rede, antes dos demais pedidos da partida.
+        """
+        self.server_partida = self.server
         try:
-            sucesso, match_id = self.server.find_match(self.player_id)
-            if sucesso:
-                self.match_id = int(match_id)
-                self.estado = "jogando"
-                self.server.remove_waiting_list(self.player_id)
-                self.mensagem = ""
-                print(f"[DEBUG] Partida encontrada: {match_id}, Estado atual: {self.estado}")
-            else:
-                print(f"[DEBUG] Nenhuma partida encontrada. Estado atual: {self.estado}")
+            success, endereco = self.server.locate_match(match_id)
         except Exception as e:
-            print(f"[ERROR] Erro ao encontrar partida: {e}")
+            print(f"[ERROR] Erro ao localizar a partida: {e}")
+            success, endereco = False, None
+        if not success or not endereco:
+            self.conexao_partida = self.conexao # A própria conexão atende a partida
+            return
+        
+        _, _, protocolo, transporte = self.conexao
+        if protocolo == "binario" and endereco["porta_binaria"]:
+            conexao_partida = (endereco["ip"], endereco["porta_binaria"], protocolo, transporte)
+        else:
+            conexao_partida = (endereco["ip"], endereco["porta"], "xmlrpc", transporte)
+        # O proxy vem antes: a thread de eventos passa a escutar a partida quando a conexão é definida
+        self.server_partida = conectar(*conexao_partida)
+        self.conexao_partida = conexao_partida
+        print(f"[DEBUG] Partida {match_id} atendida por {conexao_partida[0]}:{conexao_partida[1]}")
     
     def atualizar_tela(self):
         """ Atualiza a tela com base no estado atual do jogo """
@@ -513,6 +732,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--ip', default='localhost', help='IP do servidor')
     parser.add_argument('--porta', type=int, default=8080, help='Porta do servidor')
+    parser.add_argument('--protocolo', choices=['xmlrpc', 'binario'], default='xmlrpc',
+                        help='Protocolo de comunicação (a porta deve ser a do protocolo escolhido)')
     args = parser.parse_args()
     
     # Configuração inicial
@@ -520,17 +741,15 @@ if __name__ == "__main__":
     porta = args.porta
     
     print("[DEBUG] Iniciando cliente...")
-    print(f"[DEBUG] Conectando ao servidor: {ip}:{porta}")
-    server_url = f"http://{ip}:{porta}/"
-    server = rpc.ServerProxy(server_url, allow_none=True)
+    print(f"[DEBUG] Conectando ao servidor: {ip}:{porta} ({args.protocolo})")
     
     # Inicia o cliente com interface gráfica
-    cliente = ClienteJogoGUI(args.ip, args.porta)
+    cliente = ClienteJogoGUI(args.ip, args.porta, args.protocolo)
     
     try:
         # Testar conexão com o servidor
         print("[DEBUG] Testando conexão com o servidor...")
-        response = server.system.listMethods()
+        response = cliente.server.system.listMethods()
         print("[DEBUG] Conexão estabelecida com sucesso")
         print(f"[DEBUG] Métodos disponíveis: {response}")
     except Exception as e:
@@ -0,0 +1,286 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Partidas divididas entre vários processos (shards) com um roteador de matchmaking.
+
+Cada shard é um processo com seu próprio `GameServer`, escutando em uma porta
+local. Os IDs de partida são alocados com `AlocadorIds(indice, total)`, então a
+partida `match_id` sempre pertence ao shard `match_id % total`, sem tabela de
+roteamento.
+
+O roteador roda no processo principal e atende o lobby (`register_player`,
+`add_to_waiting_list`, `find_match` e `wait_for_event` com `match_id` 0). Ao
+formar um par, ele cria a partida no próximo shard (round-robin) e o cliente
+descobre com `locate_match` para onde enviar as chamadas da partida. As
+chamadas aos shards são feitas sem o lock do roteador: um shard lento atrasa
+só os jogadores das suas partidas, e não o lobby inteiro.
+"""
+
+import itertools
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import xmlrpc.client
+
+from history import Historico
+from http_transport import TransportePersistente
+from journal import Diario
+from logger import configurar_logs, obter_logger
+from server import GameServer, criar_servidor, iniciar_protocolo_binario, sincronizado
+
+log = obter_logger("cluster")
+
+
+class MatchRouter(GameServer):
+    """`GameServer` que mantém apenas o lobby e cria as partidas nos shards.
+
+    Args:
+        shards (list): Endereços dos shards, na ordem dos índices, como dicts
+            `{"ip": str, "porta": int, "porta_binaria": int}` (0 = sem protocolo binário).
+    """
+
+    def __init__(self, shards):
+        super().__init__()
+        self.shards = shards
+        # O transporte mantém uma conexão keep-alive por thread com cada shard
+        self._proxies = [
+            xmlrpc.client.ServerProxy(f"http://{shard['ip']}:{shard['porta']}/",
+                                      transport=TransportePersistente(timeout=10))
+            for shard in shards
+        ]
+        self._proximo_shard = itertools.cycle(range(len(shards)))
+        self._pares_pendentes = []  # Pares já tirados da fila, aguardando a criação da partida no shard
+        self._pareando = set()  # Jogadores desses pares: não voltam para a fila enquanto isso
+
+    def add_to_waiting_list(self, player_id):
+        """Como `GameServer.add_to_waiting_list`; as partidas formadas são criadas nos shards
+        depois que o lock é liberado."""
+        with self._lock:
+            if player_id in self._pareando:
+                return True, "Aguardando mais jogadores"
+            resultado = super().add_to_waiting_list(player_id)
+        self._criar_partidas()
+        return resultado
+
+    def _parear_jogadores(self):
+        """Só tira os pares da fila (chamado com o lock); `_criar_partidas` cria as partidas."""
+        while True:
+            par = self.waiting_list.parear()
+            if par is None:
+                return
+            self._pares_pendentes.append(par)
+            self._pareando.update(par)
+
+    def _criar_partidas(self):
+        """Cria nos shards as partidas dos pares pendentes, sem o lock durante as chamadas."""
+        while True:
+            with self._lock:
+                if not self._pares_pendentes:
+                    return
+                player1, player2 = self._pares_pendentes.pop()
+            criada = self._iniciar_partida(player1, player2) is not None
+            with self._lock:
+                self._pareando.difference_update((player1, player2))
+                if not criada:
+                    # Não foi possível criar a partida: os dois voltam para a fila
+                    self.waiting_list.entrar(player1)
+                    self.waiting_list.entrar(player2)
+                    return
+
+    def add_match(self, player1, player2, variant="", best_of=0):
+        """Cria a partida no próximo shard e guarda o ID para o `find_match`.
+        Args:
+            player1 (str): ID do primeiro jogador.
+            player2 (str): ID do segundo jogador.
+            variant (str): Variante do jogo (vazio = a do roteador).
+            best_of (int): Partida em melhor de N rodadas (0 = o do roteador).
+        Returns:
+            tuple: Um valor booleano indicando sucesso e o ID da partida (ou a mensagem de erro).
+        """
+        with self._lock:
+            indice = next(self._proximo_shard)
+            # As regras vão explícitas: o shard não precisa ter as mesmas opções do roteador
+            variante, melhor_de = variant or self.regras.variante, best_of or self.regras.melhor_de
+        try:
+            sucesso, match_id = self._proxies[indice].add_match(player1, player2, variante, melhor_de)
+        except (OSError, xmlrpc.client.Error) as e:
+            log.error("Shard %s indisponível: %s", indice, e)
+            return False, "Servidor de partidas indisponível"
+        if not sucesso:
+            return False, match_id
+        with self._lock:
+            self.player_match[player1] = match_id
+            self.player_match[player2] = match_id
+        return True, match_id
+
+    def find_match(self, player_id):
+        """Como `GameServer.find_match`, mas confirma com o shard que a partida ainda existe.
+
+        O roteador não fica sabendo quando o shard remove uma partida: se o shard
+        responder que ela não existe mais, a associação do jogador é apagada.
+        """
+        sucesso, match_id = super().find_match(player_id)
+        if not sucesso:
+            return sucesso, match_id
+        try:
+            existe, mensagem = self._proxies[match_id % len(self.shards)].check_game_over(match_id)
+        except (OSError, xmlrpc.client.Error):
+            return True, match_id  # Shard indisponível: o cliente descobre ao chamar a partida
+        if not existe and mensagem == "Partida não encontrada":
+            with self._lock:
+                if self.player_match.get(player_id) == match_id:
+                    del self.player_match[player_id]
+                    self.players.get(player_id, {})["in_game"] = False
+            return False, "Aguardando mais jogadores"
+        return True, match_id
+
+    @sincronizado
+    def locate_match(self, match_id):
+        """Informa qual shard atende a partida.
+        Args:
+            match_id (int): ID da partida.
+        Returns:
+            tuple: (True, {"ip", "porta", "porta_binaria"}) do shard responsável.
+        """
+        return True, self.shards[match_id % len(self.shards)]
+
+    @sincronizado
+    def create_tournament(self, kind, rounds, variant="", best_of=0):
+        """Torneios não são suportados com shards: o fim de cada partida só é visto pelo shard."""
+        return False, "Torneios não são suportados com shards"
+
+    @sincronizado
+    def _topico_eventos(self, player_id, match_id):
+        if match_id:
+            return False, "Partida atendida por outro servidor (veja locate_match)"
+        return True, f"jogador:{player_id}"
+
+    def _expirar_inativos(self, agora=None):
+        """Como `GameServer._expirar_inativos`, mas sem esquecer quem está jogando em um shard.
+
+        Durante a partida o cliente só conversa com o shard, então o roteador não
+        recebe contato do jogador. Antes da passagem, os jogadores inativos cuja
+        partida o shard ainda atende (ou que não puderam ser confirmados porque o
+        shard está indisponível) têm o contato renovado. As consultas aos shards
+        são feitas sem o lock, como em `find_match`.
+        """
+        agora = time.monotonic() if agora is None else agora
+        ttls = [ttl for ttl in (self.ttl_fila, self.ttl_partida, self.ttl_jogador) if ttl]
+        if not ttls:
+            return super()._expirar_inativos(agora)
+        limite = agora - min(ttls)
+        jogando = {}  # match_id -> jogadores inativos associados a ela
+        with self._lock:
+            for player_id, visto in self.ultimo_contato.items():
+                if visto > limite:
+                    break
+                match_id = self.player_match.get(player_id)
+                if match_id is not None:
+                    jogando.setdefault(match_id, []).append(player_id)
+        renovar = []
+        for match_id, jogadores in jogando.items():
+            try:
+                _, mensagem = self._proxies[match_id % len(self.shards)].check_game_over(match_id)
+            except (OSError, xmlrpc.client.Error):
+                mensagem = None  # Na dúvida o jogador é mantido
+            if mensagem != "Partida não encontrada":
+                renovar.extend((player_id, match_id) for player_id in jogadores)
+        with self._lock:
+            for player_id, match_id in renovar:
+                if self.player_match.get(player_id) == match_id:
+                    self._visto(player_id, agora)
+        return super()._expirar_inativos(agora)
+
+
+def _vigiar_roteador(pid_roteador):
+    """Encerra o shard se o roteador morrer sem avisar (ex.: `kill -9`)."""
+    while os.getppid() == pid_roteador:
+        time.sleep(1)
+    os._exit(0)
+
+
+def _rodar_shard(ip, porta, porta_binaria, modo, max_threads, indice, total, ttls, persistencia, historico,
+                 intervalo_rodadas, log_nivel, log_amostragem):
+    """Ponto de entrada de cada processo shard."""
+    threading.Thread(target=_vigiar_roteador, args=(os.getppid(),), daemon=True).start()
+    # O roteador encerra os shards com SIGTERM: sai pelo `finally` para gravar o que estiver pendente
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    configurar_logs(log_nivel, log_amostragem)
+    diario = None
+    if persistencia:
+        diretorio, intervalo_fsync, registros_por_snapshot = persistencia
+        diario = Diario(os.path.join(diretorio, f"shard-{indice}"), intervalo_fsync, registros_por_snapshot)
+    historico = Historico(historico) if historico else None
+    servidor = criar_servidor(ip, porta, modo, max_threads, indice, total, ttls=ttls, diario=diario,
+                              historico=historico, intervalo_rodadas=intervalo_rodadas)
+    if porta_binaria:
+        iniciar_protocolo_binario(ip, porta_binaria, servidor.instance)
+    log.info("Shard %s/%s escutando em %s:%s", indice, total, ip, porta)
+    try:
+        servidor.serve_forever()
+    finally:
+        if diario is not None:
+            diario.fechar()
+        if historico is not None:
+            historico.fechar()
+
+
+def _aguardar_shard(ip, porta, timeout=10.0):
+    """Espera o shard aceitar chamadas, para o roteador não parear jogadores antes da hora."""
+    limite = time.monotonic() + timeout
+    proxy = xmlrpc.client.ServerProxy(f"http://{ip}:{porta}/")
+    while True:
+        try:
+            proxy.system.listMethods()
+            return
+        except OSError:
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.05)
+
+
+def iniciar_shards(ip, porta_base, total, modo="threads", max_threads=32, binario=False, ttls=None,
+                   persistencia=None, historico="", intervalo_rodadas=0, log_nivel="info", log_amostragem=0.01):
+    """Inicia `total` processos shard em portas consecutivas a partir de `porta_base`.
+
+    O shard `i` escuta XML-RPC em `porta_base + 2*i` e, com `binario`, o
+    protocolo binário em `porta_base + 2*i + 1`.
+    Args:
+        ip (str): IP em que os shards vão escutar.
+        porta_base (int): Primeira porta usada pelos shards.
+        total (int): Quantidade de shards.
+        modo (str): Modo de concorrência de cada shard (ver `server.criar_servidor`).
+        max_threads (int): Tamanho do pool no modo "threads".
+        binario (bool): Se os shards também servem o protocolo binário.
+        ttls (tuple): TTLs (fila, partida, jogador) do coletor de inativos de cada shard.
+        persistencia (tuple): (pasta, intervalo_fsync, registros_por_snapshot) do diário; cada
+            shard grava em `pasta/shard-<i>`. None desativa.
+        historico (str): Arquivo SQLite do histórico, compartilhado por todos os shards (vazio desativa).
+        intervalo_rodadas (float): Intervalo do lote de resolução de rodadas de cada shard (0 desativa).
+        log_nivel (str): Nível dos logs dos shards.
+        log_amostragem (float): Fração mantida dos logs amostráveis.
+    Returns:
+        tuple: A lista de endereços para o `MatchRouter` e a lista de processos.
+    """
+    # "spawn" evita herdar threads (logs, pool) do processo do roteador
+    contexto = multiprocessing.get_context("spawn")
+    enderecos = []
+    processos = []
+    for indice in range(total):
+        porta = porta_base + 2 * indice
+        porta_binaria = porta + 1 if binario else 0
+        processo = contexto.Process(
+            target=_rodar_shard, name=f"shard-{indice}", daemon=True,
+            args=(ip, porta, porta_binaria, modo, max_threads, indice, total, ttls, persistencia, historico,
+                  intervalo_rodadas, log_nivel, log_amostragem))
+        processo.start()
+        processos.append(processo)
+        enderecos.append({"ip": ip, "porta": porta, "porta_binaria": porta_binaria})
+    for endereco in enderecos:
+        _aguardar_shard(endereco["ip"], endereco["porta"])
+    return enderecos, processos
@@ -0,0 +1,139 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class EventBus:
+    """Canal de eventos do servidor, organizado por tópicos.
+
+    Cada tópico (por exemplo "partida:3" ou "jogador:1234") possui um número de
+    sequência crescente e um histórico curto dos últimos eventos. Os clientes
+    informam a última sequência que já processaram e só são acordados quando
+    algo novo é publicado naquele tópico (long-poll).
+
+    A espera pode ser feita por threads (`aguardar`) ou por corrotinas asyncio
+    (`aguardar_async`), que não ocupam uma thread enquanto esperam.
+    """
+
+    def __init__(self, historico=32):
+        self._lock = threading.Lock()
+        self._topicos = {}  # topico -> [seq, deque de eventos, Condition, futuros asyncio ou None]
+        self.historico = historico  # Quantidade de eventos mantidos por tópico
+
+    def _topico(self, topico):
+        entrada = self._topicos.get(topico)
+        if entrada is None:
+            entrada = [0, deque(maxlen=self.historico), threading.Condition(self._lock), None]
+            self._topicos[topico] = entrada
+        return entrada
+
+    def publicar(self, topico, tipo, **dados):
+        """Publica um evento em um tópico e acorda quem estiver aguardando.
+        Args:
+            topico (str): Nome do tópico.
+            tipo (str): Tipo do evento ("partida_encontrada", "jogada", ...).
+            **dados: Campos adicionais do evento.
+        Returns:
+            int: O número de sequência atribuído ao evento.
+        """
+        with self._lock:
+            entrada = self._topico(topico)
+            entrada[0] += 1
+            evento = {"seq": entrada[0], "tipo": tipo}
+            evento.update(dados)
+            entrada[1].append(evento)
+            self._acordar(entrada)
+            return entrada[0]
+
+    @staticmethod
+    def _acordar(entrada):
+        entrada[2].notify_all()
+        if entrada[3]:
+            for loop, futuro in entrada[3]:
+                loop.call_soon_threadsafe(_concluir, futuro)
+            entrada[3] = None
+
+    def sequencia(self, topico):
+        """Retorna a sequência atual de um tópico (0 se nada foi publicado)."""
+        with self._lock:
+            entrada = self._topicos.get(topico)
+            return entrada[0] if entrada is not None else 0
+
+    @staticmethod
+    def _eventos_desde(entrada, ultima_seq):
+        if entrada is None or entrada[0] == ultima_seq:
+            return ultima_seq if entrada is None else entrada[0], []
+        if entrada[0] < ultima_seq:
+            # O tópico foi descartado e recriado: a sequência recomeçou do zero
+            return (entrada[0], list(entrada[1])) if entrada[1] else (ultima_seq, [])
+        return entrada[0], [e for e in entrada[1] if e["seq"] > ultima_seq]
+
+    def eventos_desde(self, topico, ultima_seq):
+        """Retorna, sem bloquear, os eventos publicados depois de `ultima_seq`.
+        Returns:
+            tuple: A sequência atual do tópico e a lista de eventos novos.
+        """
+        with self._lock:
+            return self._eventos_desde(self._topicos.get(topico), ultima_seq)
+
+    def aguardar(self, topico, ultima_seq, timeout):
+        """Bloqueia até haver eventos depois de `ultima_seq` ou o tempo acabar.
+        Args:
+            topico (str): Nome do tópico.
+            ultima_seq (int): Última sequência já processada pelo cliente.
+            timeout (float): Tempo máximo de espera, em segundos.
+        Returns:
+            tuple: A sequência atual do tópico e a lista de eventos novos
+            (vazia se o tempo acabou sem novidades).
+        """
+        limite = time.monotonic() + timeout
+        with self._lock:
+            entrada = self._topico(topico)
+            while True:
+                # Lê da entrada e não do nome: o último evento de um tópico descartado
+                # durante a espera (ex.: "partida_removida") ainda chega a quem esperava
+                seq, eventos = self._eventos_desde(entrada, ultima_seq)
+                restante = limite - time.monotonic()
+                # Um tópico descartado durante a espera também encerra o long-poll
+                if eventos or restante <= 0 or self._topicos.get(topico) is not entrada:
+                    return seq, eventos
+                entrada[2].wait(restante)
+
+    async def aguardar_async(self, topico, ultima_seq, timeout):
+        """Versão asyncio de `aguardar`: espera sem bloquear a thread do event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            seq, eventos = self._eventos_desde(self._topicos.get(topico), ultima_seq)
+            if eventos or timeout <= 0:
+                return seq, eventos
+            entrada = self._topico(topico)
+            futuro = loop.create_future()
+            if entrada[3] is None:
+                entrada[3] = []
+            entrada[3].append((loop, futuro))
+        try:
+            await asyncio.wait_for(futuro, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if entrada[3]:
+                    entrada[3] = [(l, f) for l, f in entrada[3] if f is not futuro] or None
+        with self._lock:
+            return self._eventos_desde(entrada, ultima_seq)
+
+    def descartar(self, topico):
+        """Remove um tópico que não será mais usado, acordando quem o aguardava."""
+        with self._lock:
+            entrada = self._topicos.pop(topico, None)
+            if entrada is not None:
+                self._acordar(entrada)
+
+
+def _concluir(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
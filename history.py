@@ -0,0 +1,238 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Histórico de partidas encerradas e ranking de jogadores, em SQLite.
+
+Quando uma partida termina, o servidor entrega o resultado (jogadores, placar,
+escolhas de cada rodada e duração) para o `Historico`, que só o coloca em uma
+fila. Uma thread escritora grava tudo o que se acumulou em uma única transação,
+fora do caminho das requisições.
+
+O banco usa o modo WAL: as leituras (`historico_jogador` e `ranking`) não
+esperam as escritas, e vários processos (os shards) podem gravar no mesmo
+arquivo. As consultas só percorrem índices:
+    - `participacoes (jogador, fim, partida)`: últimas partidas de um jogador;
+    - `ranking`: vitórias e derrotas de cada jogador, atualizadas a cada partida,
+      com índice por vitórias; o top-N lê N entradas do índice, sem somar o histórico.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+from logger import obter_logger
+
+log = obter_logger("historico")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS partidas (
+    id INTEGER PRIMARY KEY,
+    match_id INTEGER NOT NULL,
+    jogador1 INTEGER NOT NULL,
+    jogador2 INTEGER NOT NULL,
+    vencedor INTEGER NOT NULL,
+    placar1 INTEGER NOT NULL,
+    placar2 INTEGER NOT NULL,
+    inicio REAL NOT NULL,
+    fim REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rodadas (
+    partida INTEGER NOT NULL,
+    numero INTEGER NOT NULL,
+    escolha1 TEXT NOT NULL,
+    escolha2 TEXT NOT NULL,
+    vencedor INTEGER,
+    PRIMARY KEY (partida, numero)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS participacoes (
+    jogador INTEGER NOT NULL,
+    fim REAL NOT NULL,
+    partida INTEGER NOT NULL,
+    PRIMARY KEY (jogador, fim, partida)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ranking (
+    jogador INTEGER PRIMARY KEY,
+    vitorias INTEGER NOT NULL DEFAULT 0,
+    derrotas INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ranking_vitorias ON ranking (vitorias DESC, derrotas, jogador);
+"""
+
+_PARAR = object()
+
+
+class Historico:
+    """Grava as partidas encerradas e responde às consultas de histórico e ranking.
+
+    Args:
+        caminho (str): Arquivo do banco SQLite (criado se não existir).
+        intervalo (float): Tempo mínimo entre duas transações de escrita (segundos).
+
+    Exemplo:
+        historico = Historico("historico.db")
+        historico.iniciar()
+        historico.registrar(7, 1, 2, 1, 3, 1, inicio, fim, [("pedra", "tesoura", 1), ...])
+        historico.ranking(10)
+    """
+
+    def __init__(self, caminho, intervalo=0.05):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self._fila = queue.SimpleQueue()
+        self._leitura = threading.local()  # Uma conexão de leitura por thread
+        self._thread = None
+        self.partidas = 0  # Partidas gravadas por este processo
+        self.lotes = 0  # Transações de escrita
+        conexao = self._conectar()
+        try:
+            conexao.executescript(_ESQUEMA)
+        finally:
+            conexao.close()
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, isolation_level=None, check_same_thread=False)
+        # Espera em vez de falhar quando outro processo (shard) está gravando
+        conexao.execute("PRAGMA busy_timeout = 5000")
+        conexao.execute("PRAGMA journal_mode = WAL")
+        # Em WAL, NORMAL só sincroniza o disco nos checkpoints; uma queda perde no máximo as
+        # últimas transações, nunca corrompe o banco
+        conexao.execute("PRAGMA synchronous = NORMAL")
+        return conexao
+
+    def _conexao_leitura(self):
+        conexao = getattr(self._leitura, "conexao", None)
+        if conexao is None:
+            conexao = self._leitura.conexao = self._conectar()
+        return conexao
+
+    def registrar(self, match_id, jogador1, jogador2, vencedor, placar1, placar2, inicio, fim, rodadas):
+        """Enfileira uma partida encerrada para gravação.
+        Args:
+            match_id (int): ID da partida no servidor.
+            jogador1 (int): ID do primeiro jogador.
+            jogador2 (int): ID do segundo jogador.
+            vencedor (int): ID do vencedor da partida.
+            placar1 (int): Rodadas vencidas pelo primeiro jogador.
+            placar2 (int): Rodadas vencidas pelo segundo jogador.
+            inicio (float): Instante de criação da partida (time.time()).
+            fim (float): Instante em que a partida terminou (time.time()).
+            rodadas (list): Tuplas (escolha1, escolha2, vencedor ou None no empate), em ordem.
+        """
+        self._fila.put((match_id, jogador1, jogador2, vencedor, placar1, placar2, inicio, fim, rodadas))
+
+    def estatisticas(self):
+        return {
+            "historico_partidas_total": self.partidas,
+            "historico_lotes_total": self.lotes,
+            "historico_pendentes": self._fila.qsize(),
+        }
+
+    def iniciar(self):
+        """Inicia a thread escritora (processos que só consultam não precisam dela)."""
+        self._thread = threading.Thread(target=self._escrever, name="historico", daemon=True)
+        self._thread.start()
+
+    def fechar(self):
+        """Grava o que estiver pendente e encerra a thread escritora."""
+        if self._thread is not None:
+            self._fila.put(_PARAR)
+            self._thread.join()
+            self._thread = None
+
+    def _escrever(self):
+        conexao = self._conectar()
+        while True:
+            lote = [self._fila.get()]  # Espera a primeira partida
+            while True:  # Junta tudo o que já estiver na fila
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            parar = _PARAR in lote
+            lote = [partida for partida in lote if partida is not _PARAR]
+            if lote:
+                try:
+                    self._gravar(conexao, lote)
+                except sqlite3.Error:
+                    log.exception("Falha ao gravar %s partidas no histórico", len(lote))
+            if parar:
+                conexao.close()
+                return
+            time.sleep(self.intervalo)  # As partidas encerradas nesse meio tempo vão na próxima transação
+
+    def _gravar(self, conexao, lote):
+        """Grava o lote em uma única transação."""
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            for match_id, jogador1, jogador2, vencedor, placar1, placar2, inicio, fim, rodadas in lote:
+                cursor = conexao.execute(
+                    "INSERT INTO partidas (match_id, jogador1, jogador2, vencedor, placar1, placar2, inicio, fim)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (match_id, jogador1, jogador2, vencedor, placar1, placar2, inicio, fim))
+                partida = cursor.lastrowid
+                conexao.executemany(
+                    "INSERT INTO rodadas (partida, numero, escolha1, escolha2, vencedor) VALUES (?, ?, ?, ?, ?)",
+                    [(partida, numero, *rodada) for numero, rodada in enumerate(rodadas, 1)])
+                conexao.executemany(
+                    "INSERT INTO participacoes (jogador, fim, partida) VALUES (?, ?, ?)",
+                    [(jogador1, fim, partida), (jogador2, fim, partida)])
+                perdedor = jogador2 if vencedor == jogador1 else jogador1
+                conexao.execute(
+                    "INSERT INTO ranking (jogador, vitorias) VALUES (?, 1)"
+                    " ON CONFLICT (jogador) DO UPDATE SET vitorias = vitorias + 1", (vencedor,))
+                conexao.execute(
+                    "INSERT INTO ranking (jogador, derrotas) VALUES (?, 1)"
+                    " ON CONFLICT (jogador) DO UPDATE SET derrotas = derrotas + 1", (perdedor,))
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        self.partidas += len(lote)
+        self.lotes += 1
+
+    def historico_jogador(self, player_id, limite=10):
+        """Retorna as últimas partidas do jogador, da mais recente para a mais antiga.
+        Args:
+            player_id (int): ID do jogador.
+            limite (int): Quantidade máxima de partidas.
+        Returns:
+            list: Dicionários com oponente, vencedor, placar, início, duração e rodadas.
+        """
+        conexao = self._conexao_leitura()
+        partidas = conexao.execute(
+            "SELECT p.id, p.match_id, p.jogador1, p.jogador2, p.vencedor, p.placar1, p.placar2, p.inicio, p.fim"
+            " FROM participacoes AS j JOIN partidas AS p ON p.id = j.partida"
+            " WHERE j.jogador = ? ORDER BY j.fim DESC, j.partida DESC LIMIT ?",
+            (player_id, limite)).fetchall()
+        resultado = []
+        for id_, match_id, jogador1, jogador2, vencedor, placar1, placar2, inicio, fim in partidas:
+            rodadas = conexao.execute(
+                "SELECT escolha1, escolha2, vencedor FROM rodadas WHERE partida = ? ORDER BY numero",
+                (id_,)).fetchall()
+            resultado.append({
+                "match_id": match_id,
+                "oponente": jogador2 if player_id == jogador1 else jogador1,
+                "vencedor": vencedor,
+                "placar": {str(jogador1): placar1, str(jogador2): placar2},
+                "inicio": inicio,
+                "duracao": round(fim - inicio, 3),
+                # O vencedor fica "" nas rodadas empatadas (XML-RPC não transmite None)
+                "rodadas": [{"escolhas": {str(jogador1): escolha1, str(jogador2): escolha2},
+                             "vencedor": "" if vencedor_rodada is None else vencedor_rodada}
+                            for escolha1, escolha2, vencedor_rodada in rodadas],
+            })
+        return resultado
+
+    def ranking(self, limite=10):
+        """Retorna os `limite` jogadores com mais vitórias (desempate: menos derrotas).
+        Returns:
+            list: Dicionários com posição, jogador, vitórias e derrotas.
+        """
+        linhas = self._conexao_leitura().execute(
+            "SELECT jogador, vitorias, derrotas FROM ranking"
+            " ORDER BY vitorias DESC, derrotas, jogador LIMIT ?", (limite,)).fetchall()
+        return [{"posicao": posicao, "jogador": jogador, "vitorias": vitorias, "derrotas": derrotas}
+                for posicao, (jogador, vitorias, derrotas) in enumerate(linhas, 1)]
@@ -0,0 +1,69 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+import http.client
+import threading
+import xmlrpc.client
+
+from binary_protocol import ClienteBinario
+
+
+class TransportePersistente(xmlrpc.client.Transport):
+    """Transporte XML-RPC que reaproveita a conexão HTTP/1.1 entre chamadas (keep-alive).
+
+    Cada thread tem sua própria conexão no pool, então o mesmo transporte pode
+    ser compartilhado por vários `ServerProxy` usados em threads diferentes.
+    Os contadores mostram quantas chamadas reaproveitaram uma conexão aberta.
+    """
+
+    def __init__(self, timeout=None, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout  # Timeout do socket, em segundos (None = sem limite)
+        self._local = threading.local()
+        self._lock_contadores = threading.Lock()
+        self.conexoes_abertas = 0  # Conexões TCP estabelecidas
+        self.requisicoes = 0  # Chamadas feitas
+
+    def make_connection(self, host):
+        atual = getattr(self._local, "conexao", None)
+        if atual is not None and atual[0] == host:
+            conexao = atual[1]
+        else:
+            chost, self._extra_headers, x509 = self.get_host_info(host)
+            conexao = http.client.HTTPConnection(chost, timeout=self.timeout)
+            self._local.conexao = (host, conexao)
+        with self._lock_contadores:
+            self.requisicoes += 1
+            if conexao.sock is None:
+                # O HTTPConnection abre o socket sozinho na próxima requisição
+                self.conexoes_abertas += 1
+        return conexao
+
+    def close(self):
+        atual = getattr(self._local, "conexao", None)
+        if atual is not None:
+            self._local.conexao = None
+            atual[1].close()
+
+    def estatisticas(self):
+        """Retorna os contadores de conexões e de chamadas que reaproveitaram uma conexão."""
+        with self._lock_contadores:
+            return {
+                "requisicoes": self.requisicoes,
+                "conexoes": self.conexoes_abertas,
+                "reutilizadas": self.requisicoes - self.conexoes_abertas,
+            }
+
+
+def conectar(servidor_ip, servidor_porta, protocolo="xmlrpc", transporte=None):
+    """Cria um proxy para o servidor no protocolo escolhido ("xmlrpc" ou "binario").
+
+    Usado pelo cliente gráfico e pelos bots. No XML-RPC, sem `transporte` o proxy
+    ganha um `TransportePersistente` próprio.
+    """
+    if protocolo == "binario":
+        return ClienteBinario(servidor_ip, servidor_porta)
+    return xmlrpc.client.ServerProxy(f"http://{servidor_ip}:{servidor_porta}/",
+                                     transport=transporte or TransportePersistente())
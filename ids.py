@@ -0,0 +1,45 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+import itertools
+
+MAXIMO_ID = 2**31 - 1  # Maior inteiro que o XML-RPC consegue transmitir
+
+
+class AlocadorIds:
+    """Gera IDs de partida únicos e crescentes, sem reaproveitar IDs liberados.
+
+    Vários servidores podem alocar IDs sem se coordenar: o servidor `no` (de
+    `total_nos`) só gera IDs com `id % total_nos == no`. Assim o próprio ID diz
+    qual servidor é dono da partida.
+
+    A alocação não usa lock: `next` em um `itertools.count` é atômico no CPython.
+    """
+
+    def __init__(self, no=0, total_nos=1):
+        if total_nos < 1 or not 0 <= no < total_nos:
+            raise ValueError(f"Nó {no} inválido para {total_nos} nó(s)")
+        self.no = no
+        self.total_nos = total_nos
+        self._contador = itertools.count(1)
+        self.ultimo = 0  # Último ID alocado (0 se nenhum)
+
+    def proximo(self):
+        """Retorna o próximo ID livre deste nó."""
+        match_id = next(self._contador) * self.total_nos + self.no
+        if match_id > MAXIMO_ID:
+            raise OverflowError("IDs de partida esgotados para este nó")
+        self.ultimo = match_id
+        return match_id
+
+    def reservar_ate(self, match_id):
+        """Garante que os próximos IDs sejam maiores que `match_id` (usado ao recuperar partidas)."""
+        if match_id > self.ultimo:
+            self._contador = itertools.count(match_id // self.total_nos + 1)
+            self.ultimo = match_id
+
+    def no_do_id(self, match_id):
+        """Retorna o nó que alocou o ID informado."""
+        return match_id % self.total_nos
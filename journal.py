@@ -0,0 +1,330 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Persistência das partidas em andamento: diário + snapshots.
+
+Cada chamada que altera uma partida (criação, jogada, ponto, rodada e
+remoção) vira um registro no diário. As threads que atendem RPCs só colocam
+o registro em uma fila; uma thread escritora grava todos os registros
+acumulados de uma vez e faz um único `fsync` por lote. Enquanto um `fsync`
+está em andamento os próximos registros se acumulam, então o número de
+`fsync`s por segundo é limitado pelo disco, e não pelo número de jogadas.
+
+A durabilidade é assíncrona: a RPC responde ao cliente assim que o registro
+entra na fila, antes do `fsync`. Uma queda perde as alterações ainda não
+sincronizadas, mesmo as já confirmadas ao cliente: no máximo as dos últimos
+`intervalo_fsync` segundos, mais as do lote que estava sendo gravado. O que
+foi recuperado é sempre um prefixo das alterações, na ordem em que foram
+feitas.
+
+O diário é dividido em segmentos (`diario.<n>.log`). A cada
+`registros_por_snapshot` registros o estado completo é gravado em
+`snapshot.bin` por um processo filho (`fork`), que enxerga uma cópia
+copy-on-write do servidor, e os segmentos anteriores ao snapshot são apagados.
+Na inicialização o servidor carrega o snapshot e reaplica só os segmentos
+seguintes.
+
+Formato do registro: `[tamanho: uint32][crc32: uint32][tupla em marshal]`.
+Um registro incompleto no fim do último segmento (queda no meio de uma
+escrita) é descartado. Cada execução grava em um segmento novo, então um
+registro ilegível em qualquer outro segmento é corrupção e interrompe a
+recuperação com `ErroDiario`.
+"""
+
+import marshal
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from logger import obter_logger
+
+log = obter_logger("diario")
+
+SNAPSHOT = "snapshot.bin"
+# \x02: campos das partidas com nome e jogadas gravadas como código da variante. Snapshots
+# \x01 (campos por posição, jogadas pelo nome) não são lidos: ver `recuperar`
+_MAGICO_SNAPSHOT = b"RPSS\x02"
+_CABECALHO = struct.Struct(">II")
+
+_ROTACIONAR = object()  # Marca na fila: registros anteriores já estão no snapshot em andamento
+_PARAR = object()
+
+
+class ErroDiario(Exception):
+    """Arquivo de snapshot ou diário ilegível."""
+
+
+class Diario:
+    """Diário de alterações com snapshots periódicos.
+
+    Args:
+        diretorio (str): Pasta onde ficam o snapshot e os segmentos.
+        intervalo_fsync (float): Intervalo mínimo entre dois `fsync`s (segundos); com 0 cada
+            lote é sincronizado assim que gravado.
+        registros_por_snapshot (int): Registros gravados entre dois snapshots.
+
+    Exemplo:
+        diario = Diario("dados")
+        diario.recuperar(jogo._restaurar_estado, jogo._reaplicar)
+        diario.iniciar(jogo._lock, jogo._exportar_estado)
+        diario.registrar("remocao", 42)
+    """
+
+    def __init__(self, diretorio, intervalo_fsync=0.01, registros_por_snapshot=100_000):
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.intervalo_fsync = intervalo_fsync
+        self.registros_por_snapshot = registros_por_snapshot
+        self._fila = queue.SimpleQueue()
+        self._segmento = 1  # Número do segmento em que os registros estão sendo gravados
+        self._arquivo = None
+        self._desde_snapshot = 0  # Registros gravados desde o último snapshot
+        self._thread = None
+        self.registros = 0  # Registros gravados
+        self.lotes = 0  # Escritas (cada uma com um fsync)
+        self.snapshots = 0
+
+    def registrar(self, *registro):
+        """Enfileira um registro. Chamado com o lock do jogo, o que preserva a ordem das alterações.
+
+        Não espera a gravação: o registro só fica durável no `fsync` do próximo lote.
+        """
+        self._fila.put(registro)
+
+    def estatisticas(self):
+        return {
+            "diario_registros_total": self.registros,
+            "diario_lotes_total": self.lotes,
+            "diario_snapshots_total": self.snapshots,
+            "diario_pendentes": self._fila.qsize(),
+        }
+
+    def _caminho_segmento(self, numero):
+        return os.path.join(self.diretorio, f"diario.{numero:06d}.log")
+
+    def _segmentos(self):
+        numeros = []
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith("diario.") and nome.endswith(".log"):
+                numeros.append(int(nome[len("diario."):-len(".log")]))
+        return sorted(numeros)
+
+    def _ler_segmento(self, numero, ultimo):
+        """Gera os registros do segmento.
+
+        Só o último segmento pode terminar no meio de uma escrita: o final
+        incompleto dele é descartado. Um registro ilegível em qualquer outro
+        segmento é corrupção, e não uma escrita interrompida.
+
+        Raises:
+            ErroDiario: Registro ilegível em um segmento que não é o último.
+        """
+        caminho = self._caminho_segmento(numero)
+        with open(caminho, "rb") as arquivo:
+            dados = arquivo.read()
+        pos = 0
+        while pos < len(dados):
+            if pos + _CABECALHO.size > len(dados):
+                break
+            tamanho, crc = _CABECALHO.unpack_from(dados, pos)
+            inicio = pos + _CABECALHO.size
+            conteudo = dados[inicio:inicio + tamanho]
+            if len(conteudo) < tamanho or zlib.crc32(conteudo) != crc:
+                break
+            yield marshal.loads(conteudo)
+            pos = inicio + tamanho
+        if pos < len(dados):
+            if not ultimo:
+                raise ErroDiario(f"Registro ilegível na posição {pos} de {caminho}, que não é o último segmento")
+            log.warning("Descartando %s bytes incompletos no fim de %s", len(dados) - pos, caminho)
+            with open(caminho, "r+b") as arquivo:
+                arquivo.truncate(pos)
+
+    def recuperar(self, restaurar, reaplicar):
+        """Carrega o snapshot e reaplica os registros gravados depois dele.
+        Args:
+            restaurar: Função que recebe o estado salvo no snapshot.
+            reaplicar: Função chamada com cada registro do diário, em ordem.
+        Returns:
+            dict: Partidas no snapshot, registros reaplicados e segundos gastos.
+        Raises:
+            ErroDiario: Snapshot ilegível ou gravado em outra versão do formato, ou registro
+                ilegível fora do fim do último segmento.
+        """
+        inicio = time.perf_counter()
+        primeiro_segmento = 1
+        partidas = 0
+        caminho = os.path.join(self.diretorio, SNAPSHOT)
+        if os.path.exists(caminho):
+            with open(caminho, "rb") as arquivo:
+                dados = arquivo.read()
+            if len(dados) > 4 and dados[:4] == _MAGICO_SNAPSHOT[:4] and not dados.startswith(_MAGICO_SNAPSHOT):
+                raise ErroDiario(f"{caminho} foi gravado em outro formato (versão {dados[4]}, esperada "
+                                 f"{_MAGICO_SNAPSHOT[4]}); apague-o junto com os segmentos do diário")
+            if not dados.startswith(_MAGICO_SNAPSHOT):
+                raise ErroDiario(f"{caminho} não é um snapshot válido")
+            estado = marshal.loads(dados[len(_MAGICO_SNAPSHOT):])
+            primeiro_segmento = estado["segmento"]
+            partidas = len(estado["partidas"])
+            restaurar(estado)
+
+        reaplicados = 0
+        segmentos = self._segmentos()
+        for numero in segmentos:
+            if numero < primeiro_segmento:
+                os.remove(self._caminho_segmento(numero))  # Já incluído no snapshot
+                continue
+            for registro in self._ler_segmento(numero, numero == segmentos[-1]):
+                reaplicar(registro)
+                reaplicados += 1
+        # Cada execução grava em um segmento novo
+        self._segmento = max([primeiro_segmento] + [n + 1 for n in segmentos])
+        # Muitos registros reaplicados: o próximo snapshot vem mais cedo
+        self._desde_snapshot = reaplicados
+        return {"partidas_snapshot": partidas, "registros": reaplicados,
+                "segundos": round(time.perf_counter() - inicio, 3)}
+
+    def iniciar(self, trava, exportar):
+        """Inicia a thread escritora.
+        Args:
+            trava: Lock que protege o estado do jogo (o mesmo usado ao chamar `registrar`).
+            exportar: Função que retorna o estado atual (chamada com `trava` adquirida).
+        """
+        self._trava = trava
+        self._exportar = exportar
+        self._arquivo = open(self._caminho_segmento(self._segmento), "ab")
+        self._thread = threading.Thread(target=self._escrever, name="diario", daemon=True)
+        self._thread.start()
+
+    def fechar(self):
+        """Grava o que estiver pendente e encerra a thread escritora."""
+        if self._thread is not None:
+            self._fila.put(_PARAR)
+            self._thread.join()
+            self._thread = None
+
+    def _escrever(self):
+        ultimo_fsync = 0.0
+        while True:
+            lote = [self._fila.get()]  # Espera o primeiro registro
+            while True:  # Junta tudo o que já estiver na fila
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            parar = self._gravar(lote)
+            if parar:
+                self._arquivo.close()
+                return
+            if self._desde_snapshot >= self.registros_por_snapshot:
+                self._snapshot()
+            # Limita a taxa de fsync; os registros que chegarem nesse meio tempo vão no próximo lote
+            espera = ultimo_fsync + self.intervalo_fsync - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            ultimo_fsync = time.monotonic()
+
+    def _gravar(self, lote):
+        """Grava os registros do lote com um único write + fsync. Retorna True se recebeu `_PARAR`."""
+        partes = []
+        parar = False
+        for registro in lote:
+            if registro is _PARAR:
+                parar = True
+                continue
+            if registro is _ROTACIONAR:
+                self._descarregar(partes)
+                partes = []
+                self._rotacionar()
+                continue
+            conteudo = marshal.dumps(registro)
+            partes.append(_CABECALHO.pack(len(conteudo), zlib.crc32(conteudo)))
+            partes.append(conteudo)
+        self._descarregar(partes)
+        return parar
+
+    def _descarregar(self, partes):
+        if not partes:
+            return
+        self._arquivo.write(b"".join(partes))
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self.lotes += 1
+        quantidade = len(partes) // 2
+        self.registros += quantidade
+        self._desde_snapshot += quantidade
+
+    def _rotacionar(self):
+        self._arquivo.close()
+        self._segmento += 1
+        self._arquivo = open(self._caminho_segmento(self._segmento), "ab")
+
+    def _snapshot(self):
+        """Grava o estado completo e apaga os segmentos que ele torna desnecessários."""
+        inicio = time.perf_counter()
+        segmento = self._segmento + 1  # Registros feitos depois da captura vão para este segmento
+        with self._trava:
+            # Tudo o que está na fila antes da marca já faz parte do estado capturado
+            self._fila.put(_ROTACIONAR)
+            if hasattr(os, "fork"):
+                pid = os.fork()
+                if pid == 0:
+                    # Processo filho: cópia do estado neste instante, sem segurar o servidor
+                    codigo = 1
+                    try:
+                        self._gravar_snapshot(self._exportar(), segmento)
+                        codigo = 0
+                    finally:
+                        os._exit(codigo)
+            else:
+                pid = None
+                estado = self._exportar()
+        if pid is None:
+            self._gravar_snapshot(estado, segmento)
+
+        # Registros anteriores à marca ainda vão para o segmento antigo
+        lote, parar = [], False
+        while True:
+            registro = self._fila.get()
+            if registro is _PARAR:
+                parar = True  # Tratado no próximo lote, depois do snapshot
+                continue
+            lote.append(registro)
+            if registro is _ROTACIONAR:
+                break
+        self._gravar(lote)
+        if parar:
+            self._fila.put(_PARAR)
+        if pid is not None:
+            _, status = os.waitpid(pid, 0)
+            if status != 0:
+                log.error("Falha ao gravar o snapshot (status %s)", status)
+                return
+        for numero in self._segmentos():
+            if numero < segmento:
+                os.remove(self._caminho_segmento(numero))
+        self._desde_snapshot = 0
+        self.snapshots += 1
+        log.info("Snapshot gravado em %.2fs", time.perf_counter() - inicio,
+                 extra={"campos": {"segmento": segmento}})
+
+    def _gravar_snapshot(self, estado, segmento):
+        estado["segmento"] = segmento
+        caminho = os.path.join(self.diretorio, SNAPSHOT)
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(_MAGICO_SNAPSHOT)
+            arquivo.write(marshal.dumps(estado))
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+        pasta = os.open(self.diretorio, os.O_RDONLY)
+        try:
+            os.fsync(pasta)
+        finally:
+            os.close(pasta)
@@ -0,0 +1,91 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+NIVEIS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "off": logging.CRITICAL + 1,  # Nenhum registro é emitido
+}
+
+# Marca um registro como amostrável (RPCs de leitura chamadas com muita frequência)
+AMOSTRAR = {"amostrar": True}
+
+RAIZ = "rps"  # Logger pai de todos os loggers do servidor
+
+
+class FormatadorEstruturado(logging.Formatter):
+    """Formata cada registro como `data nível logger mensagem chave=valor ...`.
+
+    Campos estruturados são passados em `extra={"campos": {...}}`.
+    """
+
+    def format(self, record):
+        linha = f"{self.formatTime(record)} {record.levelname} {record.name} {record.getMessage()}"
+        campos = getattr(record, "campos", None)
+        if campos:
+            linha += " " + " ".join(f"{chave}={valor}" for chave, valor in campos.items())
+        if record.exc_info:
+            linha += "\n" + self.formatException(record.exc_info)
+        return linha
+
+
+class FiltroAmostragem(logging.Filter):
+    """Deixa passar só uma fração dos registros marcados com `AMOSTRAR`."""
+
+    def __init__(self, taxa):
+        super().__init__()
+        self.taxa = taxa
+
+    def filter(self, record):
+        if self.taxa >= 1.0 or not getattr(record, "amostrar", False):
+            return True
+        return random.random() < self.taxa
+
+
+def configurar_logs(nivel="info", amostragem=1.0, destino=None):
+    """Configura os logs do servidor com escrita em segundo plano.
+
+    As threads que atendem requisições apenas colocam o registro em uma fila;
+    uma thread separada formata e escreve no destino. Com nível "off" nada é
+    enfileirado.
+
+    Args:
+        nivel (str): Um dos níveis de `NIVEIS`.
+        amostragem (float): Fração (0 a 1) dos registros amostráveis que é mantida.
+        destino: Stream de saída (padrão: `sys.stdout`).
+    Returns:
+        QueueListener or None: A thread escritora, que deve ser parada com `stop()`
+        ao encerrar o servidor; None se os logs estiverem desligados.
+    """
+    raiz = logging.getLogger(RAIZ)
+    raiz.handlers.clear()
+    raiz.propagate = False
+    raiz.setLevel(NIVEIS[nivel])
+    if nivel == "off":
+        return None
+
+    fila = queue.SimpleQueue()
+    escritor = logging.StreamHandler(destino or sys.stdout)
+    escritor.setFormatter(FormatadorEstruturado())
+    enfileirador = logging.handlers.QueueHandler(fila)
+    enfileirador.addFilter(FiltroAmostragem(amostragem))
+    raiz.addHandler(enfileirador)
+
+    listener = logging.handlers.QueueListener(fila, escritor)
+    listener.start()
+    return listener
+
+
+def obter_logger(nome):
+    """Retorna o logger `rps.<nome>`, configurado por `configurar_logs`."""
+    return logging.getLogger(f"{RAIZ}.{nome}")
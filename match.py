@@ -0,0 +1,99 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+import time
+
+from rules import obter_regras
+
+EMPATE = -1  # Valor de `vencedor_rodada` quando a última rodada empatou
+
+
+class Partida:
+    """Estado compacto de uma partida em andamento.
+
+    Tudo o que o servidor precisa saber sobre uma partida fica neste registro,
+    de modo que uma única consulta à tabela de partidas atende qualquer RPC.
+    Os campos são slots (sem `__dict__`) para manter o custo de memória baixo
+    mesmo com muitas partidas ociosas.
+    """
+
+    __slots__ = (
+        "jogador1", "jogador2",  # IDs dos jogadores
+        "placar1", "placar2",  # Rodadas vencidas por cada jogador
+        "escolha1", "escolha2",  # Código (ver Regras.codigos) da jogada pendente de cada jogador na rodada (None se ainda não jogou)
+        "rodada",  # Número da rodada atual
+        "vencedor_rodada",  # Vencedor da última rodada, EMPATE, ou None se nenhuma foi resolvida
+        "inicio",  # Instante de criação (time.time()), para a duração no histórico
+        "rodadas",  # Rodadas resolvidas: (código da escolha1, código da escolha2, vencedor ou None no empate);
+                    # None até a primeira rodada e sempre None sem histórico, que é quem as usa
+        "regras",  # Regras da partida (rules.Regras), compartilhadas entre as partidas iguais
+        "vencedor",  # Vencedor da partida, decidido na rodada que o leva às vitórias necessárias (None em andamento)
+    )
+
+    def __init__(self, jogador1, jogador2, inicio=None, regras=None):
+        self.jogador1 = jogador1
+        self.jogador2 = jogador2
+        self.placar1 = 0
+        self.placar2 = 0
+        self.escolha1 = None
+        self.escolha2 = None
+        self.rodada = 1
+        self.vencedor_rodada = None
+        self.inicio = time.time() if inicio is None else inicio
+        self.rodadas = None
+        self.regras = obter_regras() if regras is None else regras
+        self.vencedor = None
+
+    @property
+    def jogadores(self):
+        return self.jogador1, self.jogador2
+
+    def __contains__(self, player_id):
+        return player_id == self.jogador1 or player_id == self.jogador2
+
+    def oponente(self, player_id):
+        """Retorna o ID do outro jogador da partida."""
+        return self.jogador2 if player_id == self.jogador1 else self.jogador1
+
+    def placar_de(self, player_id):
+        """Retorna quantas rodadas o jogador venceu."""
+        return self.placar1 if player_id == self.jogador1 else self.placar2
+
+    def marcar_ponto(self, player_id):
+        """Soma uma rodada vencida ao jogador, avança a rodada e encerra a partida se for o caso."""
+        if player_id == self.jogador1:
+            self.placar1 += 1
+        else:
+            self.placar2 += 1
+        self.rodada += 1
+        self.verificar_fim()
+
+    def verificar_fim(self):
+        """Define o vencedor se algum jogador chegou às vitórias necessárias.
+
+        O vencedor é definido uma única vez: a partida encerrada não volta a
+        ficar em andamento.
+        """
+        if self.vencedor is None:
+            vitorias = self.regras.vitorias
+            if self.placar1 >= vitorias:
+                self.vencedor = self.jogador1
+            elif self.placar2 >= vitorias:
+                self.vencedor = self.jogador2
+
+    def jogou(self, player_id):
+        """Indica se o jogador já escolheu sua jogada na rodada atual."""
+        escolha = self.escolha1 if player_id == self.jogador1 else self.escolha2
+        return escolha is not None
+
+    def registrar_escolha(self, player_id, choice):
+        if player_id == self.jogador1:
+            self.escolha1 = choice
+        else:
+            self.escolha2 = choice
+
+    def placar(self):
+        """Retorna o placar como dicionário com chaves em texto (exigência do XML-RPC)."""
+        return {str(self.jogador1): self.placar1, str(self.jogador2): self.placar2}
@@ -0,0 +1,74 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+import time
+from collections import OrderedDict
+
+
+class Matchmaker:
+    """Fila de pareamento ordenada por ordem de chegada e sem duplicatas.
+
+    Entrar, sair e parear são O(1): a fila é um `OrderedDict` de jogador para o
+    instante em que ele entrou. A classe não tem lock próprio; quem a usa (o
+    `GameServer`) já serializa o acesso.
+    """
+
+    def __init__(self):
+        self._fila = OrderedDict()  # player_id -> instante de entrada (time.monotonic)
+        self.total_pareados = 0  # Jogadores que já saíram da fila em uma partida
+        self._espera_total = 0.0  # Soma dos tempos de espera dos jogadores pareados
+        self._espera_maxima = 0.0  # Maior tempo de espera observado
+
+    def __len__(self):
+        return len(self._fila)
+
+    def __contains__(self, player_id):
+        return player_id in self._fila
+
+    def entrar(self, player_id):
+        """Coloca o jogador no fim da fila.
+        Returns:
+            bool: False se o jogador já estava na fila.
+        """
+        if player_id in self._fila:
+            return False
+        self._fila[player_id] = time.monotonic()
+        return True
+
+    def sair(self, player_id):
+        """Retira o jogador da fila.
+        Returns:
+            bool: False se o jogador não estava na fila.
+        """
+        return self._fila.pop(player_id, None) is not None
+
+    def parear(self):
+        """Retira os dois jogadores mais antigos da fila.
+        Returns:
+            tuple or None: Os dois jogadores, ou None se houver menos de dois na fila.
+        """
+        if len(self._fila) < 2:
+            return None
+        agora = time.monotonic()
+        par = []
+        for _ in range(2):
+            player_id, entrada = self._fila.popitem(last=False)
+            espera = agora - entrada
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+            par.append(player_id)
+        self.total_pareados += 2
+        return tuple(par)
+
+    def estatisticas(self):
+        """Retorna a profundidade da fila e os tempos de espera (em segundos)."""
+        mais_antigo = next(iter(self._fila.values()), None)
+        return {
+            "profundidade": len(self._fila),
+            "total_pareados": self.total_pareados,
+            "espera_media": self._espera_total / self.total_pareados if self.total_pareados else 0.0,
+            "espera_maxima": self._espera_maxima,
+            "espera_atual_maxima": time.monotonic() - mais_antigo if mais_antigo is not None else 0.0,
+        }
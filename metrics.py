@@ -0,0 +1,193 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Métricas do servidor: contagem, erros e histograma de latência de cada RPC.
+
+`MetricasRPC` envolve a instância registrada no servidor (`register_instance`)
+e mede todas as chamadas despachadas para ela, seja por XML-RPC, pelo servidor
+asyncio ou pelo protocolo binário. As métricas ficam disponíveis pelo RPC
+`system.metrics` e, em formato texto do Prometheus, em `GET /metrics`.
+
+O custo por chamada é de duas leituras de relógio, uma busca binária nos
+limites do histograma e um lock sem disputa por método.
+"""
+
+import bisect
+import threading
+import time
+
+from binary_protocol import ErroRemoto
+
+# Limites superiores dos intervalos do histograma de latência, em segundos
+LIMITES_LATENCIA = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+TIPO_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricasMetodo:
+    """Contadores e histograma de latência de um método."""
+
+    __slots__ = ("chamadas", "erros", "soma", "intervalos", "_lock")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.soma = 0.0  # Tempo total gasto no método (segundos)
+        self.intervalos = [0] * (len(LIMITES_LATENCIA) + 1)  # O último é o "+Inf"
+        self._lock = threading.Lock()
+
+    def registrar(self, duracao, erro):
+        indice = bisect.bisect_left(LIMITES_LATENCIA, duracao)
+        with self._lock:
+            self.chamadas += 1
+            self.soma += duracao
+            self.intervalos[indice] += 1
+            if erro:
+                self.erros += 1
+
+    def copiar(self):
+        """Retorna (chamadas, erros, soma, intervalos) lidos de forma consistente."""
+        with self._lock:
+            return self.chamadas, self.erros, self.soma, list(self.intervalos)
+
+
+def percentil_histograma(intervalos, fracao):
+    """Estima o percentil pelo limite superior do intervalo em que ele cai."""
+    total = sum(intervalos)
+    if not total:
+        return 0.0
+    alvo = fracao * total
+    acumulado = 0
+    for limite, quantidade in zip(LIMITES_LATENCIA, intervalos):
+        acumulado += quantidade
+        if acumulado >= alvo:
+            return limite
+    return float("inf")
+
+
+class MetricasRPC:
+    """Envolve a instância do jogo, medindo cada método chamado pelo servidor.
+
+    Args:
+        instancia: Objeto cujos métodos públicos são expostos (ex.: `GameServer`).
+        estatisticas_conexoes: Contadores de conexões (ver `server.EstatisticasConexoes`), opcional.
+
+    Exemplo:
+        metricas = MetricasRPC(GameServer())
+        servidor.register_instance(metricas)
+        servidor.register_function(metricas.resumo, "system.metrics")
+    """
+
+    def __init__(self, instancia, estatisticas_conexoes=None):
+        self.instancia = instancia
+        self.estatisticas_conexoes = estatisticas_conexoes
+        self._funcoes = {}  # Cache nome -> (método ligado, métricas)
+        self._lock = threading.Lock()
+
+    def _funcao(self, metodo):
+        """Retorna o método público e suas métricas, ou None se o método não existir."""
+        entrada = self._funcoes.get(metodo)
+        if entrada is None:
+            if metodo.startswith("_") or "." in metodo:
+                return None
+            funcao = getattr(self.instancia, metodo, None)
+            if not callable(funcao):
+                return None
+            with self._lock:
+                entrada = self._funcoes.setdefault(metodo, (funcao, MetricasMetodo()))
+        return entrada
+
+    def _dispatch(self, metodo, params):
+        """Chamado pelo servidor XML-RPC (e por `binary_protocol.despachar`) para cada RPC."""
+        entrada = self._funcao(metodo)
+        if entrada is None:
+            raise ErroRemoto(f"Método {metodo} não é suportado")
+        funcao, metricas = entrada
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            resultado = funcao(*params)
+            erro = False
+            return resultado
+        finally:
+            metricas.registrar(time.perf_counter() - inicio, erro)
+
+    async def _wait_for_event_async(self, *params):
+        """Versão medida da espera assíncrona usada pelo `ServidorAsyncio`."""
+        _, metricas = self._funcao("wait_for_event")
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            resultado = await self.instancia._wait_for_event_async(*params)
+            erro = False
+            return resultado
+        finally:
+            metricas.registrar(time.perf_counter() - inicio, erro)
+
+    def _listMethods(self):
+        return sorted(nome for nome in dir(self.instancia)
+                      if not nome.startswith("_") and callable(getattr(self.instancia, nome)))
+
+    def medidores(self):
+        """Valores instantâneos: partidas ativas, fila de espera, jogadores e conexões."""
+        valores = {}
+        ler = getattr(self.instancia, "_medidores", None)
+        if ler is not None:
+            valores.update(ler())
+        if self.estatisticas_conexoes is not None:
+            resumo = self.estatisticas_conexoes.resumo()
+            valores["conexoes_total"] = resumo["conexoes"]
+            valores["requisicoes_http_total"] = resumo["requisicoes"]
+        return valores
+
+    def resumo(self):
+        """Retorna as métricas de todos os métodos já chamados (RPC `system.metrics`)."""
+        metodos = {}
+        for nome, (_, metricas) in sorted(self._funcoes.items()):
+            chamadas, erros, soma, intervalos = metricas.copiar()
+            metodos[nome] = {
+                "chamadas": chamadas,
+                "erros": erros,
+                "media_ms": soma / chamadas * 1000 if chamadas else 0.0,
+                "p50_ms": percentil_histograma(intervalos, 0.5) * 1000,
+                "p99_ms": percentil_histograma(intervalos, 0.99) * 1000,
+            }
+        return {"metodos": metodos, "medidores": self.medidores()}
+
+    def prometheus(self):
+        """Retorna as métricas no formato texto do Prometheus."""
+        linhas = [
+            "# HELP rps_rpc_chamadas_total Chamadas atendidas por método.",
+            "# TYPE rps_rpc_chamadas_total counter",
+        ]
+        copias = [(nome, metricas.copiar()) for nome, (_, metricas) in sorted(self._funcoes.items())]
+        for nome, (chamadas, _, _, _) in copias:
+            linhas.append(f'rps_rpc_chamadas_total{{metodo="{nome}"}} {chamadas}')
+        linhas += [
+            "# HELP rps_rpc_erros_total Chamadas que terminaram em exceção, por método.",
+            "# TYPE rps_rpc_erros_total counter",
+        ]
+        for nome, (_, erros, _, _) in copias:
+            linhas.append(f'rps_rpc_erros_total{{metodo="{nome}"}} {erros}')
+        linhas += [
+            "# HELP rps_rpc_latencia_segundos Tempo de execução de cada método.",
+            "# TYPE rps_rpc_latencia_segundos histogram",
+        ]
+        for nome, (chamadas, _, soma, intervalos) in copias:
+            acumulado = 0
+            for limite, quantidade in zip(LIMITES_LATENCIA, intervalos):
+                acumulado += quantidade
+                linhas.append(f'rps_rpc_latencia_segundos_bucket{{metodo="{nome}",le="{limite}"}} {acumulado}')
+            linhas.append(f'rps_rpc_latencia_segundos_bucket{{metodo="{nome}",le="+Inf"}} {chamadas}')
+            linhas.append(f'rps_rpc_latencia_segundos_sum{{metodo="{nome}"}} {soma}')
+            linhas.append(f'rps_rpc_latencia_segundos_count{{metodo="{nome}"}} {chamadas}')
+        for nome, valor in self.medidores().items():
+            tipo = "counter" if nome.endswith("_total") else "gauge"
+            linhas.append(f"# TYPE rps_{nome} {tipo}")
+            linhas.append(f"rps_{nome} {valor}")
+        return "\n".join(linhas) + "\n"
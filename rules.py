@@ -0,0 +1,102 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Regras de cada partida: variante do jogo e número de rodadas (melhor de N).
+
+Um objeto `Regras` reúne tudo o que a resolução de uma rodada e o fim de jogo
+precisam, calculado uma única vez: o código de cada jogada, a tabela de
+resultados e o número de vitórias que encerra a partida. `obter_regras`
+guarda cada combinação já criada, então todas as partidas com as mesmas
+regras compartilham o mesmo objeto.
+
+As variantes são jogos circulares com um número ímpar de opções: cada opção
+vence as `n // 2` anteriores na ordem da variante. No clássico, papel vence
+pedra, tesoura vence papel e pedra vence tesoura; em "rpsls" (pedra, papel,
+tesoura, lagarto, Spock) a ordem pedra, spock, papel, lagarto, tesoura dá as
+dez combinações do jogo.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele o lote usa a tabela em Python puro
+    np = None
+
+# Jogadas de cada variante; a posição na tupla é o código da jogada
+VARIANTES = {
+    "classico": ("pedra", "papel", "tesoura"),
+    "rpsls": ("pedra", "spock", "papel", "lagarto", "tesoura"),
+}
+
+# Valores da tabela de resultados
+EMPATOU, VENCE_JOGADOR1, VENCE_JOGADOR2 = 0, 1, 2
+
+
+class Regras:
+    """Regras imutáveis de uma partida.
+
+    Args:
+        variante (str): Nome da variante (chave de `VARIANTES`).
+        melhor_de (int): Partida em melhor de N rodadas vencidas (empates não contam).
+    """
+
+    __slots__ = ("variante", "opcoes", "codigos", "melhor_de", "vitorias", "tamanho", "tabela",
+                 "_tabela_np", "descricao")
+
+    def __init__(self, variante, melhor_de):
+        opcoes = VARIANTES.get(variante)
+        if opcoes is None:
+            raise ValueError(f"Variante desconhecida: {variante}")
+        if melhor_de < 1:
+            raise ValueError(f"Número de rodadas inválido: {melhor_de}")
+        tamanho = len(opcoes)
+        self.variante = variante
+        self.opcoes = opcoes
+        self.codigos = {opcao: codigo for codigo, opcao in enumerate(opcoes)}
+        self.melhor_de = melhor_de
+        self.vitorias = melhor_de // 2 + 1  # Vitórias que encerram a partida
+        self.tamanho = tamanho
+        # Resultado das jogadas (a, b) em tabela[a * tamanho + b]
+        self.tabela = tuple(
+            EMPATOU if a == b else VENCE_JOGADOR1 if (a - b) % tamanho <= tamanho // 2 else VENCE_JOGADOR2
+            for a in range(tamanho) for b in range(tamanho))
+        self._tabela_np = np.array(self.tabela, dtype=np.int8) if np is not None else None
+        # Enviado ao cliente no snapshot da partida
+        self.descricao = {"variante": variante, "opcoes": list(opcoes), "melhor_de": melhor_de,
+                          "vitorias": self.vitorias}
+
+    def resultados_em_lote(self, escolhas1, escolhas2):
+        """Resolve várias rodadas de uma vez.
+
+        Com arrays NumPy o lote inteiro é uma única indexação da tabela. Listas
+        usam a tabela em Python puro: convertê-las para arrays (e o resultado de
+        volta) custa mais do que a própria consulta.
+
+        Args:
+            escolhas1: Códigos das jogadas do jogador 1 de cada rodada (lista ou array NumPy).
+            escolhas2: Códigos das jogadas do jogador 2, na mesma ordem.
+        Returns:
+            Lista (ou array, se a entrada for array) com o resultado de cada rodada
+            (EMPATOU, VENCE_JOGADOR1 ou VENCE_JOGADOR2).
+        """
+        tamanho = self.tamanho
+        if self._tabela_np is not None and isinstance(escolhas1, np.ndarray):
+            return self._tabela_np[escolhas1 * tamanho + escolhas2]
+        tabela = self.tabela
+        return [tabela[a * tamanho + b] for a, b in zip(escolhas1, escolhas2)]
+
+
+_criadas = {}  # (variante, melhor_de) -> Regras
+
+
+def obter_regras(variante="classico", melhor_de=5):
+    """Retorna as regras da combinação, criadas só na primeira vez.
+    Raises:
+        ValueError: Variante desconhecida ou número de rodadas menor que 1.
+    """
+    regras = _criadas.get((variante, melhor_de))
+    if regras is None:
+        # Duas threads podem criar ao mesmo tempo: fica a primeira gravada
+        regras = _criadas.setdefault((variante, melhor_de), Regras(variante, melhor_de))
+    return regras
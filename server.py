@@ -10,19 +10,78 @@ import random
 import os
 import signal
 import argparse
+import asyncio
+import logging
+import threading
+import time
+import queue
+import selectors
+from collections import OrderedDict
+from functools import wraps
+
+from async_server import ServidorAsyncio
+from binary_protocol import ServidorBinario
+from events import EventBus
+from history import Historico
+from ids import AlocadorIds
+from journal import Diario, ErroDiario
+from logger import AMOSTRAR, NIVEIS, configurar_logs, obter_logger
+from match import EMPATE, Partida
+from matchmaking import Matchmaker
+from metrics import TIPO_PROMETHEUS, MetricasRPC
+from rules import VARIANTES, VENCE_JOGADOR1, VENCE_JOGADOR2, obter_regras
+from tournament import GerenciadorTorneios
+
+
+log = obter_logger("jogo")
+log_acesso = obter_logger("acesso")
+
+
+def sincronizado(metodo):
+    """Executa o método segurando o lock do servidor.
+
+    Garante que as estruturas compartilhadas do `GameServer` não sejam
+    modificadas por duas requisições ao mesmo tempo quando o servidor atende
+    clientes em paralelo.
+    """
+    @wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        with self._lock:
+            return metodo(self, *args, **kwargs)
+    return envolvido
+
 
 class GameServer:
-    def __init__(self):
+    def __init__(self, alocador_ids=None):
+        self._lock = threading.RLock()  # Protege os dicionários abaixo entre threads
+        self._ids = alocador_ids or AlocadorIds()  # Gera IDs de partida sem reaproveitar IDs liberados
         self.players = {}  # Armazena informações dos jogadores
-        self.matches = {}  # Armazena partidas em andamento
-        self.choices = {}  # Armazena as escolhas dos jogadores
-        self.scores = {}   # Armazena o placar das partidas
-        self.round = 1  # Número da rodada atual.
-        self.round_winner = None  # Vencedor da rodada atual
-        self.max_rounds = 5  # Número máximo de rodadas
-        self.waiting_list = []  # Lista de espera para partidas
-        self.current_turn = {}  # Armazena o jogador atual de cada partida
+        self.matches = {}  # Partidas em andamento: match_id -> Partida (jogadores, placar, escolhas, rodada)
+        self.regras = obter_regras()  # Regras das partidas novas (variante clássica, melhor de 5)
+        self.waiting_list = Matchmaker()  # Fila de espera para partidas (ordenada, sem duplicatas)
+        self.player_match = {}  # Índice reverso: jogador -> partida em que está
+        self._eventos = EventBus()  # Eventos por partida/jogador para o long-poll
+        self.max_espera_evento = 25  # Tempo máximo (s) que um wait_for_event fica bloqueado
+        # Vagas para wait_for_event bloqueados ao mesmo tempo (None = sem limite); no modo "threads"
+        # cada espera ocupa uma thread do pool, e as esperas além das vagas respondem na hora
+        self.vagas_espera = None
+        # Último contato de cada jogador, do mais antigo para o mais recente
+        self.ultimo_contato = OrderedDict()
+        # Tempo (s) sem contato até o jogador perder a vaga na fila, a partida e o cadastro (0 desativa)
+        self.ttl_fila = 60
+        self.ttl_partida = 120
+        self.ttl_jogador = 600
+        self.expirados = {"fila": 0, "partidas": 0, "jogadores": 0}  # Entradas já removidas pelo coletor
+        self._diario = None  # Diário de persistência (journal.Diario), se ativado
+        self._historico = None  # Histórico de partidas encerradas (history.Historico), se ativado
+        # Com intervalo > 0 as rodadas completas são resolvidas em lote a cada intervalo (segundos),
+        # em vez de na chamada da segunda jogada
+        self.intervalo_rodadas = 0
+        self._rodadas_prontas = []  # Partidas com as duas jogadas da rodada, aguardando o lote
+        # Torneios: as partidas são criadas como as do matchmaking e avançam a cada fim de jogo
+        self._torneios = GerenciadorTorneios(self._iniciar_partida, self._avisar_torneio)
         
+    @sincronizado
     def register_player(self, player_id, port):
         """
         Registra um novo jogador no sistema, associando seu ID e porta.
@@ -39,25 +98,42 @@ class GameServer:
         Observações:
             - O jogador só será registrado se o `player_id` ainda não estiver na lista de jogadores.
         """
+        self._visto(player_id)
         if player_id in self.players:
             return False, "ID de jogador já existe"
         self.players[player_id] = {"port": port, "in_game": False}
         return True, f"Jogador {player_id} registrado com sucesso"
     
-    def add_match(self, player1, player2):
+    @sincronizado
+    def add_match(self, player1, player2, variant="", best_of=0):
         """Adiciona uma partida ao sistema.
         Args:
             player1 (str): ID do primeiro jogador.
             player2 (str): ID do segundo jogador.
+            variant (str): Variante do jogo ("classico" ou "rpsls"; vazio = a do servidor).
+            best_of (int): Partida em melhor de N rodadas (0 = o do servidor).
         Returns:
-            tuple: Um valor booleano indicando sucesso e o ID da partida.
+            tuple: Um valor booleano indicando sucesso e o ID da partida (ou a mensagem de erro).
         """
-        match_id = len(self.matches) + 1
-        self.matches[match_id] = [player1, player2]
-        self.scores[match_id] = {player1: 0, player2: 0}
-        self.current_turn[match_id] = player1  # Inicializa o turno com o primeiro jogador
+        try:
+            regras = obter_regras(variant or self.regras.variante, best_of or self.regras.melhor_de)
+        except ValueError as e:
+            return False, str(e)
+        match_id = self._ids.proximo()
+        partida = Partida(player1, player2, regras=regras)
+        self.matches[match_id] = partida
+        # A criação conta como contato: uma partida nunca acessada também expira
+        agora = time.monotonic()  # O mesmo float para os dois jogadores
+        self._visto(player1, agora)
+        self._visto(player2, agora)
+        self.player_match[player1] = match_id
+        self.player_match[player2] = match_id
+        if self._diario is not None:
+            self._diario.registrar("partida", match_id, player1, player2, partida.inicio,
+                                   regras.variante, regras.melhor_de)
         return True, match_id
     
+    @sincronizado
     def remove_waiting_list(self, player_id):
         """
         Remove um jogador da lista de espera.
@@ -73,29 +149,44 @@ class GameServer:
         Observações:
             - A operação não altera o status do jogador na lista geral de jogadores (`self.players`).
         """
-        print(f"[DEBUG] Removendo jogador {player_id} da lista de espera...")
-        if player_id in self.waiting_list:
-            self.waiting_list.remove(player_id)
+        log.debug("Removendo jogador %s da lista de espera", player_id)
+        if self.waiting_list.sair(player_id):
             if player_id in self.players:
                 self.players[player_id]["in_game"] = False
             return True, f"Jogador {player_id} removido da lista de espera"
         return False, f"Jogador {player_id} não está na lista de espera"
     
+    @sincronizado
     def add_score(self, player_id, match_id):
         """" Adiciona um ponto ao jogador vencedor da partida.
+
+        O ponto conta como uma rodada vencida sem jogadas: é publicado como o
+        resultado de uma rodada e, se decidir a partida, encerra o jogo como
+        `resolve_match` (evento de fim, torneio e histórico).
+
         Args:
             player_id (str): ID do jogador vencedor.
             match_id (int): ID da partida.
         Returns:
             tuple: Um valor booleano indicando sucesso e uma mensagem informativa.
         """
-        if match_id not in self.matches:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
-        if player_id not in self.scores[match_id]:
+        if player_id not in partida:
             return False, "Jogador não está nesta partida"
-        self.scores[match_id][player_id] += 1
-        return True, f"Ponto adicionado ao jogador {player_id}"
+        if partida.vencedor is not None:
+            return False, "A partida já terminou"
+        if self._diario is not None:
+            self._diario.registrar("ponto", match_id, player_id)
+        partida.marcar_ponto(player_id)
+        partida.vencedor_rodada = player_id
+        self._registrar_historico(match_id, partida)
+        mensagem = f"Ponto adicionado ao jogador {player_id}"
+        self._publicar_rodada(match_id, mensagem)
+        return True, mensagem
     
+    @sincronizado
     def add_round(self, match_id):
         """Adiciona uma rodada à partida.
         Args:
@@ -103,16 +194,18 @@ class GameServer:
         Returns:
             tuple: Um valor booleano indicando sucesso e uma mensagem informativa.
         """
-        if match_id not in self.matches:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
-        if match_id not in self.scores:
-            return False, "Placar não encontrado"
-        self.round += 1
-        if self.round > self.max_rounds:
+        if self._diario is not None:
+            self._diario.registrar("rodada", match_id)
+        partida.rodada += 1
+        if partida.rodada > partida.regras.melhor_de:
             return False, "Número máximo de rodadas atingido"
         
-        return True, f"Rodada {self.round} iniciada"
+        return True, f"Rodada {partida.rodada} iniciada"
 
+    @sincronizado
     def add_to_waiting_list(self, player_id):
         """
         Adiciona um jogador à lista de espera, preparando-o para ser incluído em uma partida.
@@ -123,143 +216,185 @@ class GameServer:
         Returns:
             tuple: Um booleano indicando sucesso e uma mensagem informativa.
                 - (True, "Aguardando mais jogadores") se o jogador for adicionado com sucesso.
+                - (True, "Jogador já está na lista de espera") se ele já estava na fila.
 
         Observações:
             - O jogador será adicionado à lista de espera, e seu status em `self.players` será ajustado para indicar que ele não está em uma partida.
-            - É esperado que uma partida seja iniciada assim que o número mínimo de jogadores for atingido.
+            - Assim que houver dois jogadores na fila a partida é criada, e ambos recebem o evento "partida_encontrada".
         """
-        print(f"[DEBUG] Adicionando jogador {player_id} à lista de espera...")
-        self.waiting_list.append(player_id)
-        print(f"[DEBUG] Jogador {player_id} adicionado à lista de espera")
-        self.players[player_id] = {"in_game": False}
-        print(f"[DEBUG] Jogadores na lista de espera: {len(self.waiting_list)}")
+        self._visto(player_id)
+        if player_id in self._torneios.inscritos:
+            return False, "Jogador está em um torneio"
+        if not self.waiting_list.entrar(player_id):
+            return True, "Jogador já está na lista de espera"
+        self.players.setdefault(player_id, {})["in_game"] = False
+        # O jogador deixa a partida anterior, se ainda estiver associado a uma
+        anterior = self.player_match.pop(player_id, None)
+        partida = self.matches.get(anterior)
+        if partida is not None and all(self.player_match.get(p) != anterior for p in partida.jogadores):
+            # Ninguém mais está na partida: o coletor só a encontraria pelo player_match
+            self.remove_match(anterior)
+        log.debug("Jogador %s adicionado à lista de espera", player_id,
+                  extra={"campos": {"fila": len(self.waiting_list)}})
+        self._parear_jogadores()
         return True, "Aguardando mais jogadores"
     
+    def _parear_jogadores(self):
+        """Cria partidas para os jogadores da fila enquanto houver pares disponíveis."""
+        while True:
+            par = self.waiting_list.parear()
+            if par is None:
+                return
+            player1, player2 = par
+            if self._iniciar_partida(player1, player2) is None:
+                # Não foi possível criar a partida: os dois voltam para a fila
+                self.waiting_list.entrar(player1)
+                self.waiting_list.entrar(player2)
+                return
+
+    def _iniciar_partida(self, player1, player2, regras=None):
+        """Cria a partida e avisa os dois jogadores no lobby. Retorna o ID ou None se falhar."""
+        if regras is None:
+            result, match_id = self.add_match(player1, player2)
+        else:
+            result, match_id = self.add_match(player1, player2, regras.variante, regras.melhor_de)
+        if not result:
+            log.error("Falha ao criar partida: %s", match_id,
+                      extra={"campos": {"jogador1": player1, "jogador2": player2}})
+            return None
+        log.info("Partida %s criada", match_id, extra={"campos": {"jogador1": player1, "jogador2": player2}})
+        # Avisa os dois jogadores que aguardam no lobby (o roteador de shards chama sem o lock)
+        with self._lock:
+            for player in (player1, player2):
+                self.players.setdefault(player, {})["in_game"] = True
+                self._eventos.publicar(f"jogador:{player}", "partida_encontrada", match_id=match_id)
+        return match_id
+        
+    @sincronizado
+    def get_matchmaking_stats(self):
+        """Retorna estatísticas da fila de espera.
+        Returns:
+            tuple: Um valor booleano indicando sucesso e um dicionário com a profundidade
+            da fila, o total de jogadores pareados e os tempos de espera (em segundos).
+        """
+        return True, self.waiting_list.estatisticas()
+    
+    @sincronizado
     def find_match(self, player_id):
-        """Encontra ou cria uma partida para o jogador especificado.
+        """Encontra a partida do jogador especificado.
         Args:
             player_id (str): ID do jogador que está buscando uma partida.
 
         Returns:
             tuple: Um valor booleano indicando sucesso e uma mensagem ou o ID da partida.
                 - Se o jogador já estiver registrado em uma partida, retorna o ID da partida.
-                - Se não houver jogadores suficientes na lista de espera, retorna uma mensagem de espera.
-                - Caso contrário, cria uma nova partida com dois jogadores e retorna o ID da partida.
+                - Caso contrário o jogador ainda aguarda um oponente e é retornada uma mensagem de espera.
         """
         if player_id not in self.players:
             return False, "Jogador não registrado"
+        self._visto(player_id)
             
         # Verifica se o jogador já está em uma partida
-        for match_id, players in self.matches.items():
-            print(f"[DEBUG] Partida {match_id}: {players}")
-            if player_id in players:
-                print(f"[DEBUG] Jogador {player_id} já está em uma partida")
-                return True, match_id
-                
-        # Verifica se há jogadores na lista de espera
-        if len(self.waiting_list) >= 2:
-            print("[DEBUG] Dois jogadores na lista de espera")
-            player1 = self.waiting_list.pop(0)
-            player2 = self.waiting_list.pop(0)
-            result, match_id = self.add_match(player1, player2)
-            
-            if not result:
-                return False, "[DEBUG] Erro ao criar partida"
-            else:
-                print(f"[DEBUG] Partida com o id {match_id} criado com sucesso")
-            self.players[player1]["in_game"] = True
-            self.players[player2]["in_game"] = True
-            print(f"[DEBUG] Jogadores na lista de espera: {len(self.waiting_list)}")
+        match_id = self.player_match.get(player_id)
+        if match_id is not None:
+            log.debug("Jogador %s já está na partida %s", player_id, match_id, extra=AMOSTRAR)
             return True, match_id
-        else:
-            print("[DEBUG] Menos de dois jogadores na lista de espera")
-            return False, "Aguardando mais jogadores"
+                
+        # O pareamento acontece em add_to_waiting_list; aqui o jogador ainda aguarda
+        log.debug("Jogador %s ainda na lista de espera", player_id, extra=AMOSTRAR)
+        return False, "Aguardando mais jogadores"
     
+    @sincronizado
     def make_move(self, player_id, match_id, choice):
         """Processa a jogada de um jogador em uma partida.
+
+        Os dois jogadores jogam a rodada ao mesmo tempo, sem turnos: cada um envia
+        uma jogada por rodada e a rodada é resolvida assim que a segunda chega. A
+        escolha fica guardada no servidor até lá, então nenhum jogador vê a do
+        oponente antes de enviar a sua.
+
         Args:
             player_id (str): ID do jogador que está fazendo a jogada.
             match_id (int): ID da partida em que a jogada está sendo feita.
-            choice (str): Escolha do jogador ("pedra", "papel" ou "tesoura").
+            choice (str): Escolha do jogador, entre as opções da variante da partida ("pedra", "papel"...).
 
         Returns:
             tuple: Um valor booleano indicando sucesso e uma mensagem de resultado.
                 - Se a jogada for registrada com sucesso, retorna uma mensagem de sucesso.
                 - Se ambos os jogadores fizerem suas escolhas, resolve a rodada e retorna o resultado.
         """
-        if match_id not in self.matches:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
-        if player_id not in self.matches[match_id]:
+        if player_id not in partida:
             return False, "Jogador não está nesta partida"
-        if choice not in ["pedra", "papel", "tesoura"]:
+        self._visto(player_id)
+        if partida.vencedor is not None:
+            return False, "A partida já terminou"
+        codigo = partida.regras.codigos.get(choice)
+        if codigo is None:
             return False, "Escolha inválida"
         
-        # Verifica se é o turno do jogador
-        if self.current_turn[match_id] != player_id:
-            return False, "Não é o seu turno"
-        else:
-            print(f"[DEBUG] Jogador {player_id} escolheu {choice}")
+        # Uma jogada por jogador em cada rodada
+        if partida.jogou(player_id):
+            return False, "Você já jogou nesta rodada"
         
         # Registra a escolha do jogador
-        self.choices[player_id] = choice
-        print(f"[DEBUG] Escolhas registradas: {self.choices}")
+        if self._diario is not None:
+            self._diario.registrar("jogada", match_id, player_id, choice)
+        partida.registrar_escolha(player_id, codigo)
+        log.debug("Jogador %s escolheu %s", player_id, choice, extra={"campos": {"partida": match_id}})
         
-        # Alterna o turno para o próximo jogador
-        self.next_turn(match_id)
+        # Avisa o oponente que a jogada foi feita (sem revelar a escolha)
+        self._eventos.publicar(f"partida:{match_id}", "jogada", jogador=player_id)
         
         # Verifica se ambos os jogadores fizeram suas escolhas
-        match_players = self.matches[match_id]
-        if len(match_players) == 2 and all(p in self.choices for p in match_players):
-            print(f"[DEBUG] Ambos os jogadores fizeram suas escolhas")
+        if partida.escolha1 is not None and partida.escolha2 is not None:
+            if self.intervalo_rodadas:
+                self._rodadas_prontas.append(match_id)
+                return True, "Aguardando o resultado da rodada"
             result, message = self.resolve_match(match_id)
-            print(f"[DEBUG] Resultado da rodada: {message}")
-            print(f"[DEBUG] Placar atual: {self.scores[match_id]}")
+            self._publicar_rodada(match_id, message)
             return result, message
         # Se ainda não houver duas escolhas, retorne uma mensagem de espera
         return True, "Aguardando a jogada do oponente"
     
+    @sincronizado
     def return_score(self, player_id, match_id):
+        """Retorna o placar da partida do ponto de vista do jogador.
+        Args:
+            player_id (str): ID do jogador.
+            match_id (int): ID da partida.
+        Returns:
+            tuple: (rodadas vencidas pelo jogador, rodadas vencidas pelo oponente),
+            ou (0, 0) se a partida ou o jogador não forem encontrados.
+        """
         if player_id is None or match_id is None:
-            print("[ERROR] player_id ou match_id é None")
+            log.error("return_score chamado com player_id ou match_id None")
             return (0, 0)
-        # Certifique-se de que as chaves são strings
-        key = f"{player_id}_{match_id}"
         
-        # Verifica se a chave existe no dicionário
-        if key in self.scores:
-            placar = self.scores[key]
-            if isinstance(placar, (tuple, list)) and len(placar) == 2:
-                return placar
-            else:
-                print(f"[WARNING] Valor inválido no dicionário para a chave {key}: {placar}")
-                return (0, 0) # Retorna valores padrão (0, 0) se o valor for inválido
-        else:
-            print(f"[WARNING] Chave não encontrada no dicionário: {key}")
-            # Retorna valores padrão (0, 0) se a chave não existir
+        partida = self.matches.get(match_id)
+        if partida is None or player_id not in partida:
+            log.warning("Placar não encontrado para o jogador %s na partida %s", player_id, match_id)
+            # Retorna valores padrão (0, 0) se a partida não existir
             return (0, 0)
+        return partida.placar_de(player_id), partida.placar_de(partida.oponente(player_id))
         
+    @sincronizado
     def check_game_over(self, match_id):
-        """Verifica se o jogo terminou e retorna o vencedor, se houver."""
-        if match_id not in self.scores:
+        """Verifica se o jogo terminou e retorna o vencedor, se houver.
+
+        O fim do jogo é decidido na resolução da rodada (ver `Partida.verificar_fim`)
+        e publicado como evento `fim_de_jogo`; aqui é só a leitura do vencedor.
+        """
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
-        
-        scores = self.scores[match_id]
-        max_score = self.max_rounds // 2 + 1
-        for player, score in scores.items():
-            if score >= max_score:
-                return True, player  # Retorna o ID do jogador vencedor
+        if partida.vencedor is not None:
+            return True, partida.vencedor  # Retorna o ID do jogador vencedor
         return False, "O jogo ainda não terminou"
     
-    def next_turn(self, match_id):
-        """Alterna o turno para o próximo jogador em uma partida.
-        Args:
-            match_id (int): ID da partida em que o turno será alternado.
-        """
-        match_players = self.matches[match_id]
-        current_player = self.current_turn[match_id]
-        next_player = match_players[1] if match_players[0] == current_player else match_players[0]
-        self.current_turn[match_id] = next_player
-        
+    @sincronizado
     def remove_match(self, match_id):
         """
         Remove uma partida ativa quando o jogo termina.
@@ -273,20 +408,32 @@ class GameServer:
         if match_id not in self.matches:
             return False, "Partida não encontrada"
         
-        # Recupera os jogadores da partida
-        players = self.matches.pop(match_id)
-        
-        # Remove informações da partida
-        self.scores.pop(match_id, None)
-        self.current_turn.pop(match_id, None)
+        # Remove a partida e recupera seus jogadores
+        partida = self.matches.pop(match_id)
+        players = partida.jogadores
+        if self._diario is not None:
+            self._diario.registrar("remocao", match_id)
         
-        # Atualiza status dos jogadores
+        # Atualiza status dos jogadores (quem já está em outra partida, como a seguinte do torneio, continua em jogo)
         for player in players:
-            if player in self.players:
-                self.players[player]["in_game"] = False
+            if self.player_match.get(player) == match_id:
+                del self.player_match[player]
+                if player in self.players:
+                    self.players[player]["in_game"] = False
+        
+        # Encerra o tópico de eventos da partida
+        self._eventos.publicar(f"partida:{match_id}", "partida_removida")
+        self._eventos.descartar(f"partida:{match_id}")
+        
+        if match_id in self._torneios:
+            # Partida de torneio removida antes do fim (abandono): W.O. para quem tem mais rodadas
+            # vencidas ou, no empate, para quem falou com o servidor por último
+            self._torneios.partida_encerrada(match_id, max(
+                players, key=lambda player: (partida.placar_de(player), self.ultimo_contato.get(player, 0))))
         
         return True, f"Partida {match_id} removida com sucesso"
         
+    @sincronizado
     def get_opponent_id(self, player_id, match_id):
         """Retorna o ID do oponente de um jogador em uma partida.
         Args:
@@ -296,34 +443,14 @@ class GameServer:
             tuple: Um valor booleano indicando sucesso e o ID do oponente.
                 - Se o jogador não estiver na partida, retorna uma mensagem de erro.
         """
-        if match_id not in self.matches:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
-        if player_id not in self.matches[match_id]:
+        if player_id not in partida:
             return False, "Jogador não está nesta partida"
-        match_players = self.matches[match_id]
-        return True, [p for p in match_players if p != player_id][0]
-    
-    def get_match_status(self, player_id, match_id):
-        """Retorna o status atual de uma partida.
-        Args:
-            player_id (str): ID do jogador que solicita o status.
-            match_id (int): ID da partida.
-
-        Returns:
-            tuple: Um valor booleano indicando sucesso e o status da partida.
-                - O status inclui o placar atual, a rodada atual e o número máximo de rodadas.
-        """
-        if match_id not in self.matches or match_id not in self.scores:
-            return False, "Partida não encontrada"
-        
-        scores = self.scores[match_id]
-        print(f"[DEBUG] Placar da partida {match_id}: {scores}")
-        current_round = sum(scores.values()) + 1
-        print(f"[DEBUG] Rodada atual: {current_round}")
-        max_rounds = self.max_rounds
-        print(f"[DEBUG] Número máximo de rodadas: {max_rounds}")
-        return scores, current_round, max_rounds
+        return True, partida.oponente(player_id)
     
+    @sincronizado
     def get_message(self, player_id, match_id):
         """Retorna uma mensagem de resultado para um jogador em uma partida.
         Args:
@@ -332,17 +459,22 @@ class GameServer:
         Returns:
             tuple: Um valor booleano indicando sucesso e a mensagem de resultado.
         """
-        if player_id not in self.matches[match_id]:
+        partida = self.matches.get(match_id)
+        if partida is None:
+            return False, "Partida não encontrada"
+        if player_id not in partida:
             return False, "Jogador não está nesta partida"
-        if self.round_winner == player_id:
-            return True, f"Você venceu a rodada {sum(self.scores[match_id].values())}!"
-        elif self.round_winner is not None and self.round_winner != player_id and self.round_winner != -1:
-            return True, f"Você perdeu a rodada {sum(self.scores[match_id].values())}!"
-        elif self.round_winner == -1:
-            return True, f"Empate na rodada {sum(self.scores[match_id].values())}"
-        elif self.round_winner is None:
+        rodadas_vencidas = partida.rodada - 1
+        if partida.vencedor_rodada == player_id:
+            return True, f"Você venceu a rodada {rodadas_vencidas}!"
+        elif partida.vencedor_rodada is not None and partida.vencedor_rodada != EMPATE:
+            return True, f"Você perdeu a rodada {rodadas_vencidas}!"
+        elif partida.vencedor_rodada == EMPATE:
+            return True, f"Empate na rodada {rodadas_vencidas}"
+        else:
             return True, f"Aguardando a jogada do oponente..."
 
+    @sincronizado
     def get_round(self, match_id):
         """Retorna o número da rodada atual de uma partida.
         Args:
@@ -350,33 +482,22 @@ class GameServer:
         Returns:
             tuple: Um valor booleano indicando sucesso e o número da rodada atual.
         """
-        if match_id not in self.matches:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
-        if match_id not in self.scores:
-            return False, "Placar não encontrado"
-        print(f"[DEBUG] Rodada atual: {sum(self.scores[match_id].values()) + 1}")
-        return True, sum(self.scores[match_id].values()) + 1
+        log.debug("Rodada atual da partida %s: %s", match_id, partida.rodada, extra=AMOSTRAR)
+        return True, partida.rodada
         
-    def get_current_turn(self, match_id):
-        """Retorna o ID do jogador que está no turno atual.
-        Args:
-            match_id (int): ID da partida.
-
-        Returns:
-            str or None: ID do jogador atual ou None se a partida não estiver registrada.
-        """
-        if match_id in self.current_turn:
-            return self.current_turn[match_id]
-        return None
-    
+    @sincronizado
     def get_score(self, match_id):
         """Retorna o placar atual de uma partida."""
-        if match_id not in self.scores:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
-        # Converte as chaves do dicionário para strings
-        scores = {str(player): score for player, score in self.scores[match_id].items()}
-        return True, scores
+        # As chaves do placar já vêm convertidas para strings
+        return True, partida.placar()
     
+    @sincronizado
     def resolve_match(self, match_id):
         """Determina o vencedor da rodada e atualiza o placar.
         Args:
@@ -387,51 +508,107 @@ class GameServer:
                 - Se um jogador atingir o número necessário de vitórias, a partida é encerrada e os dados são limpos.
                 - Caso contrário, apenas as escolhas são limpas para a próxima rodada.
         """
-        if match_id not in self.matches:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
         
-        players = self.matches[match_id]
-        if len(players) != 2:
-            return False, "Número insuficiente de jogadores"
-        
-        player1, player2 = players
-        if player1 not in self.choices or player2 not in self.choices:
+        if partida.escolha1 is None or partida.escolha2 is None:
             return False, "Aguardando as escolhas dos jogadores"
         
-        choice1 = self.choices[player1]
-        choice2 = self.choices[player2]
-        
-        combinacoes_vencedoras = {
-            ("pedra", "tesoura"): player1,
-            ("tesoura", "papel"): player1,
-            ("papel", "pedra"): player1,
-            ("tesoura", "pedra"): player2,
-            ("papel", "tesoura"): player2,
-            ("pedra", "papel"): player2,
-        }
+        # Consulta direta na tabela de resultados das regras pelos códigos das jogadas
+        regras = partida.regras
+        resultado = regras.tabela[partida.escolha1 * regras.tamanho + partida.escolha2]
+        return True, self._aplicar_resultado(match_id, partida, resultado)
+
+    def _aplicar_resultado(self, match_id, partida, resultado):
+        """Atualiza placar, rodadas e histórico com o resultado da rodada. Retorna a mensagem do resultado."""
+        player1, player2 = partida.jogadores
+        if resultado == VENCE_JOGADOR1:
+            winner = player1
+        elif resultado == VENCE_JOGADOR2:
+            winner = player2
+        else:
+            winner = None
         
-        # Lógica para determinar o vencedor da rodada
-        if choice1 == choice2:
+        if winner is None:
             result_msg = f"Empate na rodada!"
-            self.round_winner = -1
+            partida.vencedor_rodada = EMPATE
         else:
-            winner = combinacoes_vencedoras.get((choice1, choice2))
-            self.scores[match_id][winner] += 1  # Atualiza o placar no servidor
-            self.round_winner = winner
+            partida.marcar_ponto(winner)  # Atualiza o placar no servidor
+            partida.vencedor_rodada = winner
             result_msg = f"{winner} venceu a rodada!"
+        if self._historico is not None:
+            # Só o histórico usa as rodadas: sem ele a lista nem é criada
+            if partida.rodadas is None:
+                partida.rodadas = []
+            partida.rodadas.append((partida.escolha1, partida.escolha2, winner))
         
         # Limpa as escolhas para a próxima rodada
-        del self.choices[player1]
-        del self.choices[player2]
+        partida.escolha1 = None
+        partida.escolha2 = None
         
+        # A rodada que leva o vencedor ao número de vitórias necessário encerra o jogo (marcar_ponto
+        # define o vencedor da partida, e depois dele o make_move não aceita mais jogadas)
+        self._registrar_historico(match_id, partida)
         
-        # Debugs
-        print(f"O turno atual é de {self.current_turn[match_id]}")
-        print(f"[DEBUG] Resultado da rodada: {result_msg}")
-        print(f"[DEBUG] Rodada atual: {self.round}")
-            
-        return True, result_msg
+        log.debug("Resultado da rodada: %s", result_msg,
+                  extra={"campos": {"partida": match_id, "rodada": partida.rodada}})
+        return result_msg
 
+    def _registrar_historico(self, match_id, partida):
+        """Grava a partida no histórico se ela acabou de ser decidida (chamado com o lock adquirido)."""
+        if self._historico is not None and partida.vencedor is not None:
+            opcoes = partida.regras.opcoes
+            # Pontos de add_score não têm jogadas: só as rodadas jogadas vão para o histórico
+            rodadas = [(opcoes[escolha1], opcoes[escolha2], vencedor)
+                       for escolha1, escolha2, vencedor in partida.rodadas or ()]
+            self._historico.registrar(match_id, partida.jogador1, partida.jogador2, partida.vencedor,
+                                      partida.placar1, partida.placar2, partida.inicio, time.time(), rodadas)
+
+    @sincronizado
+    def _resolver_rodadas(self, match_ids):
+        """Resolve de uma vez as rodadas completas das partidas dadas e publica os resultados.
+
+        As rodadas são agrupadas pelas regras da partida, e os resultados de cada
+        grupo saem de uma única chamada a `Regras.resultados_em_lote`, com listas:
+        as escolhas estão nos objetos `Partida`, e montar arrays NumPy com elas
+        custa mais do que consultar a tabela em Python puro (medido com lotes de
+        16 a 65536 rodadas).
+
+        Args:
+            match_ids (list): IDs das partidas; as removidas ou sem as duas jogadas são ignoradas.
+        Returns:
+            int: Quantidade de rodadas resolvidas.
+        """
+        grupos = {}  # Regras -> [(match_id, partida)]; as regras são compartilhadas, então há poucos grupos
+        for match_id in match_ids:
+            partida = self.matches.get(match_id)
+            if partida is not None and partida.escolha1 is not None and partida.escolha2 is not None:
+                grupos.setdefault(partida.regras, []).append((match_id, partida))
+        resolvidas = 0
+        for regras, prontas in grupos.items():
+            resultados = regras.resultados_em_lote([partida.escolha1 for _, partida in prontas],
+                                                   [partida.escolha2 for _, partida in prontas])
+            for (match_id, partida), resultado in zip(prontas, resultados):
+                self._publicar_rodada(match_id, self._aplicar_resultado(match_id, partida, resultado))
+            resolvidas += len(prontas)
+        return resolvidas
+
+    def _iniciar_rodadas_em_lote(self, intervalo):
+        """Passa a resolver as rodadas completas em lote, a cada `intervalo` segundos, em uma thread."""
+        self.intervalo_rodadas = intervalo
+
+        def resolver():
+            while True:
+                time.sleep(self.intervalo_rodadas)
+                with self._lock:
+                    prontas, self._rodadas_prontas = self._rodadas_prontas, []
+                if prontas:
+                    self._resolver_rodadas(prontas)
+
+        threading.Thread(target=resolver, name="rodadas", daemon=True).start()
+
+    @sincronizado
     def get_match_status(self, player_id, match_id):
         """Retorna o status atual da partida
         Args:
@@ -441,36 +618,792 @@ class GameServer:
             tuple: Um valor booleano indicando sucesso e o status da partida
             - O status inclui o placar atual, a rodada atual e o número máximo de rodadas
         """
-        if match_id not in self.matches or match_id not in self.scores:
+        partida = self.matches.get(match_id)
+        if partida is None:
             return False, "Partida não encontrada"
         
         return True, {
-            "scores": self.scores[match_id],
-            "current_round": sum(self.scores[match_id].values()) + 1,
-            "max_rounds": self.max_rounds
+            "scores": partida.placar(),
+            "current_round": partida.rodada,
+            "max_rounds": partida.regras.melhor_de
         }
 
+    @sincronizado
+    def get_match_snapshot(self, player_id, match_id, version):
+        """Retorna, em uma única chamada, todo o estado da partida usado pela tela de jogo.
+
+        A versão é a sequência de eventos da partida: ela muda a cada jogada,
+        rodada resolvida ou fim de jogo. Se o cliente já possui a versão atual,
+        a resposta contém apenas a versão, sem o restante do estado.
+
+        Args:
+            player_id (str): ID do jogador que solicita o estado.
+            match_id (int): ID da partida.
+            version (int): Versão que o cliente já possui (-1 força o envio completo).
+        Returns:
+            tuple: Um valor booleano indicando sucesso e um dicionário com a versão e,
+            se houve mudança, placar, oponente, rodada, mensagem, se cada jogador já jogou
+            a rodada atual e fim de jogo. Com `version` -1 inclui também as regras da partida
+            (variante, opções de jogada, melhor de N e vitórias necessárias), que não mudam.
+        """
+        partida = self.matches.get(match_id)
+        if partida is None:
+            return False, "Partida não encontrada"
+        if player_id not in partida:
+            return False, "Jogador não está nesta partida"
+        self._visto(player_id)
+        
+        versao = self._eventos.sequencia(f"partida:{match_id}")
+        if version == versao:
+            return True, {"versao": versao}
+        
+        winner = partida.vencedor
+        snapshot = {
+            "versao": versao,
+            "oponente": partida.oponente(player_id),
+            "placar": partida.placar(),
+            "rodada": partida.rodada,
+            "mensagem": self.get_message(player_id, match_id)[1],
+            "jogou": partida.jogou(player_id),
+            "oponente_jogou": partida.jogou(partida.oponente(player_id)),
+            "fim_de_jogo": winner is not None,
+            "vencedor": "" if winner is None else winner,
+        }
+        if version < 0:
+            snapshot["regras"] = partida.regras.descricao  # Montada uma vez, junto com as regras
+        return True, snapshot
+
+    def _publicar_rodada(self, match_id, message):
+        """Publica o resultado da rodada e, se for o caso, o fim do jogo."""
+        topico = f"partida:{match_id}"
+        partida = self.matches[match_id]
+        self._eventos.publicar(topico, "rodada", mensagem=message, placar=partida.placar())
+        # Só a rodada que encerra a partida chega aqui com vencedor: as jogadas seguintes são recusadas
+        if partida.vencedor is not None:
+            self._eventos.publicar(topico, "fim_de_jogo", vencedor=partida.vencedor)
+            self._torneios.partida_encerrada(match_id, partida.vencedor)
+
+    def _avisar_torneio(self, player_id, **campos):
+        self._eventos.publicar(f"jogador:{player_id}", "torneio", **campos)
+
+    def wait_for_event(self, player_id, match_id, last_seq, timeout):
+        """Aguarda (long-poll) até que haja eventos novos para o jogador.
+
+        Com `match_id` igual a 0 o jogador aguarda no lobby, sendo acordado quando
+        uma partida for criada para ele. Caso contrário aguarda os eventos da
+        partida (jogadas, resultado da rodada e fim do jogo).
+
+        Este método não segura o lock do servidor enquanto espera.
+
+        Args:
+            player_id (str): ID do jogador.
+            match_id (int): ID da partida, ou 0 para o lobby.
+            last_seq (int): Última sequência de evento já processada pelo cliente.
+            timeout (float): Tempo máximo de espera, em segundos.
+        Returns:
+            tuple: Um valor booleano indicando sucesso e um dicionário com a
+            sequência atual (`seq`) e a lista de eventos novos (`eventos`).
+        """
+        sucesso, topico = self._topico_eventos(player_id, match_id)
+        if not sucesso:
+            return False, topico
+        timeout = min(max(timeout, 0), self.max_espera_evento)
+        vagas = self.vagas_espera
+        if vagas is not None and timeout and not vagas.acquire(blocking=False):
+            vagas, timeout = None, 0  # Sem vaga: responde na hora e o cliente tenta de novo
+        try:
+            seq, eventos = self._eventos.aguardar(topico, last_seq, timeout)
+        finally:
+            if vagas is not None and timeout:
+                vagas.release()
+        return True, {"seq": seq, "eventos": eventos}
+
+    async def _wait_for_event_async(self, player_id, match_id, last_seq, timeout):
+        """Versão asyncio de `wait_for_event`, usada pelo servidor asyncio."""
+        # O tópico é validado com o lock do servidor: fora da thread do event loop
+        sucesso, topico = await asyncio.get_running_loop().run_in_executor(
+            None, self._topico_eventos, player_id, match_id)
+        if not sucesso:
+            return False, topico
+        timeout = min(max(timeout, 0), self.max_espera_evento)
+        seq, eventos = await self._eventos.aguardar_async(topico, last_seq, timeout)
+        return True, {"seq": seq, "eventos": eventos}
+
+    @sincronizado
+    def _medidores(self):
+        """Valores instantâneos exportados pelas métricas do servidor."""
+        return {
+            "partidas_ativas": len(self.matches),
+            "fila_espera": len(self.waiting_list),
+            "jogadores": len(self.players),
+            "fila_expirados_total": self.expirados["fila"],
+            "partidas_expiradas_total": self.expirados["partidas"],
+            "jogadores_expirados_total": self.expirados["jogadores"],
+            **(self._diario.estatisticas() if self._diario is not None else {}),
+            **(self._historico.estatisticas() if self._historico is not None else {}),
+            **self._torneios.estatisticas(),
+        }
+
+    def get_player_history(self, player_id, limit):
+        """Retorna as últimas partidas encerradas do jogador.
+
+        Consulta o banco de histórico sem segurar o lock do servidor.
+
+        Args:
+            player_id (str): ID do jogador.
+            limit (int): Quantidade máxima de partidas (até 100).
+        Returns:
+            tuple: Um valor booleano indicando sucesso e a lista de partidas, da mais recente
+            para a mais antiga, com oponente, vencedor, placar, duração e as escolhas de cada rodada.
+        """
+        if self._historico is None:
+            return False, "Histórico desativado no servidor"
+        return True, self._historico.historico_jogador(player_id, min(max(limit, 0), 100))
+
+    def get_leaderboard(self, limit):
+        """Retorna os jogadores com mais vitórias.
+        Args:
+            limit (int): Quantidade de jogadores (até 100).
+        Returns:
+            tuple: Um valor booleano indicando sucesso e a lista com posição, jogador, vitórias e derrotas.
+        """
+        if self._historico is None:
+            return False, "Histórico desativado no servidor"
+        return True, self._historico.ranking(min(max(limit, 0), 100))
+
+    @sincronizado
+    def create_tournament(self, kind, rounds, variant="", best_of=0):
+        """Cria um torneio aberto a inscrições.
+        Args:
+            kind (str): "eliminatoria" (eliminação simples) ou "suico".
+            rounds (int): Rodadas do suíço (0 = log2 dos jogadores); ignorado na eliminatória.
+            variant (str): Variante das partidas do torneio (vazio = a do servidor).
+            best_of (int): Partidas em melhor de N rodadas (0 = o do servidor).
+        Returns:
+            tuple: Um valor booleano indicando sucesso e o ID do torneio.
+        """
+        try:
+            regras = obter_regras(variant or self.regras.variante, best_of or self.regras.melhor_de)
+        except ValueError as e:
+            return False, str(e)
+        torneio_id = self._torneios.criar(kind, max(rounds, 0), regras)
+        if torneio_id is None:
+            return False, "Formato de torneio inválido"
+        return True, torneio_id
+
+    @sincronizado
+    def join_tournament(self, player_id, tournament_id):
+        """Inscreve o jogador em um torneio que ainda não começou.
+
+        O jogador sai da fila de espera e não pode voltar a ela até deixar o
+        torneio. Cada partida do torneio chega como "partida_encontrada" no
+        lobby (`wait_for_event` com `match_id` 0); eliminação, folga e fim do
+        torneio chegam como eventos "torneio".
+
+        Args:
+            player_id (str): ID do jogador.
+            tournament_id (int): ID do torneio.
+        Returns:
+            tuple: Um valor booleano indicando sucesso e uma mensagem informativa.
+        """
+        if player_id not in self.players:
+            return False, "Jogador não registrado"
+        self._visto(player_id)
+        sucesso, mensagem = self._torneios.inscrever(tournament_id, player_id)
+        if sucesso:
+            self.waiting_list.sair(player_id)
+        return sucesso, mensagem
+
+    @sincronizado
+    def start_tournament(self, tournament_id):
+        """Encerra as inscrições e cria a primeira onda de partidas do torneio.
+        Args:
+            tournament_id (int): ID do torneio.
+        Returns:
+            tuple: Um valor booleano indicando sucesso e uma mensagem informativa.
+        """
+        return self._torneios.iniciar(tournament_id)
+
+    @sincronizado
+    def get_tournament(self, tournament_id):
+        """Retorna a situação do torneio.
+        Args:
+            tournament_id (int): ID do torneio.
+        Returns:
+            tuple: Um valor booleano indicando sucesso e um dicionário com formato, situação,
+            jogadores, rodada atual, partidas em andamento, jogadas e prontas, e o campeão.
+        """
+        torneio = self._torneios.torneios.get(tournament_id)
+        if torneio is None:
+            return False, "Torneio não encontrado"
+        return True, torneio.resumo()
+
+    @sincronizado
+    def get_tournament_standings(self, tournament_id, limit):
+        """Retorna a classificação do torneio.
+        Args:
+            tournament_id (int): ID do torneio.
+            limit (int): Quantidade de jogadores (até 100).
+        Returns:
+            tuple: Um valor booleano indicando sucesso e a lista com posição e jogador (no suíço,
+            também pontos e Buchholz).
+        """
+        torneio = self._torneios.torneios.get(tournament_id)
+        if torneio is None:
+            return False, "Torneio não encontrado"
+        return True, torneio.classificacao(min(max(limit, 0), 100))
+
+    def _exportar_estado(self):
+        """Estado das partidas para o snapshot do diário (chamado com o lock adquirido).
+
+        Cada partida é gravada como uma tupla na ordem de `campos`, que vai junto
+        no snapshot: a restauração associa os valores pelo nome, e não pela
+        posição em `Partida.__slots__`. As regras são gravadas como
+        (variante, melhor_de); o vencedor não é gravado, porque sai do placar na
+        restauração.
+        """
+        campos = tuple(campo for campo in Partida.__slots__ if campo != "vencedor")
+        return {
+            "ultimo_id": self._ids.ultimo,
+            "campos": campos,
+            "partidas": [(match_id, *((partida.regras.variante, partida.regras.melhor_de) if campo == "regras"
+                                      else getattr(partida, campo) for campo in campos))
+                         for match_id, partida in self.matches.items()],
+        }
+
+    def _restaurar_partida(self, match_id, partida):
+        self.matches[match_id] = partida
+        self._ids.reservar_ate(match_id)
+        for player in partida.jogadores:
+            self.player_match[player] = match_id
+            self.players.setdefault(player, {"port": 0})["in_game"] = True
+            # Jogadores que não voltarem após a reinicialização expiram pelo coletor
+            self._visto(player)
+        if partida.escolha1 is not None and partida.escolha2 is not None:
+            self.resolve_match(match_id)  # Rodada completa que aguardava o lote quando o snapshot foi feito
+
+    @sincronizado
+    def _restaurar_estado(self, estado):
+        """Recria as partidas salvas no snapshot do diário.
+
+        Raises:
+            ErroDiario: Snapshot sem os nomes dos campos (gravado por uma versão
+                anterior, em que os valores seguiam a ordem dos slots da época).
+        """
+        if "campos" not in estado:
+            raise ErroDiario("Snapshot em formato antigo (campos sem nome); apague-o junto com os segmentos do diário")
+        self._ids.reservar_ate(estado["ultimo_id"])
+        for match_id, *valores in estado["partidas"]:
+            dados = dict(zip(estado["campos"], valores))
+            partida = Partida(dados.pop("jogador1"), dados.pop("jogador2"), dados.pop("inicio"),
+                              obter_regras(*dados.pop("regras")))
+            for campo, valor in dados.items():
+                setattr(partida, campo, valor)
+            partida.verificar_fim()
+            self._restaurar_partida(match_id, partida)
+
+    @sincronizado
+    def _reaplicar(self, registro):
+        """Reaplica um registro do diário, sem publicar eventos nem gravar no diário.
+
+        A rodada é resolvida de novo quando a segunda jogada é reaplicada, por
+        isso `resolve_match` não precisa de registro próprio.
+        """
+        tipo, match_id = registro[0], registro[1]
+        if tipo == "partida":
+            # Registros gravados antes das regras por partida não têm variante: clássico, melhor de 5
+            self._restaurar_partida(match_id, Partida(*registro[2:5], regras=obter_regras(*registro[5:7])))
+            return
+        partida = self.matches.get(match_id)
+        if partida is None:
+            return
+        if tipo == "jogada":
+            partida.registrar_escolha(registro[2], partida.regras.codigos[registro[3]])
+            if partida.escolha1 is not None and partida.escolha2 is not None:
+                self.resolve_match(match_id)
+        elif tipo == "ponto":
+            partida.marcar_ponto(registro[2])
+            partida.vencedor_rodada = registro[2]
+        elif tipo == "rodada":
+            partida.rodada += 1
+        elif tipo == "remocao":
+            del self.matches[match_id]
+            for player in partida.jogadores:
+                if self.player_match.get(player) == match_id:
+                    del self.player_match[player]
+                if player in self.players:
+                    self.players[player]["in_game"] = False
+
+    def _visto(self, player_id, agora=None):
+        """Registra o contato do jogador agora (chamado com o lock já adquirido)."""
+        self.ultimo_contato[player_id] = time.monotonic() if agora is None else agora
+        self.ultimo_contato.move_to_end(player_id)
+
+    @sincronizado
+    def heartbeat(self, player_id):
+        """Informa que o jogador continua conectado, mesmo sem outras chamadas.
+        Args:
+            player_id (str): ID do jogador.
+        Returns:
+            tuple: (True, "OK").
+        """
+        self._visto(player_id)
+        return True, "OK"
+
+    @sincronizado
+    def _expirar_inativos(self, agora=None):
+        """Remove o que pertence a jogadores sem contato há mais tempo que os TTLs.
+
+        Jogadores inativos há mais de `ttl_fila` saem da fila (e não são pareados
+        com jogadores ativos), partidas com um jogador inativo há mais de
+        `ttl_partida` são removidas (o oponente recebe "partida_removida") e,
+        depois de `ttl_jogador`, o cadastro e o tópico de eventos do jogador são
+        apagados. Como `ultimo_contato` está ordenado, só os jogadores inativos
+        são percorridos.
+        Args:
+            agora (float): Instante de referência (`time.monotonic`), para testes.
+        Returns:
+            dict: Quantidade de entradas removidas nesta passagem ("fila", "partidas", "jogadores").
+        """
+        agora = time.monotonic() if agora is None else agora
+        removidos = {"fila": 0, "partidas": 0, "jogadores": 0}
+        ttls = [ttl for ttl in (self.ttl_fila, self.ttl_partida, self.ttl_jogador) if ttl]
+        if not ttls:
+            return removidos
+        limite = agora - min(ttls)
+        fila, partidas, esquecer = [], set(), []
+        for player_id, visto in self.ultimo_contato.items():
+            if visto > limite:
+                break  # Daqui em diante todos tiveram contato recente
+            inativo = agora - visto
+            esquecido = bool(self.ttl_jogador) and inativo > self.ttl_jogador
+            if esquecido:
+                esquecer.append(player_id)
+            if esquecido or (self.ttl_fila and inativo > self.ttl_fila):
+                fila.append(player_id)
+            if esquecido or (self.ttl_partida and inativo > self.ttl_partida):
+                match_id = self.player_match.get(player_id)
+                if match_id is not None:
+                    partidas.add(match_id)
+        
+        for player_id in fila:
+            if self.waiting_list.sair(player_id):
+                removidos["fila"] += 1
+        for match_id in partidas:
+            if self.remove_match(match_id)[0]:
+                removidos["partidas"] += 1
+        for player_id in esquecer:
+            del self.ultimo_contato[player_id]
+            self.players.pop(player_id, None)
+            self.player_match.pop(player_id, None)
+            self._eventos.descartar(f"jogador:{player_id}")
+            removidos["jogadores"] += 1
+        
+        for chave, quantidade in removidos.items():
+            self.expirados[chave] += quantidade
+        # Partidas de torneio cuja criação falhou voltam a ser tentadas a cada passagem
+        self._torneios.agendar()
+        return removidos
+
+    def _iniciar_coletor(self, intervalo=None):
+        """Inicia a thread que remove periodicamente jogadores e partidas abandonados.
+        Args:
+            intervalo (float): Segundos entre as passagens (padrão: um quarto do menor TTL).
+        """
+        ttls = [ttl for ttl in (self.ttl_fila, self.ttl_partida, self.ttl_jogador) if ttl]
+        if not ttls:
+            return
+        intervalo = intervalo or max(1.0, min(ttls) / 4)
+        
+        def coletar():
+            while True:
+                time.sleep(intervalo)
+                removidos = self._expirar_inativos()
+                if any(removidos.values()):
+                    log.info("Entradas inativas removidas", extra={"campos": removidos})
+        
+        threading.Thread(target=coletar, name="coletor", daemon=True).start()
+
+    @sincronizado
+    def locate_match(self, match_id):
+        """Informa qual servidor atende a partida.
+
+        Com um único processo todas as partidas ficam aqui; no modo com shards
+        (ver `cluster.MatchRouter`) o roteador devolve o endereço do shard.
+        Args:
+            match_id (int): ID da partida.
+        Returns:
+            tuple: (True, {}) indicando que este mesmo servidor atende a partida.
+        """
+        return True, {}
+
+    @sincronizado
+    def _topico_eventos(self, player_id, match_id):
+        """Valida o pedido de espera e retorna o tópico de eventos correspondente."""
+        self._visto(player_id)
+        if not match_id:
+            return True, f"jogador:{player_id}"
+        partida = self.matches.get(match_id)
+        if partida is None:
+            return False, "Partida não encontrada"
+        if player_id not in partida:
+            return False, "Jogador não está nesta partida"
+        return True, f"partida:{match_id}"
+
+class EstatisticasConexoes:
+    """Contadores de conexões e requisições HTTP, usados para verificar o keep-alive."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.conexoes = 0  # Conexões TCP aceitas
+        self.requisicoes = 0  # Requisições XML-RPC atendidas
+
+    def nova_conexao(self):
+        with self._lock:
+            self.conexoes += 1
+
+    def nova_requisicao(self):
+        with self._lock:
+            self.requisicoes += 1
+
+    def resumo(self):
+        """Retorna os contadores e quantas requisições reaproveitaram uma conexão aberta."""
+        with self._lock:
+            return {
+                "conexoes": self.conexoes,
+                "requisicoes": self.requisicoes,
+                "reutilizadas": max(self.requisicoes - self.conexoes, 0),
+            }
+
+
+class RequisicaoRPC(rpc.SimpleXMLRPCRequestHandler):
+    """Handler XML-RPC com keep-alive (HTTP/1.1) e log de acesso enviado ao logger (amostrado)."""
+
+    protocol_version = "HTTP/1.1"  # Mantém a conexão aberta entre as chamadas do cliente
+    timeout = 60  # Fecha conexões ociosas, liberando a thread que as atende
+
+    def setup(self):
+        super().setup()
+        estatisticas = getattr(self.server, "estatisticas_conexoes", None)
+        if estatisticas is not None:
+            estatisticas.nova_conexao()
+
+    def do_POST(self):
+        estatisticas = getattr(self.server, "estatisticas_conexoes", None)
+        if estatisticas is not None:
+            estatisticas.nova_requisicao()
+        super().do_POST()
+
+    def do_GET(self):
+        """Exporta as métricas em `/metrics` no formato texto do Prometheus."""
+        metricas = getattr(self.server, "metricas", None)
+        if metricas is None or self.path.split("?", 1)[0] != "/metrics":
+            self.report_404()
+            return
+        corpo = metricas.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TIPO_PROMETHEUS)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_request(self, code='-', size='-'):
+        log_acesso.debug('"%s" %s', self.requestline, code,
+                         extra={"amostrar": True, "campos": {"cliente": self.client_address[0]}})
+
+    def log_error(self, format, *args):
+        # Conexões keep-alive ociosas expiram normalmente pelo timeout
+        nivel = logging.DEBUG if format.startswith("Request timed out") else logging.WARNING
+        log_acesso.log(nivel, format, *args, extra={"campos": {"cliente": self.client_address[0]}})
+
+
+class RequisicaoRPCSequencial(RequisicaoRPC):
+    """Handler do modo "simples": fecha a conexão a cada chamada.
+
+    Atendendo uma conexão por vez, uma conexão keep-alive ociosa bloquearia
+    todos os outros clientes até expirar.
+    """
+
+    protocol_version = "HTTP/1.0"
+
+
+class RequisicaoRPCPool(RequisicaoRPC):
+    """Handler do modo "threads": atende uma única requisição da conexão.
+
+    Depois da resposta a conexão keep-alive volta para o `ServidorPoolThreads`,
+    que espera a próxima requisição sem ocupar uma thread do pool.
+    """
+
+    # A conexão só chega ao pool quando já há dados: o cliente tem esse tempo para enviar o resto
+    timeout = 5
+
+    def setup(self):
+        # Pula a contagem de RequisicaoRPC: o handler é criado a cada requisição, e a
+        # conexão é contada uma vez, quando é aceita (ServidorPoolThreads.process_request)
+        rpc.SimpleXMLRPCRequestHandler.setup(self)
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+
+
+class ServidorPoolThreads(rpc.SimpleXMLRPCServer):
+    """Servidor XML-RPC que atende as requisições em um pool limitado de threads.
+
+    Um cliente lento ou travado ocupa apenas uma das threads do pool, em vez de
+    bloquear todas as chamadas dos demais jogadores. As threads atendem uma
+    requisição de cada vez: entre duas chamadas, a conexão keep-alive fica em um
+    selector e só volta ao pool quando a próxima requisição chega, então
+    conexões ociosas não ocupam threads.
+    """
+
+    request_queue_size = 1024  # Fila de conexões do listen (o padrão, 5, recusa picos de conexões novas)
+    ociosidade_maxima = 60  # Fecha as conexões keep-alive sem requisições há mais que isso (segundos)
+
+    def __init__(self, endereco, max_threads=32, **kwargs):
+        kwargs.setdefault("requestHandler", RequisicaoRPCPool)
+        super().__init__(endereco, **kwargs)
+        # Threads daemon: conexões em andamento não seguram o encerramento do processo
+        self.pendentes = queue.SimpleQueue()  # Conexões com uma requisição a atender
+        self._devolvidas = queue.SimpleQueue()  # Conexões keep-alive que voltam para o selector
+        self._despertar, self._avisar = socket.socketpair()  # Acorda o selector quando há devolvidas
+        self._avisar.setblocking(False)
+        threading.Thread(target=self._vigiar_ociosas, name="rpc-ociosas", daemon=True).start()
+        for i in range(max_threads):
+            threading.Thread(target=self._trabalhar, name=f"rpc-{i}", daemon=True).start()
+
+    def process_request(self, request, client_address):
+        estatisticas = getattr(self, "estatisticas_conexoes", None)
+        if estatisticas is not None:
+            estatisticas.nova_conexao()
+        self.pendentes.put((request, client_address))
+
+    def finish_request(self, request, client_address):
+        """Atende uma requisição da conexão. Retorna True se a conexão continua aberta (keep-alive)."""
+        return not self.RequestHandlerClass(request, client_address, self).close_connection
+
+    def _trabalhar(self):
+        while True:
+            request, client_address = self.pendentes.get()
+            manter = False
+            try:
+                manter = self.finish_request(request, client_address)
+            except ConnectionError as e:
+                # Cliente que fecha a conexão keep-alive no meio não é um erro do servidor
+                log_acesso.debug("Conexão de %s encerrada pelo cliente: %s", client_address[0], e)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                if manter:
+                    self._devolvidas.put((request, client_address))
+                    try:
+                        self._avisar.send(b"\0")
+                    except BlockingIOError:
+                        pass  # O selector já tem avisos pendentes para ler
+                else:
+                    self.shutdown_request(request)
+
+    def _vigiar_ociosas(self):
+        """Espera, em uma única thread, a próxima requisição das conexões keep-alive e a
+        entrega ao pool; fecha as que ficam ociosas por mais de `ociosidade_maxima`."""
+        seletor = selectors.DefaultSelector()
+        seletor.register(self._despertar, selectors.EVENT_READ)
+        ociosas = OrderedDict()  # Conexão -> instante em que ficou ociosa; a mais antiga primeiro
+        while True:
+            for chave, _ in seletor.select(timeout=1):
+                if chave.fileobj is self._despertar:
+                    self._despertar.recv(4096)
+                    continue
+                # Requisição nova (ou o cliente fechou a conexão, o que o handler também trata)
+                seletor.unregister(chave.fileobj)
+                del ociosas[chave.fileobj]
+                self.pendentes.put((chave.fileobj, chave.data))
+            while True:
+                try:
+                    request, client_address = self._devolvidas.get_nowait()
+                except queue.Empty:
+                    break
+                seletor.register(request, selectors.EVENT_READ, client_address)
+                ociosas[request] = time.monotonic()
+            limite = time.monotonic() - self.ociosidade_maxima
+            while ociosas:
+                request, desde = next(iter(ociosas.items()))
+                if desde > limite:
+                    break
+                del ociosas[request]
+                seletor.unregister(request)
+                self.shutdown_request(request)
+
+
+def criar_servidor(ip, porta, modo="simples", max_threads=32, id_no=0, total_nos=1, jogo=None, ttls=None,
+                   diario=None, historico=None, intervalo_rodadas=0, partidas_torneio=None, regras=None):
+    """Cria o servidor XML-RPC de acordo com o modo de concorrência escolhido.
+    Args:
+        ip (str): IP em que o servidor vai escutar.
+        porta (int): Porta do servidor.
+        modo (str): "simples" atende uma requisição por vez; "threads" usa um pool limitado de threads;
+            "asyncio" atende todas as conexões em um único event loop.
+        max_threads (int): Tamanho máximo do pool no modo "threads".
+        id_no (int): Índice deste servidor entre os que alocam IDs de partida.
+        total_nos (int): Quantidade de servidores alocando IDs de partida.
+        jogo (GameServer): Instância a ser servida (padrão: um novo `GameServer`).
+        ttls (tuple): TTLs (fila, partida, jogador) do coletor de inativos, em segundos
+            (padrão: os do `GameServer`; 0 desativa cada um).
+        diario (Diario): Persistência das partidas; o estado salvo é recuperado antes de servir.
+        historico (Historico): Banco onde as partidas encerradas são gravadas.
+        intervalo_rodadas (float): Se maior que 0, as rodadas completas são resolvidas em lote
+            a cada intervalo (segundos) em vez de na chamada da segunda jogada.
+        partidas_torneio (int): Partidas de torneio em andamento ao mesmo tempo (padrão: o do `GameServer`).
+        regras (Regras): Regras das partidas criadas pela fila de espera (padrão: clássico, melhor de 5).
+    Returns:
+        SimpleXMLRPCServer: O servidor pronto para `serve_forever`.
+    """
+    if modo == "threads":
+        servidor = ServidorPoolThreads((ip, porta), max_threads=max_threads)
+    elif modo == "asyncio":
+        servidor = ServidorAsyncio((ip, porta))
+    else:
+        servidor = rpc.SimpleXMLRPCServer((ip, porta), requestHandler=RequisicaoRPCSequencial)
+    if modo != "asyncio":
+        servidor.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    servidor.estatisticas_conexoes = EstatisticasConexoes()
+    if jogo is None:
+        jogo = GameServer(AlocadorIds(id_no, total_nos))
+    if modo == "simples":
+        # Sem threads um long-poll bloquearia todos os clientes: responde na hora
+        jogo.max_espera_evento = 0
+    elif modo == "threads":
+        # Os long-polls ocupam no máximo 3/4 do pool: o resto fica para as demais chamadas
+        jogo.vagas_espera = threading.BoundedSemaphore(max(1, max_threads - max(1, max_threads // 4)))
+    if ttls is not None:
+        jogo.ttl_fila, jogo.ttl_partida, jogo.ttl_jogador = ttls
+    if partidas_torneio is not None:
+        jogo._torneios.max_partidas = partidas_torneio
+    if regras is not None:
+        jogo.regras = regras
+    if diario is not None:
+        recuperado = diario.recuperar(jogo._restaurar_estado, jogo._reaplicar)
+        log.info("Partidas recuperadas do diário", extra={"campos": recuperado})
+        jogo._diario = diario
+        diario.iniciar(jogo._lock, jogo._exportar_estado)
+    if historico is not None:
+        # Depois da recuperação: partidas encerradas antes da queda não são gravadas de novo
+        jogo._historico = historico
+        historico.iniciar()
+    jogo._iniciar_coletor()
+    if intervalo_rodadas:
+        jogo._iniciar_rodadas_em_lote(intervalo_rodadas)
+    # Todas as chamadas ao jogo passam pelas métricas (RPC system.metrics e GET /metrics)
+    servidor.metricas = MetricasRPC(jogo, servidor.estatisticas_conexoes)
+    servidor.register_instance(servidor.metricas)
+    servidor.register_function(servidor.system_listMethods, 'system.listMethods')
+    servidor.register_function(servidor.estatisticas_conexoes.resumo, 'system.connection_stats')
+    servidor.register_function(servidor.metricas.resumo, 'system.metrics')
+    return servidor
+
+def iniciar_protocolo_binario(ip, porta, instancia):
+    """Serve o protocolo binário em segundo plano para a mesma instância do jogo."""
+    servidor_binario = ServidorBinario((ip, porta), instancia)
+    threading.Thread(target=servidor_binario.serve_forever, daemon=True).start()
+    log.info("Protocolo binário disponível em %s:%s", ip, porta)
+    return servidor_binario
+
 if __name__ == "__main__":
     """Função principal para iniciar o servidor RPS Battle Arena."""
     # Configurar argumentos de linha de comando
     parser = argparse.ArgumentParser(description='Servidor RPS Battle Arena')
     parser.add_argument('--ip', default='localhost', help='IP do servidor')
     parser.add_argument('--porta', type=int, default=5000, help='Porta do servidor')
+    parser.add_argument('--modo', choices=['simples', 'threads', 'asyncio'], default='simples',
+                        help='Modo de concorrência do servidor')
+    parser.add_argument('--max-threads', type=int, default=32,
+                        help='Número máximo de threads no modo "threads"')
+    parser.add_argument('--id-no', type=int, default=0,
+                        help='Índice deste servidor ao rodar vários servidores (IDs de partida não colidem)')
+    parser.add_argument('--total-nos', type=int, default=1,
+                        help='Quantidade de servidores que alocam IDs de partida')
+    parser.add_argument('--porta-binaria', type=int, default=0,
+                        help='Porta do protocolo binário, servido junto com o XML-RPC (0 desativa)')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='Processos que dividem as partidas entre si; este processo vira o roteador (0 desativa)')
+    parser.add_argument('--porta-shards', type=int, default=0,
+                        help='Primeira porta dos shards (padrão: porta + 100)')
+    parser.add_argument('--ttl-fila', type=float, default=60,
+                        help='Segundos sem contato até o jogador sair da fila de espera (0 desativa)')
+    parser.add_argument('--ttl-partida', type=float, default=120,
+                        help='Segundos sem contato de um jogador até a partida ser encerrada (0 desativa)')
+    parser.add_argument('--ttl-jogador', type=float, default=600,
+                        help='Segundos sem contato até o cadastro do jogador ser apagado (0 desativa)')
+    parser.add_argument('--dados', default='',
+                        help='Pasta do diário e dos snapshots; as partidas sobrevivem a reinicializações (vazio desativa)')
+    parser.add_argument('--fsync-ms', type=float, default=10,
+                        help='Intervalo mínimo entre dois fsync do diário, em milissegundos')
+    parser.add_argument('--snapshot-registros', type=int, default=100000,
+                        help='Registros do diário entre dois snapshots')
+    parser.add_argument('--lote-rodadas-ms', type=float, default=0,
+                        help='Resolve as rodadas completas em lote a cada N milissegundos (0 resolve na hora)')
+    parser.add_argument('--variante', choices=list(VARIANTES), default='classico',
+                        help='Variante do jogo nas partidas da fila de espera')
+    parser.add_argument('--melhor-de', type=int, default=5,
+                        help='Partidas em melhor de N rodadas (vence quem ganhar N // 2 + 1)')
+    parser.add_argument('--torneio-partidas', type=int, default=1000,
+                        help='Partidas de torneio em andamento ao mesmo tempo (as demais aguardam vaga)')
+    parser.add_argument('--historico', default='',
+                        help='Arquivo SQLite do histórico de partidas e do ranking (vazio desativa)')
+    parser.add_argument('--log-nivel', choices=list(NIVEIS), default='info',
+                        help='Nível mínimo dos logs ("off" desliga os logs)')
+    parser.add_argument('--log-amostragem', type=float, default=0.01,
+                        help='Fração dos logs de RPCs de leitura frequentes que é mantida (0 a 1)')
     args = parser.parse_args()    
+    try:
+        regras = obter_regras(args.variante, args.melhor_de)
+    except ValueError as e:
+        parser.error(str(e))
     
     ip = args.ip
     porta = args.porta
+    ttls = (args.ttl_fila, args.ttl_partida, args.ttl_jogador)
+    persistencia = (args.dados, args.fsync_ms / 1000, args.snapshot_registros) if args.dados else None
+    escritor_logs = configurar_logs(args.log_nivel, args.log_amostragem)
 
-    print("[DEBUG] Iniciando servidor RPS Battle Arena...")
-    print(f"[SETTINGS] IP: {ip}")
-    print(f"[SETTINGS] Porta: {porta}")
-    print(f"[SETTINGS] PID do servidor: {os.getpid()}")
+    log.info("Iniciando servidor RPS Battle Arena", extra={"campos": {
+        "ip": ip, "porta": porta, "modo": args.modo, "max_threads": args.max_threads,
+        "no": args.id_no, "total_nos": args.total_nos, "pid": os.getpid(),
+    }})
 
     # Iniciar servidor
-    print(f"[DEBUG] Iniciando servidor em {ip}:{porta}")
-    servidor = rpc.SimpleXMLRPCServer((ip, porta))
-    servidor.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    servidor.register_instance(GameServer())
-    servidor.register_function(servidor.system_listMethods, 'system.listMethods')
-    print("[DEBUG] Servidor iniciado com sucesso")
-    servidor.serve_forever()
\ No newline at end of file
+    processos_shards = []
+    if args.shards > 0:
+        # Importado aqui: o cluster importa este módulo
+        from cluster import iniciar_shards, MatchRouter
+        enderecos, processos_shards = iniciar_shards(
+            ip, args.porta_shards or porta + 100, args.shards, args.modo, args.max_threads,
+            binario=bool(args.porta_binaria), ttls=ttls, persistencia=persistencia, historico=args.historico,
+            intervalo_rodadas=args.lote_rodadas_ms / 1000,
+            log_nivel=args.log_nivel, log_amostragem=args.log_amostragem)
+        jogo = MatchRouter(enderecos)
+        diario = None  # O roteador só guarda o lobby; cada shard tem seu diário
+    else:
+        jogo = None
+        diario = Diario(*persistencia) if persistencia else None
+    # Com shards, os shards gravam as partidas e o roteador só consulta o mesmo arquivo
+    historico = Historico(args.historico) if args.historico else None
+    # O roteador não tem partidas: só os shards resolvem rodadas
+    servidor = criar_servidor(ip, porta, args.modo, args.max_threads, args.id_no, args.total_nos, jogo, ttls,
+                              diario, historico, 0 if args.shards > 0 else args.lote_rodadas_ms / 1000,
+                              args.torneio_partidas, regras)
+    log.info("Servidor iniciado com sucesso em %s:%s", ip, porta)
+    if args.porta_binaria:
+        # O protocolo binário atende a mesma instância do GameServer
+        iniciar_protocolo_binario(ip, args.porta_binaria, servidor.instance)
+    try:
+        servidor.serve_forever()
+    finally:
+        for processo in processos_shards:
+            processo.terminate()
+        if diario is not None:
+            diario.fechar()
+        if historico is not None:
+            historico.fechar()
+        if escritor_logs is not None:
+            escritor_logs.stop()
\ No newline at end of file
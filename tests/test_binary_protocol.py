@@ -0,0 +1,119 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Codificação do protocolo binário e rejeição de quadros malformados."""
+
+import io
+import socket
+import struct
+import threading
+
+import pytest
+
+from binary_protocol import (PROFUNDIDADE_MAXIMA, TAMANHO_MAXIMO_QUADRO, ClienteBinario, ErroProtocolo,
+                             ServidorBinario, codificar, decodificar, ler_quadro, montar_quadro)
+from server import GameServer
+
+VALORES = [
+    None, True, False,
+    0, 127, -128,  # int8
+    128, -129, 2**31 - 1, -2**31,  # int32
+    2**31, -2**31 - 1, 2**63 - 1, -2**63,  # int64
+    0.0, -1.5, 1e300,
+    "", "pedra", "ação ✂️",
+    [], [1, "dois", None, [3.0, [False]]],
+    {}, {"placar": {"1": 2, "2": 0}, 7: None, 1.5: [True]},
+]
+
+
+@pytest.mark.parametrize("valor", VALORES)
+def test_ida_e_volta(valor):
+    assert decodificar(codificar(valor)) == valor
+
+
+def test_tags_pelo_tamanho_do_inteiro():
+    assert codificar(127)[:1] == b"b"
+    assert codificar(128)[:1] == b"i"
+    assert codificar(2**31)[:1] == b"q"
+
+
+def test_tupla_vira_lista():
+    assert decodificar(codificar((1, ("a", 2)))) == [1, ["a", 2]]
+
+
+def test_tipo_nao_suportado():
+    with pytest.raises(TypeError):
+        codificar({1, 2})
+
+
+def test_quadro_truncado_em_qualquer_ponto():
+    dados = codificar(["make_move", [1, 2, "pedra", {"x": 1.5}]])
+    for tamanho in range(len(dados)):
+        with pytest.raises(ErroProtocolo):
+            decodificar(dados[:tamanho])
+
+
+@pytest.mark.parametrize("dados", [
+    b"x",  # Tag desconhecida
+    b"NN",  # Bytes sobrando
+    b"s\x00\x00\x00\x02\xff\xfe",  # UTF-8 inválido
+    b"s\xff\xff\xff\xffabc",  # Texto maior que o quadro
+    b"m\x00\x00\x00\x01l\x00\x00\x00\x00N",  # Chave de dicionário não hashable
+    b"m\x00\x00\x00\x01m\x00\x00\x00\x00N",
+    b"l\xff\xff\xff\xff",  # Lista que declara mais itens do que tem
+])
+def test_quadro_malformado(dados):
+    with pytest.raises(ErroProtocolo):
+        decodificar(dados)
+
+
+def test_aninhamento_no_limite_e_aceito():
+    valor = []
+    for _ in range(PROFUNDIDADE_MAXIMA - 1):
+        valor = [valor]
+    assert decodificar(codificar(valor)) == valor
+
+
+def test_aninhamento_alem_do_limite_e_recusado():
+    with pytest.raises(ErroProtocolo, match="Aninhamento"):
+        decodificar(b"l\x00\x00\x00\x01" * (PROFUNDIDADE_MAXIMA + 1) + b"N")
+    # Sem o limite, um quadro de 1 MiB estouraria a pilha do decodificador
+    with pytest.raises(ErroProtocolo):
+        decodificar(b"l\x00\x00\x00\x01" * (TAMANHO_MAXIMO_QUADRO // 5))
+
+
+def test_ler_quadro():
+    quadro = montar_quadro([True, "ok"])
+    arquivo = io.BytesIO(quadro + quadro[:3])
+    assert decodificar(ler_quadro(arquivo)) == [True, "ok"]
+    assert ler_quadro(arquivo) is None  # Conexão encerrada no meio do cabeçalho
+    with pytest.raises(ErroProtocolo):
+        ler_quadro(io.BytesIO(struct.pack(">I", TAMANHO_MAXIMO_QUADRO + 1)))
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorBinario(("127.0.0.1", 0), GameServer())
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor.server_address
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.mark.parametrize("quadro", [
+    montar_quadro("sem argumentos"),
+    montar_quadro(["register_player", {"x": 1}]),
+    struct.pack(">I", 7) + b"s\x00\x00\x00\x02\xff\xfe",
+    struct.pack(">I", 5 * 1000) + b"l\x00\x00\x00\x01" * 1000,
+])
+def test_quadro_malformado_fecha_so_a_conexao(servidor, quadro):
+    with socket.create_connection(servidor, timeout=5) as conexao:
+        conexao.sendall(quadro)
+        assert conexao.recv(1) == b""  # O servidor encerra a conexão sem responder
+    cliente = ClienteBinario(*servidor, timeout=5)
+    try:
+        assert cliente.register_player(1, 0) == [True, "Jogador 1 registrado com sucesso"]
+    finally:
+        cliente.close()
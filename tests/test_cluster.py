@@ -0,0 +1,55 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""`MatchRouter`: coletor de inativos enquanto a partida acontece em um shard."""
+
+import time
+
+import pytest
+
+from cluster import MatchRouter
+from server import GameServer
+
+
+class ShardIndisponivel:
+    def check_game_over(self, match_id):
+        raise ConnectionRefusedError("shard fora do ar")
+
+
+@pytest.fixture
+def roteador():
+    roteador = MatchRouter([{"ip": "127.0.0.1", "porta": 0, "porta_binaria": 0}])
+    roteador._proxies = [GameServer()]  # O shard atendido "em processo", com a mesma interface do proxy
+    for player in (1, 2, 3):
+        roteador.register_player(player, 0)
+    return roteador
+
+
+def depois_do_ttl(roteador):
+    return time.monotonic() + roteador.ttl_jogador + 1
+
+
+def test_jogador_em_partida_no_shard_nao_expira(roteador):
+    sucesso, match_id = roteador.add_match(1, 2)
+    assert sucesso
+    removidos = roteador._expirar_inativos(depois_do_ttl(roteador))
+    assert removidos["jogadores"] == 1  # Só o 3, que não está jogando
+    assert set(roteador.players) == {1, 2}
+    assert roteador.find_match(1) == (True, match_id)
+
+
+def test_jogador_expira_quando_o_shard_remove_a_partida(roteador):
+    _, match_id = roteador.add_match(1, 2)
+    roteador._proxies[0].remove_match(match_id)
+    removidos = roteador._expirar_inativos(depois_do_ttl(roteador))
+    assert removidos["jogadores"] == 3
+    assert not roteador.players and not roteador.player_match
+
+
+def test_shard_indisponivel_mantem_o_jogador(roteador):
+    roteador.add_match(1, 2)
+    roteador._proxies = [ShardIndisponivel()]
+    roteador._expirar_inativos(depois_do_ttl(roteador))
+    assert set(roteador.players) == {1, 2}
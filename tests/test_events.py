@@ -0,0 +1,124 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Long-poll do `EventBus`: sequências, espera por threads e asyncio e descarte de tópicos."""
+
+import asyncio
+import threading
+import time
+
+from events import EventBus
+from server import GameServer
+
+
+def em_thread(funcao, *args):
+    """Roda a função em outra thread e devolve uma lista que recebe o resultado."""
+    resultado = []
+    thread = threading.Thread(target=lambda: resultado.append(funcao(*args)))
+    thread.start()
+    return thread, resultado
+
+
+def esperar_bloqueio(eventos, topico):
+    """Espera o tópico existir (quem aguarda o cria) e dá tempo para a thread dormir."""
+    limite = time.monotonic() + 2
+    while topico not in eventos._topicos and time.monotonic() < limite:
+        time.sleep(0.001)
+    time.sleep(0.05)
+
+
+def test_sequencia_e_eventos_desde():
+    eventos = EventBus()
+    assert eventos.sequencia("t") == 0
+    assert eventos.publicar("t", "a", x=1) == 1
+    assert eventos.publicar("t", "b") == 2
+    assert eventos.eventos_desde("t", 0) == (2, [{"seq": 1, "tipo": "a", "x": 1}, {"seq": 2, "tipo": "b"}])
+    assert eventos.eventos_desde("t", 1) == (2, [{"seq": 2, "tipo": "b"}])
+    assert eventos.eventos_desde("t", 2) == (2, [])
+    assert eventos.eventos_desde("outro", 5) == (5, [])
+
+
+def test_historico_limitado():
+    eventos = EventBus(historico=3)
+    for _ in range(5):
+        eventos.publicar("t", "e")
+    seq, novos = eventos.eventos_desde("t", 0)
+    assert seq == 5
+    assert [evento["seq"] for evento in novos] == [3, 4, 5]
+
+
+def test_topico_recriado_recomeca_a_sequencia():
+    eventos = EventBus()
+    eventos.publicar("t", "a")
+    eventos.publicar("t", "b")
+    eventos.descartar("t")
+    eventos.publicar("t", "c")
+    assert eventos.eventos_desde("t", 2) == (1, [{"seq": 1, "tipo": "c"}])
+
+
+def test_aguardar_acorda_com_publicacao():
+    eventos = EventBus()
+    thread, resultado = em_thread(eventos.aguardar, "t", 0, 5)
+    esperar_bloqueio(eventos, "t")
+    eventos.publicar("t", "jogada")
+    thread.join(2)
+    assert resultado == [(1, [{"seq": 1, "tipo": "jogada"}])]
+
+
+def test_aguardar_sem_eventos_respeita_o_tempo():
+    inicio = time.monotonic()
+    assert EventBus().aguardar("t", 0, 0.05) == (0, [])
+    assert time.monotonic() - inicio >= 0.05
+
+
+def test_ultimo_evento_chega_a_quem_aguardava_o_topico_descartado():
+    eventos = EventBus()
+    thread, resultado = em_thread(eventos.aguardar, "partida:1", 0, 5)
+    esperar_bloqueio(eventos, "partida:1")
+    eventos.publicar("partida:1", "partida_removida")
+    eventos.descartar("partida:1")
+    thread.join(2)
+    assert resultado == [(1, [{"seq": 1, "tipo": "partida_removida"}])]
+
+
+def test_descarte_sem_evento_encerra_a_espera():
+    eventos = EventBus()
+    thread, resultado = em_thread(eventos.aguardar, "t", 0, 5)
+    esperar_bloqueio(eventos, "t")
+    inicio = time.monotonic()
+    eventos.descartar("t")
+    thread.join(2)
+    assert resultado == [(0, [])]
+    assert time.monotonic() - inicio < 1
+
+
+def test_aguardar_async_recebe_o_evento_do_topico_descartado():
+    eventos = EventBus()
+
+    async def cenario():
+        espera = asyncio.ensure_future(eventos.aguardar_async("partida:1", 0, 5))
+        await asyncio.sleep(0.05)
+        # Publicado por outra thread, como faz o servidor
+        thread = threading.Thread(target=lambda: (eventos.publicar("partida:1", "partida_removida"),
+                                                  eventos.descartar("partida:1")))
+        thread.start()
+        resultado = await asyncio.wait_for(espera, 2)
+        thread.join()
+        return resultado
+
+    assert asyncio.run(cenario()) == (1, [{"seq": 1, "tipo": "partida_removida"}])
+
+
+def test_remove_match_avisa_quem_aguardava():
+    jogo = GameServer()
+    for player in (1, 2):
+        jogo.register_player(player, 0)
+    _, match_id = jogo.add_match(1, 2)
+    thread, resultado = em_thread(jogo.wait_for_event, 1, match_id, 0, 5)
+    esperar_bloqueio(jogo._eventos, f"partida:{match_id}")
+    jogo.remove_match(match_id)
+    thread.join(2)
+    assert resultado == [(True, {"seq": 1, "eventos": [{"seq": 1, "tipo": "partida_removida"}]})]
+    assert jogo.wait_for_event(1, match_id, 1, 0) == (False, "Partida não encontrada")
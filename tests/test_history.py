@@ -0,0 +1,88 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""`Historico`: gravação das partidas encerradas, histórico por jogador e ranking."""
+
+import pytest
+
+from history import Historico
+from server import GameServer
+
+
+@pytest.fixture
+def historico(tmp_path):
+    historico = Historico(str(tmp_path / "historico.db"), intervalo=0)
+    historico.iniciar()
+    yield historico
+    historico.fechar()
+
+
+def gravar(historico, partidas):
+    """Registra as partidas (match_id, jogador1, jogador2, vencedor) e espera a gravação."""
+    for fim, (match_id, jogador1, jogador2, vencedor) in enumerate(partidas, 1):
+        placar, decisiva = ((1, 0), ("pedra", "tesoura")) if vencedor == jogador1 else ((0, 1), ("tesoura", "pedra"))
+        historico.registrar(match_id, jogador1, jogador2, vencedor, *placar, 0.0, float(fim),
+                            [("pedra", "pedra", None), (*decisiva, vencedor)])
+    historico.fechar()
+
+
+def test_historico_do_jogador(historico):
+    gravar(historico, [(1, 1, 2, 1), (2, 3, 1, 3), (3, 2, 3, 2)])
+    assert historico.estatisticas()["historico_partidas_total"] == 3
+    assert historico.estatisticas()["historico_pendentes"] == 0
+    partidas = historico.historico_jogador(1)
+    assert [partida["match_id"] for partida in partidas] == [2, 1]  # Mais recente primeiro
+    antiga = partidas[1]
+    assert (antiga["oponente"], antiga["vencedor"], antiga["duracao"]) == (2, 1, 1.0)
+    assert antiga["placar"] == {"1": 1, "2": 0}
+    assert antiga["rodadas"] == [
+        {"escolhas": {"1": "pedra", "2": "pedra"}, "vencedor": ""},
+        {"escolhas": {"1": "pedra", "2": "tesoura"}, "vencedor": 1},
+    ]
+    assert partidas[0]["oponente"] == 3
+    assert [partida["match_id"] for partida in historico.historico_jogador(1, 1)] == [2]
+    assert historico.historico_jogador(99) == []
+
+
+def test_ranking(historico):
+    gravar(historico, [(1, 1, 2, 1), (2, 1, 3, 1), (3, 2, 3, 2), (4, 4, 3, 4)])
+    assert historico.ranking() == [
+        {"posicao": 1, "jogador": 1, "vitorias": 2, "derrotas": 0},
+        {"posicao": 2, "jogador": 4, "vitorias": 1, "derrotas": 0},
+        {"posicao": 3, "jogador": 2, "vitorias": 1, "derrotas": 1},
+        {"posicao": 4, "jogador": 3, "vitorias": 0, "derrotas": 3},
+    ]
+    assert [linha["jogador"] for linha in historico.ranking(2)] == [1, 4]
+
+
+def test_historico_sobrevive_a_reabertura(historico):
+    gravar(historico, [(1, 1, 2, 2)])
+    reaberto = Historico(historico.caminho)
+    assert reaberto.ranking(1) == [{"posicao": 1, "jogador": 2, "vitorias": 1, "derrotas": 0}]
+
+
+def test_partida_encerrada_no_servidor_vai_para_o_historico(historico):
+    jogo = GameServer()
+    jogo._historico = historico
+    for player in (1, 2):
+        jogo.register_player(player, 0)
+    _, match_id = jogo.add_match(1, 2, "classico", 1)
+    jogo.make_move(1, match_id, "pedra")
+    jogo.make_move(2, match_id, "tesoura")
+    historico.fechar()
+    sucesso, partidas = jogo.get_player_history(2, 10)
+    assert sucesso and len(partidas) == 1
+    assert partidas[0]["match_id"] == match_id and partidas[0]["vencedor"] == 1
+    assert partidas[0]["rodadas"] == [{"escolhas": {"1": "pedra", "2": "tesoura"}, "vencedor": 1}]
+    assert jogo.get_leaderboard(10) == (True, [
+        {"posicao": 1, "jogador": 1, "vitorias": 1, "derrotas": 0},
+        {"posicao": 2, "jogador": 2, "vitorias": 0, "derrotas": 1},
+    ])
+
+
+def test_historico_desativado():
+    jogo = GameServer()
+    assert jogo.get_player_history(1, 10) == (False, "Histórico desativado no servidor")
+    assert jogo.get_leaderboard(10) == (False, "Histórico desativado no servidor")
@@ -0,0 +1,52 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""`AlocadorIds`: IDs crescentes, sem colisão entre nós e com o dono dedutível pelo ID."""
+
+import pytest
+
+from ids import MAXIMO_ID, AlocadorIds
+
+
+def test_ids_crescentes_e_sem_reuso():
+    alocador = AlocadorIds()
+    ids = [alocador.proximo() for _ in range(5)]
+    assert ids == [1, 2, 3, 4, 5]
+    assert alocador.ultimo == 5
+
+
+@pytest.mark.parametrize("total", [1, 2, 3, 7])
+def test_cada_no_gera_apenas_os_seus_ids(total):
+    alocadores = [AlocadorIds(no, total) for no in range(total)]
+    vistos = set()
+    for no, alocador in enumerate(alocadores):
+        for _ in range(50):
+            match_id = alocador.proximo()
+            assert match_id % total == no
+            assert alocador.no_do_id(match_id) == no
+            assert 0 < match_id not in vistos
+            vistos.add(match_id)
+
+
+def test_reservar_ate_preserva_o_no():
+    alocador = AlocadorIds(2, 4)
+    alocador.reservar_ate(42)  # ID recuperado do diário deste nó
+    proximo = alocador.proximo()
+    assert proximo > 42 and proximo % 4 == 2
+    alocador.reservar_ate(10)  # IDs menores não fazem o contador voltar
+    assert alocador.proximo() > proximo
+
+
+@pytest.mark.parametrize("no, total", [(0, 0), (-1, 2), (2, 2)])
+def test_no_invalido(no, total):
+    with pytest.raises(ValueError):
+        AlocadorIds(no, total)
+
+
+def test_esgotamento():
+    alocador = AlocadorIds(1, 2)
+    alocador.reservar_ate(MAXIMO_ID)
+    with pytest.raises(OverflowError):
+        alocador.proximo()
@@ -0,0 +1,124 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Recuperação das partidas pelo diário: snapshot + reaplicação dos segmentos."""
+
+import marshal
+import os
+import time
+
+import pytest
+
+from journal import SNAPSHOT, Diario, ErroDiario
+from match import Partida
+from server import GameServer
+
+
+def abrir(pasta, registros_por_snapshot=100_000):
+    """Servidor com o diário da pasta recuperado e a thread escritora iniciada."""
+    jogo = GameServer()
+    diario = Diario(str(pasta), intervalo_fsync=0, registros_por_snapshot=registros_por_snapshot)
+    diario.recuperar(jogo._restaurar_estado, jogo._reaplicar)
+    jogo._diario = diario
+    diario.iniciar(jogo._lock, jogo._exportar_estado)
+    return jogo, diario
+
+
+def recuperar(pasta):
+    jogo = GameServer()
+    resumo = Diario(str(pasta)).recuperar(jogo._restaurar_estado, jogo._reaplicar)
+    return jogo, resumo
+
+
+def estado(jogo):
+    return ({match_id: tuple(getattr(partida, campo) for campo in Partida.__slots__)
+             for match_id, partida in jogo.matches.items()}, dict(jogo.player_match))
+
+
+def jogar(jogo, jogador1, jogador2, *jogadas, variante="classico", melhor_de=5):
+    _, match_id = jogo.add_match(jogador1, jogador2, variante, melhor_de)
+    for escolha1, escolha2 in jogadas:
+        jogo.make_move(jogador1, match_id, escolha1)
+        if escolha2:
+            jogo.make_move(jogador2, match_id, escolha2)
+    return match_id
+
+
+def test_snapshot_e_reaplicacao_recuperam_o_mesmo_estado(tmp_path):
+    jogo, diario = abrir(tmp_path, registros_por_snapshot=1)
+    for player in range(1, 9):
+        jogo.register_player(player, 0)
+    jogar(jogo, 1, 2, ("pedra", "tesoura"), ("papel", "papel"))
+    removida = jogar(jogo, 3, 4, ("spock", "lagarto"), variante="rpsls", melhor_de=3)
+    limite = time.monotonic() + 5
+    while diario.snapshots == 0 and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert diario.snapshots >= 1
+    diario.registros_por_snapshot = 100_000  # O resto fica só nos segmentos seguintes
+    jogo.remove_match(removida)
+    jogar(jogo, 5, 6, ("tesoura", "papel"), ("pedra", None))
+    jogar(jogo, 7, 8, ("pedra", "tesoura"), ("pedra", "tesoura"), ("pedra", "tesoura"))
+    diario.fechar()
+
+    recuperado, resumo = recuperar(tmp_path)
+    assert resumo["registros"] > 0
+    assert estado(recuperado) == estado(jogo)
+    assert recuperado._ids.proximo() == jogo._ids.proximo()
+
+
+def test_reaplicacao_sem_snapshot(tmp_path):
+    jogo, diario = abrir(tmp_path)
+    match_id = jogar(jogo, 1, 2, ("pedra", "papel"))
+    jogo.add_score(1, match_id)
+    jogo.add_round(match_id)
+    diario.fechar()
+
+    recuperado, resumo = recuperar(tmp_path)
+    assert resumo["partidas_snapshot"] == 0
+    assert estado(recuperado) == estado(jogo)
+    partida = recuperado.matches[match_id]
+    assert (partida.placar1, partida.placar2, partida.rodada) == (1, 1, 4)
+
+
+def test_registro_incompleto_no_fim_e_descartado(tmp_path):
+    jogo, diario = abrir(tmp_path)
+    jogar(jogo, 1, 2, ("pedra", "papel"))
+    diario.fechar()
+    segmento = diario._caminho_segmento(diario._segmento)
+    tamanho = os.path.getsize(segmento)
+    with open(segmento, "ab") as arquivo:
+        arquivo.write(b"\x00\x00\x00\x40\x12")  # Cabeçalho cortado no meio de uma escrita
+
+    recuperado, _ = recuperar(tmp_path)
+    assert estado(recuperado) == estado(jogo)
+    assert os.path.getsize(segmento) == tamanho
+
+
+def test_snapshot_de_formato_anterior_e_recusado(tmp_path):
+    with open(tmp_path / SNAPSHOT, "wb") as arquivo:
+        arquivo.write(b"RPSS\x01" + marshal.dumps({"ultimo_id": 1, "segmento": 1, "partidas": []}))
+    with pytest.raises(ErroDiario, match="outro formato"):
+        recuperar(tmp_path)
+
+
+def test_snapshot_sem_nomes_dos_campos_e_recusado():
+    with pytest.raises(ErroDiario, match="formato antigo"):
+        GameServer()._restaurar_estado({"ultimo_id": 1, "partidas": [(1, 1, 2, 0, 0)]})
+
+
+def test_registro_corrompido_fora_do_ultimo_segmento_e_recusado(tmp_path):
+    for _ in range(2):  # Duas execuções: dois segmentos
+        jogo, diario = abrir(tmp_path)
+        jogar(jogo, 1, 2, ("pedra", "papel"))
+        diario.fechar()
+    primeiro = diario._caminho_segmento(diario._segmentos()[0])
+    with open(primeiro, "r+b") as arquivo:
+        arquivo.seek(-1, os.SEEK_END)
+        arquivo.write(b"\xff")  # O CRC do último registro deixa de bater
+    tamanho = os.path.getsize(primeiro)
+
+    with pytest.raises(ErroDiario, match="ilegível"):
+        recuperar(tmp_path)
+    assert os.path.getsize(primeiro) == tamanho  # Nada foi apagado
@@ -0,0 +1,64 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Fila de pareamento (`Matchmaker`): ordem de chegada, duplicatas e saída da fila."""
+
+from matchmaking import Matchmaker
+from server import GameServer
+
+
+def test_pareia_por_ordem_de_chegada():
+    fila = Matchmaker()
+    for player in (3, 1, 2, 4):
+        assert fila.entrar(player)
+    assert fila.parear() == (3, 1)
+    assert fila.parear() == (2, 4)
+    assert fila.parear() is None
+    assert len(fila) == 0
+
+
+def test_nao_aceita_duplicatas():
+    fila = Matchmaker()
+    assert fila.entrar(1)
+    assert not fila.entrar(1)
+    assert len(fila) == 1
+    assert fila.parear() is None  # Um jogador não é pareado consigo mesmo
+
+
+def test_sair_da_fila():
+    fila = Matchmaker()
+    fila.entrar(1)
+    fila.entrar(2)
+    fila.entrar(3)
+    assert fila.sair(2)
+    assert not fila.sair(2)
+    assert 2 not in fila and 1 in fila
+    assert fila.parear() == (1, 3)
+
+
+def test_estatisticas():
+    fila = Matchmaker()
+    assert fila.estatisticas()["espera_atual_maxima"] == 0.0
+    for player in (1, 2, 3):
+        fila.entrar(player)
+    fila.parear()
+    estatisticas = fila.estatisticas()
+    assert estatisticas["profundidade"] == 1
+    assert estatisticas["total_pareados"] == 2
+    assert 0.0 <= estatisticas["espera_media"] <= estatisticas["espera_maxima"]
+    assert estatisticas["espera_atual_maxima"] >= 0.0
+
+
+def test_servidor_ignora_entrada_repetida_na_fila():
+    jogo = GameServer()
+    for player in (1, 2):
+        jogo.register_player(player, 0)
+    assert jogo.add_to_waiting_list(1) == (True, "Aguardando mais jogadores")
+    assert jogo.add_to_waiting_list(1) == (True, "Jogador já está na lista de espera")
+    assert not jogo.matches
+    jogo.add_to_waiting_list(2)
+    assert len(jogo.waiting_list) == 0
+    (partida,) = jogo.matches.values()
+    assert set(partida.jogadores) == {1, 2}
@@ -0,0 +1,70 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""`MetricasRPC`: contagem de chamadas e erros, métodos expostos e exportação das métricas."""
+
+import pytest
+
+from binary_protocol import ErroRemoto
+from metrics import LIMITES_LATENCIA, MetricasRPC, percentil_histograma
+from server import EstatisticasConexoes, GameServer
+
+
+@pytest.fixture
+def metricas():
+    return MetricasRPC(GameServer(), EstatisticasConexoes())
+
+
+def test_conta_chamadas_e_erros(metricas):
+    assert metricas._dispatch("register_player", (1, 0)) == (True, "Jogador 1 registrado com sucesso")
+    metricas._dispatch("register_player", (1, 0))
+    with pytest.raises(TypeError):
+        metricas._dispatch("register_player", (1,))
+    resumo = metricas.resumo()["metodos"]["register_player"]
+    assert (resumo["chamadas"], resumo["erros"]) == (3, 1)
+    assert 0.0 < resumo["p50_ms"] <= resumo["p99_ms"]
+
+
+@pytest.mark.parametrize("metodo", ["inexistente", "_visto", "_expirar_inativos", "system.metrics"])
+def test_rejeita_metodos_privados_e_desconhecidos(metricas, metodo):
+    with pytest.raises(ErroRemoto):
+        metricas._dispatch(metodo, ())
+    assert not metricas.resumo()["metodos"]
+
+
+def test_lista_apenas_metodos_publicos(metricas):
+    metodos = metricas._listMethods()
+    assert {"register_player", "make_move", "wait_for_event"} <= set(metodos)
+    assert not [nome for nome in metodos if nome.startswith("_")]
+    assert metodos == sorted(metodos)
+
+
+def test_medidores(metricas):
+    metricas._dispatch("register_player", (1, 0))
+    metricas._dispatch("add_to_waiting_list", (1,))
+    medidores = metricas.resumo()["medidores"]
+    assert medidores["jogadores"] == 1
+    assert medidores["fila_espera"] == 1
+    assert medidores["partidas_ativas"] == 0
+    assert medidores["conexoes_total"] == 0
+
+
+def test_prometheus(metricas):
+    metricas._dispatch("register_player", (1, 0))
+    texto = metricas.prometheus()
+    assert 'rps_rpc_chamadas_total{metodo="register_player"} 1\n' in texto
+    assert 'rps_rpc_erros_total{metodo="register_player"} 0\n' in texto
+    assert 'rps_rpc_latencia_segundos_bucket{metodo="register_player",le="+Inf"} 1\n' in texto
+    assert "# TYPE rps_jogadores gauge\nrps_jogadores 1\n" in texto
+    assert "# TYPE rps_jogadores_expirados_total counter\n" in texto
+
+
+def test_percentil_histograma():
+    intervalos = [0] * (len(LIMITES_LATENCIA) + 1)
+    assert percentil_histograma(intervalos, 0.5) == 0.0
+    intervalos[0] = 9
+    intervalos[-1] = 1
+    assert percentil_histograma(intervalos, 0.5) == LIMITES_LATENCIA[0]
+    assert percentil_histograma(intervalos, 0.99) == float("inf")
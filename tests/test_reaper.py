@@ -0,0 +1,94 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Coletor de inativos (`GameServer._expirar_inativos`): TTLs da fila, da partida e do jogador."""
+
+import time
+
+import pytest
+
+from server import GameServer
+
+
+@pytest.fixture
+def jogo():
+    jogo = GameServer()
+    for player in (1, 2, 3):
+        jogo.register_player(player, 0)
+    return jogo
+
+
+@pytest.fixture
+def inicio(jogo):
+    """Instante de referência: todos os jogadores tiveram contato até aqui."""
+    agora = time.monotonic()
+    for player in jogo.players:
+        jogo._visto(player, agora)
+    return agora
+
+
+def test_contato_recente_nao_expira(jogo, inicio):
+    jogo.add_to_waiting_list(3)
+    _, match_id = jogo.add_match(1, 2)
+    assert jogo._expirar_inativos(inicio + jogo.ttl_fila - 1) == {"fila": 0, "partidas": 0, "jogadores": 0}
+    assert 3 in jogo.waiting_list and match_id in jogo.matches
+
+
+def test_ttl_fila(jogo, inicio):
+    jogo.add_to_waiting_list(1)
+    agora = inicio + jogo.ttl_fila + 1
+    assert jogo._expirar_inativos(agora)["fila"] == 1
+    assert 1 not in jogo.waiting_list and 1 in jogo.players
+    # O jogador inativo não é pareado com quem chega depois
+    jogo._visto(2, agora)
+    jogo.add_to_waiting_list(2)
+    assert not jogo.matches and 2 in jogo.waiting_list
+
+
+def test_ttl_partida(jogo, inicio):
+    _, match_id = jogo.add_match(1, 2)
+    jogo._visto(2, inicio + jogo.ttl_partida)  # Só o jogador 1 abandonou a partida
+    assert jogo._expirar_inativos(inicio + jogo.ttl_partida + 1)["partidas"] == 1
+    assert match_id not in jogo.matches
+    assert not jogo.player_match
+    assert not jogo.players[2]["in_game"]
+    assert jogo.expirados["partidas"] == 1
+
+
+def test_ttl_jogador(jogo, inicio):
+    _, match_id = jogo.add_match(1, 2)
+    jogo._visto(3, inicio + jogo.ttl_jogador)
+    removidos = jogo._expirar_inativos(inicio + jogo.ttl_jogador + 1)
+    assert removidos == {"fila": 0, "partidas": 1, "jogadores": 2}
+    assert set(jogo.players) == {3} and list(jogo.ultimo_contato) == [3]
+    assert match_id not in jogo.matches and not jogo.player_match
+    assert "jogador:1" not in jogo._eventos._topicos
+
+
+def test_ttl_fila_zero_mantem_a_fila(jogo, inicio):
+    jogo.ttl_fila = 0
+    jogo.add_to_waiting_list(3)
+    jogo._expirar_inativos(inicio + jogo.ttl_partida + 1)
+    assert 3 in jogo.waiting_list
+
+
+def test_ttl_partida_zero_mantem_a_partida(jogo, inicio):
+    jogo.ttl_partida = 0
+    _, match_id = jogo.add_match(1, 2)
+    jogo._expirar_inativos(inicio + jogo.ttl_jogador - 1)
+    assert match_id in jogo.matches
+
+
+def test_ttl_jogador_zero_mantem_o_cadastro(jogo, inicio):
+    jogo.ttl_jogador = 0
+    jogo._expirar_inativos(inicio + 10**6)
+    assert len(jogo.players) == 3
+
+
+def test_sem_ttls_nada_expira(jogo, inicio):
+    jogo.ttl_fila = jogo.ttl_partida = jogo.ttl_jogador = 0
+    jogo.add_to_waiting_list(3)
+    assert jogo._expirar_inativos(inicio + 10**6) == {"fila": 0, "partidas": 0, "jogadores": 0}
+    assert len(jogo.players) == 3
@@ -0,0 +1,79 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Tabelas de resultados das variantes e resolução em lote."""
+
+import itertools
+
+import pytest
+
+from rules import EMPATOU, VARIANTES, VENCE_JOGADOR1, VENCE_JOGADOR2, Regras, obter_regras
+
+# Quem vence quem, escrito à mão (e não pela fórmula da tabela)
+VENCE = {
+    "classico": {("pedra", "tesoura"), ("tesoura", "papel"), ("papel", "pedra")},
+    "rpsls": {
+        ("tesoura", "papel"), ("papel", "pedra"), ("pedra", "lagarto"), ("lagarto", "spock"),
+        ("spock", "tesoura"), ("tesoura", "lagarto"), ("lagarto", "papel"), ("papel", "spock"),
+        ("spock", "pedra"), ("pedra", "tesoura"),
+    },
+}
+
+
+def esperado(variante, jogada1, jogada2):
+    if jogada1 == jogada2:
+        return EMPATOU
+    if (jogada1, jogada2) in VENCE[variante]:
+        return VENCE_JOGADOR1
+    assert (jogada2, jogada1) in VENCE[variante]
+    return VENCE_JOGADOR2
+
+
+@pytest.mark.parametrize("variante", sorted(VARIANTES))
+def test_tabela(variante):
+    regras = obter_regras(variante)
+    opcoes = VARIANTES[variante]
+    assert regras.opcoes == opcoes
+    assert len(regras.tabela) == len(opcoes) ** 2
+    for jogada1, jogada2 in itertools.product(opcoes, repeat=2):
+        codigo1, codigo2 = regras.codigos[jogada1], regras.codigos[jogada2]
+        assert regras.tabela[codigo1 * regras.tamanho + codigo2] == esperado(variante, jogada1, jogada2), \
+            (jogada1, jogada2)
+
+
+@pytest.mark.parametrize("variante", sorted(VARIANTES))
+def test_cada_jogada_vence_metade_das_outras(variante):
+    regras = obter_regras(variante)
+    for codigo in range(regras.tamanho):
+        linha = regras.tabela[codigo * regras.tamanho:(codigo + 1) * regras.tamanho]
+        assert linha.count(VENCE_JOGADOR1) == linha.count(VENCE_JOGADOR2) == regras.tamanho // 2
+
+
+@pytest.mark.parametrize("variante", sorted(VARIANTES))
+def test_resultados_em_lote(variante):
+    regras = obter_regras(variante)
+    pares = list(itertools.product(range(regras.tamanho), repeat=2))
+    escolhas1, escolhas2 = [a for a, _ in pares], [b for _, b in pares]
+    assert regras.resultados_em_lote(escolhas1, escolhas2) == list(regras.tabela)
+    np = pytest.importorskip("numpy")
+    resultado = regras.resultados_em_lote(np.array(escolhas1), np.array(escolhas2))
+    assert resultado.tolist() == list(regras.tabela)
+
+
+@pytest.mark.parametrize("melhor_de, vitorias", [(1, 1), (3, 2), (4, 3), (5, 3), (7, 4)])
+def test_vitorias_necessarias(melhor_de, vitorias):
+    assert obter_regras("rpsls", melhor_de).vitorias == vitorias
+
+
+def test_regras_compartilhadas():
+    assert obter_regras() is obter_regras("classico", 5)
+    assert obter_regras("rpsls", 3) is obter_regras("rpsls", 3)
+    assert obter_regras("rpsls", 3) is not obter_regras("rpsls", 5)
+
+
+@pytest.mark.parametrize("variante, melhor_de", [("xadrez", 5), ("classico", 0), ("rpsls", -1)])
+def test_regras_invalidas(variante, melhor_de):
+    with pytest.raises(ValueError):
+        Regras(variante, melhor_de)
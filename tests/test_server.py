@@ -0,0 +1,81 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""RPCs do `GameServer`: fim de partida (pela rodada jogada e pelo `add_score`) e métodos expostos."""
+
+import threading
+
+import pytest
+
+from binary_protocol import ErroRemoto
+from metrics import MetricasRPC
+from server import GameServer
+
+
+@pytest.fixture
+def jogo():
+    jogo = GameServer()
+    for player in (1, 2):
+        jogo.register_player(player, 0)
+    return jogo
+
+
+def eventos(jogo, player_id, match_id):
+    sucesso, resposta = jogo.wait_for_event(player_id, match_id, 0, 0)
+    assert sucesso
+    return [(evento["tipo"], evento.get("vencedor")) for evento in resposta["eventos"]]
+
+
+def test_add_score_decide_a_partida(jogo):
+    _, match_id = jogo.add_match(1, 2, "classico", 3)
+    assert jogo.add_score(1, match_id) == (True, "Ponto adicionado ao jogador 1")
+    assert jogo.check_game_over(match_id) == (False, "O jogo ainda não terminou")
+    jogo.make_move(1, match_id, "pedra")
+    jogo.make_move(2, match_id, "tesoura")
+    assert jogo.add_score(2, match_id) == (False, "A partida já terminou")
+    partida = jogo.matches[match_id]
+    assert (partida.placar1, partida.placar2, partida.vencedor) == (2, 0, 1)
+    assert eventos(jogo, 1, match_id).count(("fim_de_jogo", 1)) == 1
+
+
+def test_ponto_que_encerra_publica_fim_de_jogo(jogo):
+    _, match_id = jogo.add_match(1, 2, "classico", 3)
+    jogo.add_score(2, match_id)
+    jogo.add_score(2, match_id)
+    assert eventos(jogo, 1, match_id) == [("rodada", None), ("rodada", None), ("fim_de_jogo", 2)]
+    assert jogo.add_score(1, match_id) == (False, "A partida já terminou")
+    assert jogo.make_move(1, match_id, "pedra") == (False, "A partida já terminou")
+
+
+def test_add_score_avanca_o_torneio(jogo):
+    _, torneio_id = jogo.create_tournament("eliminatoria", 0, "classico", 1)
+    for player in (1, 2):
+        assert jogo.join_tournament(player, torneio_id)[0]
+    assert jogo.start_tournament(torneio_id)[0]
+    match_id = jogo.player_match[1]
+    assert jogo.add_score(2, match_id)[0]
+    _, resumo = jogo.get_tournament(torneio_id)
+    assert (resumo["situacao"], resumo["campeao"]) == ("encerrado", 2)
+
+
+@pytest.mark.parametrize("player_id, match_id, mensagem", [
+    (1, 99, "Partida não encontrada"),
+    (3, 1, "Jogador não está nesta partida"),
+])
+def test_add_score_invalido(jogo, player_id, match_id, mensagem):
+    jogo.add_match(1, 2)
+    assert jogo.add_score(player_id, match_id) == (False, mensagem)
+
+
+
+@pytest.mark.parametrize("metodo", ["iniciar_coletor", "_iniciar_coletor", "iniciar_rodadas_em_lote",
+                                    "_iniciar_rodadas_em_lote"])
+def test_metodos_que_iniciam_threads_nao_sao_rpc(metodo):
+    rpc = MetricasRPC(GameServer())
+    assert metodo not in rpc._listMethods()
+    threads = threading.active_count()
+    with pytest.raises(ErroRemoto):
+        rpc._dispatch(metodo, (0.5,))
+    assert threading.active_count() == threads
@@ -0,0 +1,162 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Chaves de eliminação simples (folgas e avanço) e emparelhamento do suíço."""
+
+import pytest
+
+from rules import obter_regras
+from server import GameServer
+from tournament import ENCERRADO, GerenciadorTorneios, ordem_sementes
+
+
+def jogar_torneio(formato, jogadores, rodadas=0, vencedor=min):
+    """Joga o torneio até o fim, encerrando as partidas na ordem em que foram criadas.
+    Returns:
+        tuple: (torneio, partidas criadas [(jogador1, jogador2)], avisos [(jogador, campos)], gerenciador).
+    """
+    partidas, avisos = [], []
+
+    def criar_partida(jogador1, jogador2, regras):
+        partidas.append((jogador1, jogador2))
+        return len(partidas)
+
+    gerenciador = GerenciadorTorneios(criar_partida, lambda jogador, **campos: avisos.append((jogador, campos)))
+    torneio_id = gerenciador.criar(formato, rodadas, obter_regras())
+    for jogador in jogadores:
+        assert gerenciador.inscrever(torneio_id, jogador)[0]
+    assert gerenciador.iniciar(torneio_id)[0]
+    encerradas = 0
+    while encerradas < len(partidas):
+        encerradas += 1
+        assert gerenciador.partida_encerrada(encerradas, vencedor(partidas[encerradas - 1]))
+    return gerenciador.torneios[torneio_id], partidas, avisos, gerenciador
+
+
+def test_ordem_sementes():
+    assert ordem_sementes(1) == [0]
+    assert ordem_sementes(2) == [0, 1]
+    assert ordem_sementes(8) == [0, 7, 3, 4, 1, 6, 2, 5]
+
+
+@pytest.mark.parametrize("total, partidas_esperadas", [
+    # 3 jogadores: a semente 1 folga e espera o vencedor de 2 x 3
+    (3, [(2, 3), (1, 2)]),
+    # 5 jogadores: só 4 x 5 joga a primeira rodada; 2 e 3 folgam e já se enfrentam
+    (5, [(2, 3), (4, 5), (1, 4), (1, 2)]),
+    # 8 jogadores: chave cheia, sem folgas
+    (8, [(1, 8), (4, 5), (2, 7), (3, 6), (1, 4), (2, 3), (1, 2)]),
+])
+def test_eliminacao_folgas_e_avanco(total, partidas_esperadas):
+    torneio, partidas, avisos, gerenciador = jogar_torneio("eliminatoria", range(1, total + 1))
+    assert partidas == partidas_esperadas
+    assert torneio.situacao == ENCERRADO
+    assert torneio.campeao == 1
+    assert torneio.jogadas == total - 1
+    eliminados = [jogador for jogador, campos in avisos if campos["situacao"] == "eliminado"]
+    assert sorted(eliminados) == list(range(2, total + 1))
+    assert [jogador for jogador, campos in avisos if campos["situacao"] == "campeao"] == [1]
+    assert gerenciador.inscritos == {}  # Todos liberados para outro torneio
+    classificacao = torneio.classificacao(2)
+    assert [linha["jogador"] for linha in classificacao] == [1, 2]
+
+
+def test_eliminacao_zebra_avanca_pela_chave():
+    torneio, partidas, _, _ = jogar_torneio("eliminatoria", range(1, 9), vencedor=max)
+    assert partidas[-1] == (8, 7)
+    assert torneio.campeao == 8
+
+
+def test_eliminacao_final_so_depois_das_semifinais():
+    torneio, partidas, _, _ = jogar_torneio("eliminatoria", range(1, 9))
+    final = partidas.index((1, 2))
+    assert final == len(partidas) - 1
+    assert {(1, 4), (2, 3)} <= set(partidas[:final])
+
+
+@pytest.mark.parametrize("total, rodadas", [(8, 3), (16, 4), (7, 3), (10, 5), (12, 7), (20, 11)])
+@pytest.mark.parametrize("vencedor", [min, max, lambda par: par[sum(par) % 2]])
+def test_suico_sem_revanches(total, rodadas, vencedor):
+    # Com 10 jogadores e 5 rodadas o emparelhamento guloso sozinho já termina em revanche
+    torneio, partidas, avisos, _ = jogar_torneio("suico", range(1, total + 1), rodadas, vencedor)
+    assert torneio.situacao == ENCERRADO
+    assert torneio.rodada == rodadas
+    assert len(partidas) == rodadas * (total // 2)
+    confrontos = [frozenset(par) for par in partidas]
+    assert len(set(confrontos)) == len(confrontos)
+    folgas = [jogador for jogador, campos in avisos if campos["situacao"] == "folga"]
+    assert len(folgas) == rodadas * (total % 2)
+    assert len(set(folgas)) == len(folgas)  # Ninguém folga duas vezes
+    # Cada partida e cada folga vale um ponto
+    assert sum(torneio.pontos) == len(partidas) + len(folgas)
+    # Buchholz: soma dos pontos finais dos adversários (as trocas de adversário o mantêm em dia)
+    for i in range(total):
+        oponentes = torneio.oponentes[i * rodadas:(i + 1) * rodadas]
+        assert torneio.buchholz[i] == sum(torneio.pontos[o] for o in oponentes if o >= 0)
+
+
+def test_suico_classificacao():
+    torneio, _, avisos, _ = jogar_torneio("suico", range(1, 9), 3)
+    assert torneio.campeao == 1
+    classificacao = torneio.classificacao(3)
+    assert classificacao[0] == {"posicao": 1, "jogador": 1, "pontos": 3, "buchholz": classificacao[0]["buchholz"]}
+    assert [linha["pontos"] for linha in classificacao] == sorted((linha["pontos"] for linha in classificacao),
+                                                                  reverse=True)
+    encerrados = {jogador: campos["posicao"] for jogador, campos in avisos if campos["situacao"] == "encerrado"}
+    assert sorted(encerrados.values()) == list(range(1, 9))
+
+
+@pytest.mark.parametrize("formato", ["eliminatoria", "suico"])
+@pytest.mark.parametrize("jogadores", [["ana", "bia", "caio"], [-1, -2, 5], ["ana", 7, -1, "x", 0]])
+def test_ids_de_qualquer_tipo(formato, jogadores):
+    # -1 e -2 não se confundem com PENDENTE e VAGO: a chave guarda índices de inscrição
+    torneio, partidas, avisos, gerenciador = jogar_torneio(formato, jogadores, vencedor=lambda par: par[0])
+    assert torneio.situacao == ENCERRADO
+    assert torneio.campeao in jogadores
+    assert {jogador for par in partidas for jogador in par} == set(jogadores)
+    assert gerenciador.inscritos == {}
+
+
+def test_torneio_com_ids_de_texto_no_servidor():
+    jogo = GameServer()
+    for jogador in ("ana", "bia"):
+        jogo.register_player(jogador, 0)
+    _, torneio_id = jogo.create_tournament("eliminatoria", 0, "classico", 1)
+    assert jogo.join_tournament("ana", torneio_id)[0]
+    assert jogo.join_tournament("bia", torneio_id)[0]
+    assert jogo.start_tournament(torneio_id)[0]
+    jogo.add_score("bia", jogo.player_match["ana"])
+    assert jogo.get_tournament(torneio_id)[1]["campeao"] == "bia"
+    # Quem saiu do torneio pode voltar para a fila
+    assert jogo.add_to_waiting_list("ana")[0]
+
+
+@pytest.mark.parametrize("formato", ["eliminatoria", "suico"])
+def test_partida_que_falhou_ao_ser_criada_volta_para_as_prontas(formato):
+    partidas, recusar = [], [True]
+
+    def criar_partida(jogador1, jogador2, regras):
+        if recusar[0]:
+            return None
+        partidas.append((jogador1, jogador2))
+        return len(partidas)
+
+    gerenciador = GerenciadorTorneios(criar_partida, lambda jogador, **campos: None)
+    torneio_id = gerenciador.criar(formato, 0, obter_regras())
+    for jogador in range(1, 5):
+        gerenciador.inscrever(torneio_id, jogador)
+    gerenciador.iniciar(torneio_id)
+    torneio = gerenciador.torneios[torneio_id]
+    assert None not in gerenciador
+    assert torneio.ativas == 0 and torneio.prontas() == 2
+
+    recusar[0] = False
+    gerenciador.agendar()  # Próxima passagem do coletor
+    assert len(partidas) == 2 and torneio.ativas == 2
+    encerradas = 0
+    while encerradas < len(partidas):
+        encerradas += 1
+        gerenciador.partida_encerrada(encerradas, min(partidas[encerradas - 1]))
+    assert torneio.situacao == ENCERRADO
@@ -0,0 +1,483 @@
+# Alunos
+# Andrei Roberto da Costa
+# Daniel Aparecido da Cunha Braz
+# Henrique Rosa de Araujo
+
+"""Torneios de eliminação simples e suíço sobre as partidas do `GameServer`.
+
+O `GerenciadorTorneios` mantém uma fila de partidas prontas de cada torneio e
+cria as partidas em ondas, até `max_partidas` simultâneas. Cada partida
+encerrada (vencedor informado pelo `check_game_over`, ou W.O. quando a partida
+é removida antes do fim) libera uma vaga e avança o torneio; a vaga é ocupada
+na mesma hora pela próxima partida pronta, de qualquer torneio.
+
+    - Eliminação simples: a chave é uma árvore completa guardada em um único
+      `array` (o nó `i` tem os filhos `2i` e `2i + 1`; as folhas são os
+      jogadores, em ordem de semente). Os nós guardam a posição do jogador
+      na inscrição, e não o ID, que pode ser texto ou qualquer número. Não há espera por rodada: uma partida
+      fica pronta assim que as duas partidas anteriores terminam, e as
+      partidas prontas das rodadas mais avançadas saem primeiro (caminho
+      crítico até a final).
+    - Suíço: pontos, Buchholz e adversários de cada jogador em `array`s
+      indexados pela ordem de inscrição. A rodada seguinte é emparelhada
+      quando todas as partidas da rodada terminam.
+
+Com 64 mil jogadores a chave ocupa cerca de 1 MB e o suíço cerca de 5 MB (sem
+contar os próprios IDs, que já existem no servidor).
+O estado dos torneios fica só em memória: as partidas sobrevivem a uma
+reinicialização pelo diário, mas o torneio não.
+"""
+
+import heapq
+import itertools
+from array import array
+
+from logger import obter_logger
+
+log = obter_logger("torneio")
+
+INSCRICOES, ANDAMENTO, ENCERRADO = "inscricoes", "andamento", "encerrado"
+
+# Valores especiais na chave da eliminação simples (os nós guardam índices de jogador, >= 0)
+PENDENTE = -1  # Partida ainda não decidida
+VAGO = -2  # Posição sem jogador: o adversário avança direto (folga)
+
+JANELA_EMPARELHAMENTO = 16  # Candidatos examinados no suíço para evitar revanches
+
+
+def ordem_sementes(tamanho):
+    """Posições das sementes em uma chave de `tamanho` (potência de 2) folhas.
+
+    A semente 0 enfrenta a última, e as melhores só se encontram no fim:
+    para 8 folhas, [0, 7, 3, 4, 1, 6, 2, 5].
+    """
+    ordem = [0]
+    while len(ordem) < tamanho:
+        total = 2 * len(ordem)
+        ordem = [semente for s in ordem for semente in (s, total - 1 - s)]
+    return ordem
+
+
+class Torneio:
+    """Inscrições e estado comum aos formatos de torneio.
+
+    Args:
+        torneio_id (int): ID do torneio.
+        avisar: Função `avisar(player_id, **campos)` que envia um evento "torneio" ao jogador.
+        liberar: Função chamada com o ID do jogador quando ele deixa o torneio.
+        rodadas (int): Quantidade de rodadas (0 = log2 dos jogadores, arredondado para cima).
+        regras (Regras): Regras de todas as partidas do torneio.
+    """
+
+    formato = ""
+
+    def __init__(self, torneio_id, avisar, liberar, rodadas, regras):
+        self.id = torneio_id
+        self.regras = regras
+        self._avisar = avisar
+        self._liberar = liberar
+        self.ids = []  # IDs dos jogadores, na ordem de inscrição (= semente); os arrays usam o índice
+        self.situacao = INSCRICOES
+        self.rodada = 0
+        self.rodadas = rodadas
+        self.ativas = 0  # Partidas em andamento (mantido pelo gerenciador)
+        self.jogadas = 0  # Partidas encerradas
+        self.campeao = None
+
+    def inscrever(self, player_id):
+        self.ids.append(player_id)
+
+    def _sair(self, player_id, situacao, **campos):
+        """Avisa o jogador que o torneio acabou para ele."""
+        self._avisar(player_id, torneio=self.id, situacao=situacao, **campos)
+        self._liberar(player_id)
+
+    def resumo(self):
+        return {
+            "id": self.id,
+            "formato": self.formato,
+            "variante": self.regras.variante,
+            "melhor_de": self.regras.melhor_de,
+            "situacao": self.situacao,
+            "jogadores": len(self.ids),
+            "rodada": self.rodada,
+            "rodadas": self.rodadas,
+            "partidas_ativas": self.ativas,
+            "partidas_jogadas": self.jogadas,
+            "partidas_prontas": self.prontas() if self.situacao == ANDAMENTO else 0,
+            "campeao": "" if self.campeao is None else self.campeao,
+        }
+
+
+class EliminacaoSimples(Torneio):
+    """Chave de eliminação simples; quem perde sai do torneio (o número de rodadas é o da chave)."""
+
+    formato = "eliminatoria"
+
+    def iniciar(self):
+        folhas = 1 << (len(self.ids) - 1).bit_length()  # Menor potência de 2 >= jogadores
+        self.folhas = folhas
+        self.rodadas = folhas.bit_length() - 1
+        self.arvore = array("i", [PENDENTE]) * (2 * folhas)
+        self._prontas = []  # Heap de nós prontos: o menor índice é a rodada mais avançada
+        for posicao, semente in enumerate(ordem_sementes(folhas)):
+            self.arvore[folhas + posicao] = semente if semente < len(self.ids) else VAGO
+        # Com a ordem de sementes, cada posição vaga enfrenta um jogador: ele avança sem jogar
+        for no in range(folhas // 2, folhas):
+            esquerda, direita = self.arvore[2 * no], self.arvore[2 * no + 1]
+            if direita == VAGO:
+                self._decidir(no, esquerda)
+            elif esquerda == VAGO:
+                self._decidir(no, direita)
+            else:
+                self._prontas.append(no)
+        heapq.heapify(self._prontas)
+        self.situacao = ANDAMENTO
+
+    def prontas(self):
+        return len(self._prontas)
+
+    def devolver(self, no):
+        """Volta a partida para as prontas (a criação dela falhou)."""
+        heapq.heappush(self._prontas, no)
+
+    def _rodada_do_no(self, no):
+        return self.folhas.bit_length() - no.bit_length()
+
+    def proxima_partida(self):
+        """Retira a próxima partida pronta. Returns: (chave, jogador1, jogador2) ou None."""
+        if not self._prontas:
+            return None
+        no = heapq.heappop(self._prontas)
+        self.rodada = max(self.rodada, self._rodada_do_no(no))
+        return no, self.ids[self.arvore[2 * no]], self.ids[self.arvore[2 * no + 1]]
+
+    def registrar_resultado(self, no, vencedor):
+        esquerda, direita = self.arvore[2 * no], self.arvore[2 * no + 1]
+        if self.ids[esquerda] != vencedor:
+            esquerda, direita = direita, esquerda
+        self.jogadas += 1
+        self._decidir(no, esquerda)
+        self._sair(self.ids[direita], "eliminado", rodada=self._rodada_do_no(no),
+                   posicao=(1 << no.bit_length() - 1) + 1)
+
+    def _decidir(self, no, vencedor):
+        """Grava o vencedor (índice) do nó e libera a partida seguinte, se o outro lado já estiver decidido."""
+        self.arvore[no] = vencedor
+        if no == 1:
+            self.campeao = self.ids[vencedor]
+            self.situacao = ENCERRADO
+            self._sair(self.campeao, "campeao", posicao=1)
+            return
+        irmao = self.arvore[no ^ 1]
+        if irmao == VAGO:
+            self._decidir(no // 2, vencedor)
+        elif irmao != PENDENTE:
+            heapq.heappush(self._prontas, no // 2)
+
+    def classificacao(self, limite):
+        """Campeão, finalista, semifinalistas... percorrendo a chave da final para trás."""
+        if self.situacao == INSCRICOES:
+            return []
+        resultado = []
+        for no in range(1, self.folhas):
+            if len(resultado) >= limite:
+                break
+            vencedor = self.arvore[no]
+            if vencedor < 0:
+                continue
+            if no == 1:
+                resultado.append({"posicao": 1, "jogador": self.ids[vencedor]})
+            esquerda, direita = self.arvore[2 * no], self.arvore[2 * no + 1]
+            perdedor = direita if vencedor == esquerda else esquerda
+            if perdedor >= 0:
+                resultado.append({"posicao": (1 << no.bit_length() - 1) + 1, "jogador": self.ids[perdedor]})
+        return resultado[:limite]
+
+
+class Suico(Torneio):
+    """Sistema suíço: todos jogam todas as rodadas contra adversários com a mesma pontuação."""
+
+    formato = "suico"
+
+    def iniciar(self):
+        total = len(self.ids)
+        self.rodadas = self.rodadas or (total - 1).bit_length()
+        self.pontos = array("H", bytes(2 * total))  # Vitórias (uma folga conta como vitória)
+        self.buchholz = array("I", bytes(4 * total))  # Soma dos pontos dos adversários (desempate)
+        # Adversário (índice) de cada jogador em cada rodada; -1 = folga
+        self.oponentes = array("i", [-1]) * (total * self.rodadas)
+        self.folgas = bytearray(total)
+        self.situacao = ANDAMENTO
+        self._emparelhar()
+
+    def prontas(self):
+        return len(self._pares) // 2 - self._cursor + len(self._devolvidas)
+
+    def devolver(self, chave):
+        """Volta a partida para as prontas (a criação dela falhou)."""
+        self._devolvidas.append(chave)
+
+    def _ordem(self):
+        return sorted(range(len(self.ids)), key=lambda i: (-self.pontos[i], -self.buchholz[i], i))
+
+    def _emparelhar(self):
+        """Emparelha a próxima rodada em ordem de classificação, evitando revanches."""
+        self.rodada += 1
+        deslocamento = self.rodada - 1
+        ordem = self._ordem()
+        if len(ordem) % 2:
+            # Folga para o último colocado que ainda não folgou
+            folga = next((i for i in reversed(ordem) if not self.folgas[i]), ordem[-1])
+            ordem.remove(folga)
+            self.folgas[folga] = 1
+            self.pontos[folga] += 1
+            self._aumentar_buchholz(folga)
+            self._avisar(self.ids[folga], torneio=self.id, situacao="folga", rodada=self.rodada)
+        usado = bytearray(len(self.ids))
+        self._pares = array("i")
+        self._cursor = 0
+        self._devolvidas = []  # Partidas da rodada cuja criação falhou, para tentar de novo
+        revanches = []  # Partidas (posição em `_pares`) em que a revanche foi aceita
+        for posicao, a in enumerate(ordem):
+            if usado[a]:
+                continue
+            inicio_a = a * self.rodadas
+            enfrentados = self.oponentes[inicio_a:inicio_a + deslocamento]
+            primeiro = escolhido = None
+            examinados = 0
+            for proximo in range(posicao + 1, len(ordem)):
+                b = ordem[proximo]
+                if usado[b]:
+                    continue
+                if primeiro is None:
+                    primeiro = b
+                if b not in enfrentados:
+                    escolhido = b
+                    break
+                examinados += 1
+                if examinados >= JANELA_EMPARELHAMENTO:
+                    break
+            if escolhido is None:  # Sem opção na janela: aceita a revanche, por enquanto
+                escolhido = primeiro
+                revanches.append(len(self._pares) // 2)
+            b = escolhido
+            usado[a] = usado[b] = 1
+            self._pares.extend((a, b))
+            self.oponentes[inicio_a + deslocamento] = b
+            self.oponentes[b * self.rodadas + deslocamento] = a
+            self.buchholz[a] += self.pontos[b]
+            self.buchholz[b] += self.pontos[a]
+        self._desfazer_revanches(revanches)
+        self._pendentes = len(self._pares) // 2
+
+    def _enfrentou(self, a, b):
+        """Indica se os jogadores (índices) já se enfrentaram antes da rodada atual."""
+        inicio = a * self.rodadas
+        return b in self.oponentes[inicio:inicio + self.rodada - 1]
+
+    def _desfazer_revanches(self, revanches):
+        """Troca os adversários de cada revanche com os de uma partida próxima na classificação.
+
+        O emparelhamento guloso chega ao fim da ordem sem escolha: os últimos
+        jogadores podem já ter se enfrentado mesmo quando existe um
+        emparelhamento sem revanches. Para cada revanche, as partidas vizinhas
+        (até `JANELA_EMPARELHAMENTO` de distância, da mais próxima para a mais
+        distante) são examinadas até uma em que os dois novos confrontos sejam
+        inéditos; sem nenhuma, a revanche fica.
+        """
+        pares, pontos, buchholz = self._pares, self.pontos, self.buchholz
+        deslocamento = self.rodada - 1
+        total = len(pares) // 2
+        for i in revanches:
+            a, b = pares[2 * i], pares[2 * i + 1]
+            vizinhas = sorted(range(max(0, i - JANELA_EMPARELHAMENTO), min(total, i + JANELA_EMPARELHAMENTO + 1)),
+                              key=lambda j: abs(j - i))
+            for j in vizinhas[1:]:
+                c, d = pares[2 * j], pares[2 * j + 1]
+                if not self._enfrentou(c, a) and not self._enfrentou(d, b):
+                    novos = ((c, a), (d, b))
+                elif not self._enfrentou(c, b) and not self._enfrentou(d, a):
+                    novos = ((c, b), (d, a))
+                else:
+                    continue
+                for x, y in ((a, b), (c, d)):
+                    buchholz[x] -= pontos[y]
+                    buchholz[y] -= pontos[x]
+                for partida, (x, y) in zip((j, i), novos):
+                    pares[2 * partida], pares[2 * partida + 1] = x, y
+                    self.oponentes[x * self.rodadas + deslocamento] = y
+                    self.oponentes[y * self.rodadas + deslocamento] = x
+                    buchholz[x] += pontos[y]
+                    buchholz[y] += pontos[x]
+                break
+
+    def _aumentar_buchholz(self, indice):
+        """O jogador ganhou um ponto: soma 1 ao Buchholz de quem já o enfrentou."""
+        inicio = indice * self.rodadas
+        for oponente in self.oponentes[inicio:inicio + self.rodada]:
+            if oponente >= 0:
+                self.buchholz[oponente] += 1
+
+    def proxima_partida(self):
+        """Retira a próxima partida pronta. Returns: (chave, jogador1, jogador2) ou None."""
+        if self._devolvidas:
+            chave = self._devolvidas.pop()
+        elif self._cursor * 2 >= len(self._pares):
+            return None
+        else:
+            chave = self._cursor
+            self._cursor += 1
+        return chave, self.ids[self._pares[2 * chave]], self.ids[self._pares[2 * chave + 1]]
+
+    def registrar_resultado(self, chave, vencedor):
+        a, b = self._pares[2 * chave], self._pares[2 * chave + 1]
+        indice = a if self.ids[a] == vencedor else b
+        self.pontos[indice] += 1
+        self._aumentar_buchholz(indice)
+        self.jogadas += 1
+        self._pendentes -= 1
+        if self._pendentes:
+            return
+        if self.rodada < self.rodadas:
+            self._emparelhar()
+            return
+        self.situacao = ENCERRADO
+        for posicao, i in enumerate(self._ordem(), 1):
+            if posicao == 1:
+                self.campeao = self.ids[i]
+            self._sair(self.ids[i], "encerrado", posicao=posicao, pontos=self.pontos[i])
+
+    def classificacao(self, limite):
+        """Os `limite` primeiros por pontos e Buchholz."""
+        if self.situacao == INSCRICOES:
+            return []
+        melhores = heapq.nsmallest(limite, range(len(self.ids)),
+                                   key=lambda i: (-self.pontos[i], -self.buchholz[i], i))
+        return [{"posicao": posicao, "jogador": self.ids[i], "pontos": self.pontos[i],
+                 "buchholz": self.buchholz[i]}
+                for posicao, i in enumerate(melhores, 1)]
+
+
+FORMATOS = {EliminacaoSimples.formato: EliminacaoSimples, Suico.formato: Suico}
+
+
+class GerenciadorTorneios:
+    """Torneios do servidor e agendamento das suas partidas.
+
+    Como o `Matchmaker`, não tem lock próprio: o `GameServer` chama todos os
+    métodos com o seu lock adquirido.
+
+    Args:
+        criar_partida: Função `criar_partida(jogador1, jogador2, regras)` que cria a partida,
+            avisa os jogadores e retorna o ID da partida.
+        avisar: Função `avisar(player_id, **campos)` que envia um evento "torneio" ao jogador.
+        max_partidas (int): Partidas de torneio em andamento ao mesmo tempo.
+    """
+
+    def __init__(self, criar_partida, avisar, max_partidas=1000):
+        self._criar_partida = criar_partida
+        self._avisar = avisar
+        self.max_partidas = max_partidas
+        self._ids = itertools.count(1)
+        self.torneios = {}  # torneio_id -> Torneio
+        self._andamento = {}  # Torneios com partidas por jogar, na ordem de início
+        self._partidas = {}  # match_id -> (Torneio, chave da partida no torneio)
+        self.inscritos = {}  # player_id -> torneio_id, enquanto o jogador está em um torneio
+
+    def __contains__(self, match_id):
+        return match_id in self._partidas
+
+    def criar(self, formato, rodadas, regras):
+        """Cria um torneio aberto a inscrições. Retorna o ID ou None se o formato não existir."""
+        classe = FORMATOS.get(formato)
+        if classe is None:
+            return None
+        torneio_id = next(self._ids)
+        self.torneios[torneio_id] = classe(torneio_id, self._avisar, self._liberar, rodadas, regras)
+        return torneio_id
+
+    def _liberar(self, player_id):
+        self.inscritos.pop(player_id, None)
+
+    def inscrever(self, torneio_id, player_id):
+        """Returns: tuple (sucesso, mensagem)."""
+        torneio = self.torneios.get(torneio_id)
+        if torneio is None:
+            return False, "Torneio não encontrado"
+        if torneio.situacao != INSCRICOES:
+            return False, "Inscrições encerradas"
+        if player_id in self.inscritos:
+            return False, "Jogador já está em um torneio"
+        torneio.inscrever(player_id)  # Antes do índice de inscritos: se falhar, nada fica pela metade
+        self.inscritos[player_id] = torneio_id
+        return True, f"Jogador {player_id} inscrito no torneio {torneio_id}"
+
+    def iniciar(self, torneio_id):
+        """Monta a chave (ou a primeira rodada) e cria a primeira onda de partidas."""
+        torneio = self.torneios.get(torneio_id)
+        if torneio is None:
+            return False, "Torneio não encontrado"
+        if torneio.situacao != INSCRICOES:
+            return False, "Torneio já iniciado"
+        if len(torneio.ids) < 2:
+            return False, "O torneio precisa de pelo menos 2 jogadores"
+        torneio.iniciar()
+        self._andamento[torneio_id] = torneio
+        self.agendar()
+        log.info("Torneio %s iniciado", torneio_id,
+                 extra={"campos": {"formato": torneio.formato, "jogadores": len(torneio.ids)}})
+        return True, f"Torneio {torneio_id} iniciado"
+
+    def partida_encerrada(self, match_id, vencedor):
+        """Registra o vencedor de uma partida do torneio e ocupa a vaga liberada.
+        Returns:
+            bool: False se a partida não pertence a um torneio (ou já foi contada).
+        """
+        entrada = self._partidas.pop(match_id, None)
+        if entrada is None:
+            return False
+        torneio, chave = entrada
+        torneio.ativas -= 1
+        torneio.registrar_resultado(chave, vencedor)
+        if torneio.situacao == ENCERRADO:
+            del self._andamento[torneio.id]
+            log.info("Torneio %s encerrado", torneio.id, extra={"campos": {"campeao": torneio.campeao}})
+        self.agendar()
+        return True
+
+    def agendar(self):
+        """Cria partidas prontas, alternando entre os torneios, até ocupar todas as vagas.
+
+        Chamado quando um torneio começa, a cada partida encerrada e,
+        periodicamente, pelo coletor do servidor, que assim tenta de novo as
+        partidas cuja criação falhou.
+        """
+        criou = True
+        falharam = set()  # Torneios com uma criação recusada: ficam para o próximo agendamento
+        while criou and len(self._partidas) < self.max_partidas:
+            criou = False
+            for torneio in list(self._andamento.values()):
+                if len(self._partidas) >= self.max_partidas:
+                    return
+                if torneio.id in falharam:
+                    continue
+                proxima = torneio.proxima_partida()
+                if proxima is None:
+                    continue
+                chave, jogador1, jogador2 = proxima
+                match_id = self._criar_partida(jogador1, jogador2, torneio.regras)
+                if match_id is None:
+                    torneio.devolver(chave)
+                    falharam.add(torneio.id)
+                    continue
+                self._partidas[match_id] = (torneio, chave)
+                torneio.ativas += 1
+                criou = True
+
+    def estatisticas(self):
+        return {
+            "torneios_andamento": len(self._andamento),
+            "torneios_partidas_ativas": len(self._partidas),
+            "torneios_partidas_prontas": sum(torneio.prontas() for torneio in self._andamento.values()),
+        }